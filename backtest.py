@@ -0,0 +1,134 @@
+"""Backtest vetorizado da EstrategiaTrading sobre um array de barras (layout de mt5.copy_rates_*).
+
+Os sinais vêm do mesmo conjunto de regras compilado que a estratégia avalia ao vivo
+(`EstrategiaTrading.regras`), aplicado ao histórico inteiro de uma vez.
+"""
+import numpy as np
+
+from estrategia import EstrategiaTrading, HORARIO_INICIO, HORARIO_FIM
+
+SEGUNDOS_INICIO = HORARIO_INICIO.hour * 3600 + HORARIO_INICIO.minute * 60
+SEGUNDOS_FIM = HORARIO_FIM.hour * 3600 + HORARIO_FIM.minute * 60
+
+
+class LogNulo:
+    """Log descartado: o backtest não escreve no painel"""
+
+    def logar(self, mensagem, asset=None):
+        pass
+
+
+def criar_estrategia(ativo='BACKTEST', timeframe='M5', parametros=None):
+    """Instância da estratégia com os parâmetros dados (nome do atributo -> valor)"""
+    estrategia = EstrategiaTrading(ativo, timeframe, 0.1, LogNulo())
+    for nome, valor in (parametros or {}).items():
+        if not hasattr(estrategia, nome):
+            raise ValueError(f"Parâmetro desconhecido: {nome}")
+        setattr(estrategia, nome, valor)
+    return estrategia
+
+
+def calcular_sinais(estrategia, barras):
+    """Sinais de compra/venda por barra e o ATR usado nos stops (mesmas regras do ciclo ao vivo)"""
+    dados = {
+        'open': barras['open'], 'high': barras['high'], 'low': barras['low'], 'close': barras['close'],
+        'volume': barras['tick_volume'], 'spread': barras['spread'],
+    }
+    sinais = estrategia.regras.avaliar(dados, vars(estrategia))
+    atr = sinais['atr_atual']
+
+    segundo_do_dia = barras['time'] % 86400
+    horario = (segundo_do_dia >= SEGUNDOS_INICIO) & (segundo_do_dia <= SEGUNDOS_FIM)
+    base = horario & ~np.isnan(atr)
+    compra = base & sinais['compra']
+    # Como no ciclo ao vivo, a venda só é avaliada quando não há sinal de compra
+    venda = base & sinais['venda'] & ~compra
+    return compra, venda, atr
+
+
+def _primeira_saida(barras, inicio, direcao, sl, tp):
+    """Índice da primeira barra a partir de `inicio` que toca SL ou TP e o preço de saída"""
+    n = len(barras)
+    bloco = 256
+    while inicio < n:
+        fim = min(n, inicio + bloco)
+        high = barras['high'][inicio:fim]
+        low = barras['low'][inicio:fim]
+        if direcao > 0:
+            toca_sl, toca_tp = low <= sl, high >= tp
+        else:
+            toca_sl, toca_tp = high >= sl, low <= tp
+        toca = toca_sl | toca_tp
+        if toca.any():
+            k = int(np.argmax(toca))
+            # SL e TP na mesma barra: supõe o pior caso (SL)
+            return inicio + k, sl if toca_sl[k] else tp
+        inicio = fim
+        bloco *= 2
+    return n - 1, float(barras['close'][-1])
+
+
+def simular(barras, compra, venda, atr, estrategia, point, inicio=0):
+    """Executa os sinais a partir da barra `inicio`, uma posição por vez, com SL/TP fixos em ATRs.
+
+    Entrada na abertura da barra seguinte ao sinal; o custo é o spread dessa barra.
+    Retorna (índice de entrada, índice de saída, direção, resultado em preço por unidade de volume).
+    """
+    sinais = np.flatnonzero((compra | venda)[:-1])
+    sinais = sinais[sinais >= inicio]
+
+    entradas, saidas, direcoes, resultados = [], [], [], []
+    livre_a_partir = inicio
+    posicao = np.searchsorted(sinais, livre_a_partir)
+    while posicao < len(sinais):
+        i = int(sinais[posicao])
+        direcao = 1 if compra[i] else -1
+        entrada = i + 1
+        preco = float(barras['open'][entrada])
+        # Distâncias em preço, como o stop inicial do gerenciador de posições
+        distancia_sl = atr[i] * 1.5
+        distancia_tp = atr[i] * estrategia.min_rr_ratio * 1.5
+        sl = preco - direcao * distancia_sl
+        tp = preco + direcao * distancia_tp
+
+        saida, preco_saida = _primeira_saida(barras, entrada, direcao, sl, tp)
+        custo = float(barras['spread'][entrada]) * point
+        entradas.append(entrada)
+        saidas.append(saida)
+        direcoes.append(direcao)
+        resultados.append(direcao * (preco_saida - preco) - custo)
+
+        livre_a_partir = saida + 1
+        posicao = np.searchsorted(sinais, livre_a_partir)
+
+    return (np.array(entradas, dtype=np.int64), np.array(saidas, dtype=np.int64),
+            np.array(direcoes, dtype=np.int8), np.array(resultados, dtype=np.float64))
+
+
+def metricas(resultados):
+    """Resumo de uma sequência de resultados por operação"""
+    n = len(resultados)
+    if n == 0:
+        return {'operacoes': 0, 'lucro': 0.0, 'profit_factor': 0.0, 'acerto': 0.0, 'sharpe': 0.0,
+                'max_drawdown': 0.0}
+    ganhos = resultados[resultados > 0].sum()
+    perdas = -resultados[resultados < 0].sum()
+    equity = np.cumsum(resultados)
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0.0)) - equity
+    desvio = resultados.std()
+    return {
+        'operacoes': int(n),
+        'lucro': float(equity[-1]),
+        'profit_factor': float(ganhos / perdas) if perdas > 0 else float('inf') if ganhos > 0 else 0.0,
+        'acerto': float((resultados > 0).mean()),
+        'sharpe': float(resultados.mean() / desvio * np.sqrt(n)) if desvio > 0 else 0.0,
+        'max_drawdown': float(drawdown.max()),
+    }
+
+
+def executar_backtest(barras, parametros=None, point=0.00001, inicio=0, timeframe='M5'):
+    """Backtest completo: sinais, simulação e métricas. Retorna (operações, métricas)"""
+    estrategia = criar_estrategia(timeframe=timeframe, parametros=parametros)
+    compra, venda, atr = calcular_sinais(estrategia, barras)
+    operacoes = simular(barras, compra, venda, atr, estrategia, point, inicio)
+    return operacoes, metricas(operacoes[3])
@@ -0,0 +1,291 @@
+"""Benchmarks offline dos caminhos críticos (dados sintéticos + MT5 simulado).
+
+Exemplos:
+    python benchmark.py --saida bench_atual.json
+    python benchmark.py --saida bench_novo.json --comparar bench_atual.json --limite 0.20
+    python benchmark.py --filtro indicador --limite-bench indicador.rsi=0.50
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import fake_mt5
+
+terminal = fake_mt5.instalar(n_symbols=200)
+
+import numpy as np  # noqa: E402
+
+from estrategia import EstrategiaTrading  # noqa: E402
+from log_system import LogSystem  # noqa: E402
+from ring_buffer import BufferBarras  # noqa: E402
+from utils import AssetManager  # noqa: E402
+from mt5_gate import controlador_mt5  # noqa: E402
+
+
+class DummyText:
+    """Substituto mínimo de tk.Text para medir o LogSystem sem display"""
+
+    def __init__(self):
+        self.linhas = 1
+
+    def tag_configure(self, *args, **kwargs):
+        pass
+
+    def insert(self, indice, texto, *tags):
+        self.linhas += texto.count('\n')
+
+    def see(self, indice):
+        pass
+
+    def index(self, indice):
+        return f"{self.linhas}.0"
+
+    def delete(self, inicio, fim=None):
+        if fim == 'end':
+            self.linhas = 1
+        else:
+            self.linhas -= int(float(fim)) - int(float(inicio))
+
+
+class DummyLog:
+    """LogSystem que descarta as mensagens (isola o custo da estratégia)"""
+
+    def logar(self, mensagem, asset=None):
+        pass
+
+
+def medir(funcao, repeticoes, aquecimento=3):
+    """Executa `funcao` várias vezes e retorna estatísticas em microssegundos por chamada"""
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1e6)
+    tempos.sort()
+    return {
+        'mediana_us': statistics.median(tempos),
+        'min_us': tempos[0],
+        'p95_us': tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))],
+        'repeticoes': repeticoes,
+    }
+
+
+def dados_sinteticos(n, seed=42):
+    rng = np.random.default_rng(seed)
+    close = 1.1 * np.exp(np.cumsum(rng.normal(0, 0.0008, n)))
+    spread = np.abs(rng.normal(0, 0.0006, n))
+    high = close + spread
+    low = close - spread
+    volume = rng.integers(50, 500, n).astype(np.float64)
+    return close, high, low, volume
+
+
+def bench_indicadores(n_barras, repeticoes):
+    estrategia = EstrategiaTrading('EURUSD', 'M5', 0.1, DummyLog())
+    close, high, low, _ = dados_sinteticos(n_barras)
+    casos = {
+        'ema': lambda: estrategia.ema(close, estrategia.ema_media),
+        'macd': lambda: estrategia.macd(close, estrategia.macd_rapido, estrategia.macd_lento, estrategia.macd_sinal),
+        'rsi': lambda: estrategia.rsi(close, 14),
+        'bollinger_bands': lambda: estrategia.bollinger_bands(close, 20, estrategia.bb_desvio),
+        'stochastic': lambda: estrategia.stochastic(high, low, close, estrategia.stoch_period),
+        'atr': lambda: estrategia.atr(high, low, close, estrategia.atr_period),
+        'momentum': lambda: estrategia.momentum(close, 10),
+    }
+    return {f"indicador.{nome}": medir(funcao, repeticoes) for nome, funcao in casos.items()}
+
+
+def bench_ciclo(repeticoes):
+    estrategia = EstrategiaTrading('EURUSD', 'M5', 0.1, DummyLog())
+
+    def ciclo():
+        estrategia.last_analysis_time = None
+        estrategia.analisar_e_operar()
+
+    return {'estrategia.analisar_e_operar': medir(ciclo, repeticoes)}
+
+
+def bench_buffer(repeticoes):
+    import MetaTrader5 as mt5
+    historico = mt5.copy_rates_from_pos('EURUSD', mt5.TIMEFRAME_M5, 0, 400)
+    buffer = BufferBarras(200)
+    buffer.atualizar(historico[:200])
+    proxima = iter(range(200, 400))
+
+    def ciclo():
+        # Barra em formação + uma nova, como em cada sincronização da estratégia
+        i = next(proxima, None)
+        if i is None:
+            buffer.limpar()
+            buffer.atualizar(historico[:200])
+            i = 200
+        buffer.atualizar(historico[i - 1:i + 1])
+        buffer.ultimas('close')
+
+    return {'ring_buffer.atualizar': medir(ciclo, repeticoes)}
+
+
+def bench_log(repeticoes, com_tk):
+    resultados = {}
+    mensagem = "📈 Tendência de ALTA detectada para EURUSD - Aguardando confirmação"
+
+    # logar() only queues; drenar() is what the UI frame runs on the Tk thread
+    def logar_e_drenar(sistema, asset=None):
+        sistema.logar(mensagem, asset)
+        sistema.drenar()
+
+    log = LogSystem()
+    log.add_log_widget('asset_0', DummyText())
+    resultados['log.logar.dummy'] = medir(lambda: logar_e_drenar(log, 'asset_0'), repeticoes)
+    for i in range(1, 4):
+        log.add_log_widget(f'asset_{i}', DummyText())
+    resultados['log.logar.dummy_broadcast4'] = medir(lambda: logar_e_drenar(log), repeticoes)
+
+    if com_tk:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        log_tk = LogSystem()
+        log_tk.add_log_widget('asset_0', tk.Text(root))
+        resultados['log.logar.tk'] = medir(lambda: logar_e_drenar(log_tk, 'asset_0'), repeticoes)
+        root.destroy()
+    return resultados
+
+
+def bench_asset_manager(n_symbols, repeticoes):
+    # Mede o custo do refresh, não o orçamento de chamadas de UI do portão
+    controlador_mt5.definir_limites({prioridade: 1e9 for prioridade in controlador_mt5.limites})
+    manager = AssetManager()
+    nomes = list(terminal.symbols)[:n_symbols]
+    for nome in nomes:
+        manager.add_asset(nome)
+
+    def atualizar_todos():
+        for nome in nomes:
+            manager.update_asset_status(nome)
+
+    return {f'asset_manager.refresh.{n_symbols}': medir(atualizar_todos, repeticoes)}
+
+
+def bench_tema(repeticoes):
+    import tkinter as tk
+    from painel import PainelApp
+
+    root = tk.Tk()
+    root.withdraw()
+    app = PainelApp(root)
+    root.update()
+    resultado = {'painel.toggle_theme': medir(app.toggle_theme, repeticoes)}
+    root.destroy()
+    return resultado
+
+
+def tk_disponivel():
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+        return False
+    try:
+        import tkinter as tk
+        tk.Tk().destroy()
+        return True
+    except Exception:
+        return False
+
+
+def comparar(atual, base, limite, limites_bench):
+    """Retorna a lista de regressões (mediana acima do limite relativo à execução base)"""
+    regressoes = []
+    for nome, dados in atual['resultados'].items():
+        anterior = base['resultados'].get(nome)
+        if not anterior:
+            continue
+        variacao = dados['mediana_us'] / anterior['mediana_us'] - 1
+        limite_nome = limites_bench.get(nome, limite)
+        marca = '❌' if variacao > limite_nome else '✅'
+        print(f"{marca} {nome:40s} {anterior['mediana_us']:12.1f} -> {dados['mediana_us']:12.1f} us ({variacao:+.1%})")
+        if variacao > limite_nome:
+            regressoes.append(nome)
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos críticos do Future MT5")
+    parser.add_argument('--saida', default='bench_resultados.json', help="Arquivo JSON de resultados")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument('--limite', type=float, default=0.25, help="Regressão máxima aceita (0.25 = +25%%)")
+    parser.add_argument('--limite-bench', action='append', default=[], metavar='NOME=LIMITE',
+                        help="Limite específico por benchmark (pode repetir)")
+    parser.add_argument('--filtro', default='', help="Executa apenas benchmarks cujo nome contém o texto")
+    parser.add_argument('--repeticoes', type=int, default=200)
+    parser.add_argument('--barras', type=int, default=200, help="Barras por série nos indicadores")
+    parser.add_argument('--symbols', type=int, default=100, help="Ativos no refresh do AssetManager")
+    args = parser.parse_args()
+
+    # O ciclo da estratégia atualiza o livro de P&L, que grava no diretório atual: roda em um diretório temporário
+    args.saida = os.path.abspath(args.saida)
+    if args.comparar:
+        args.comparar = os.path.abspath(args.comparar)
+    os.chdir(tempfile.mkdtemp(prefix='bench_'))
+
+    com_tk = tk_disponivel()
+    grupos = [
+        ('indicador', lambda: bench_indicadores(args.barras, args.repeticoes)),
+        ('estrategia', lambda: bench_ciclo(max(args.repeticoes // 4, 10))),
+        ('ring_buffer', lambda: bench_buffer(args.repeticoes)),
+        ('log', lambda: bench_log(args.repeticoes * 10, com_tk)),
+        ('asset_manager', lambda: bench_asset_manager(args.symbols, max(args.repeticoes // 10, 5))),
+    ]
+    if com_tk:
+        grupos.append(('painel', lambda: bench_tema(max(args.repeticoes // 10, 5))))
+    else:
+        print("ℹ️ Sem display: benchmarks com Tk reais foram ignorados")
+
+    resultados = {}
+    for prefixo, executar in grupos:
+        if args.filtro and args.filtro not in prefixo:
+            continue
+        for nome, dados in executar().items():
+            if args.filtro and args.filtro not in nome:
+                continue
+            resultados[nome] = dados
+            print(f"{nome:40s} mediana {dados['mediana_us']:12.1f} us   p95 {dados['p95_us']:12.1f} us")
+
+    atual = {
+        'meta': {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'plataforma': platform.platform(),
+            'repeticoes': args.repeticoes,
+            'barras': args.barras,
+            'symbols': args.symbols,
+        },
+        'resultados': resultados,
+    }
+    with open(args.saida, 'w') as f:
+        json.dump(atual, f, indent=2)
+    print(f"💾 Resultados salvos em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            base = json.load(f)
+        limites_bench = {}
+        for item in args.limite_bench:
+            nome, _, valor = item.partition('=')
+            limites_bench[nome] = float(valor)
+        regressoes = comparar(atual, base, args.limite, limites_bench)
+        if regressoes:
+            print(f"❌ {len(regressoes)} regressão(ões): {', '.join(regressoes)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
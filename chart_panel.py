@@ -0,0 +1,257 @@
+import tkinter as tk
+from collections import deque
+
+import numpy as np
+
+from regras import ema, bb_superior, bb_inferior
+
+# Série -> papel de cor do tema
+PAPEIS_SERIES = {
+    'close': 'text',
+    'ema_rapida': 'accent',
+    'ema_media': 'warning',
+    'bb_superior': 'text_secondary',
+    'bb_inferior': 'text_secondary',
+}
+
+
+class DadosGrafico:
+    """Cópia das séries de uma estratégia para o gráfico (comparada por identidade no EstadoUI)"""
+
+    __slots__ = ('ativo', 'tempos', 'series', 'marcadores')
+
+    def __init__(self, ativo, tempos, series, marcadores):
+        self.ativo = ativo
+        self.tempos = tempos
+        self.series = series
+        self.marcadores = marcadores  # [(tempo da barra, preço, compra?)]
+
+    @classmethod
+    def da_estrategia(cls, estrategia):
+        """Copia (sob o lock da estratégia) as barras do buffer e calcula EMAs e Bollinger"""
+        with estrategia.lock:
+            if len(estrategia.barras) == 0:
+                return None
+            tempos = estrategia.barras.ultimas('time').copy()
+            close = estrategia.barras.ultimas('close').copy()
+            marcadores = list(estrategia.marcadores)
+        with np.errstate(invalid='ignore'):
+            series = {
+                'close': close,
+                'ema_rapida': ema(close, estrategia.ema_rapida),
+                'ema_media': ema(close, estrategia.ema_media),
+                'bb_superior': bb_superior(close, 20, estrategia.bb_desvio),
+                'bb_inferior': bb_inferior(close, 20, estrategia.bb_desvio),
+            }
+        return cls(estrategia.ativo, tempos, series, marcadores)
+
+
+def reduzir_min_max(valores, colunas):
+    """Índices que preservam o mínimo e o máximo de cada coluna de pixels, em ordem temporal"""
+    n = len(valores)
+    if n <= 2 * colunas:
+        return np.arange(n)
+    inicios = np.linspace(0, n, colunas, endpoint=False).astype(np.int64)
+    fins = np.append(inicios[1:], n)
+    blocos = np.repeat(np.arange(colunas), fins - inicios)
+    ordem_min = np.lexsort((valores, blocos))
+    ordem_max = np.lexsort((-valores, blocos))
+    minimos = ordem_min[inicios]
+    maximos = ordem_max[inicios]
+    return np.unique(np.concatenate(([0], minimos, maximos, [n - 1])))
+
+
+class GraficoAtivo:
+    """Gráfico de preço, EMAs, Bollinger e operações em um Canvas, com atualização incremental.
+
+    A carga inicial desenha uma linha por série (reduzida por min/max à largura em pixels);
+    depois cada barra nova vira um segmento por série, a barra em formação só tem as
+    coordenadas do último segmento alteradas e mudanças de escala usam Canvas.scale/move. A escala
+    só se amplia incrementalmente; quando um extremo sai da janela e a faixa fica larga demais para
+    os pontos visíveis, o gráfico é recarregado com a faixa recalculada.
+    """
+
+    def __init__(self, parent, colors, largura=420, altura=110, pontos_visiveis=200, fator_compressao=1.5):
+        self.largura = largura
+        self.altura = altura
+        self.pontos_visiveis = pontos_visiveis
+        self.fator_compressao = fator_compressao  # Faixa atual / faixa necessária acima disso: recarrega
+        self.passo = largura / pontos_visiveis
+        self.colors = colors
+        self.canvas = tk.Canvas(parent, width=largura, height=altura, bg=colors['bg_medium'],
+                                highlightthickness=0)
+        self._limpar_estado()
+
+    def _limpar_estado(self):
+        self.ativo = None
+        self._ymin = self._ymax = None
+        self._ultimo_tempo = None
+        self._ultimo_x = 0.0
+        self._ultimo = {}  # série -> valor no ponto mais recente
+        self._segmentos = deque()  # Itens dos segmentos incrementais, um grupo por barra
+        self._linhas_iniciais = {}  # série -> item da carga inicial
+        self._marcados = set()
+        self._itens_marcadores = deque()  # (chave, item) na ordem em que foram desenhados
+
+    # ---- escala -------------------------------------------------------------------------------
+
+    def _y(self, valor):
+        return (self._ymax - valor) / (self._ymax - self._ymin) * self.altura
+
+    def _definir_faixa(self, minimo, maximo):
+        margem = (maximo - minimo) * 0.1 or abs(maximo) * 0.001 or 1.0
+        return minimo - margem, maximo + margem
+
+    def _garantir_faixa(self, valores):
+        """Amplia a escala vertical se necessário, transformando os itens existentes sem redesenhar"""
+        validos = [v for v in valores if not np.isnan(v)]
+        if not validos or (min(validos) >= self._ymin and max(validos) <= self._ymax):
+            return
+        ymin, ymax = self._definir_faixa(min(min(validos), self._ymin), max(max(validos), self._ymax))
+        # y' = a * y + b para a nova faixa
+        a = (self._ymax - self._ymin) / (ymax - ymin)
+        b = (ymax - self._ymax) / (ymax - ymin) * self.altura
+        self.canvas.scale('dados', 0, 0, 1, a)
+        self.canvas.move('dados', 0, b)
+        self._ymin, self._ymax = ymin, ymax
+
+    def _faixa_excessiva(self, dados):
+        """A faixa atual é bem maior que a dos pontos e marcadores ainda visíveis (o extremo que a
+        ampliou já saiu da janela)"""
+        n = min(len(dados.tempos), self.pontos_visiveis)
+        todos = np.concatenate([valores[-n:] for valores in dados.series.values()]
+                               + [[preco for tempo, preco, _ in dados.marcadores if tempo >= dados.tempos[-n]]])
+        todos = todos[~np.isnan(todos)]
+        if len(todos) == 0:
+            return False
+        ymin, ymax = self._definir_faixa(float(todos.min()), float(todos.max()))
+        return (ymax - ymin) * self.fator_compressao < self._ymax - self._ymin
+
+    # ---- desenho ------------------------------------------------------------------------------
+
+    def carregar(self, dados):
+        """Desenho completo (primeira vez ou troca de ativo)"""
+        self.canvas.delete('dados')
+        self._limpar_estado()
+        self.ativo = dados.ativo
+
+        n = min(len(dados.tempos), self.pontos_visiveis)
+        series = {nome: valores[-n:] for nome, valores in dados.series.items()}
+        todos = np.concatenate(list(series.values()))
+        todos = todos[~np.isnan(todos)]
+        if len(todos) == 0:
+            return
+        self._ymin, self._ymax = self._definir_faixa(float(todos.min()), float(todos.max()))
+
+        x = np.arange(n) * self.passo
+        for nome, valores in series.items():
+            validos = np.flatnonzero(~np.isnan(valores))
+            if len(validos) < 2:
+                continue
+            indices = validos[reduzir_min_max(valores[validos], self.largura)]
+            coordenadas = np.column_stack((x[indices], self._y(valores[indices]))).ravel().tolist()
+            self._linhas_iniciais[nome] = self.canvas.create_line(
+                *coordenadas, fill=self.colors[PAPEIS_SERIES[nome]], width=1, tags=('dados', nome))
+
+        self._ultimo_tempo = int(dados.tempos[-1])
+        self._ultimo_x = float(x[-1])
+        self._ultimo = {nome: float(valores[-1]) for nome, valores in series.items()}
+        self._desenhar_marcadores(dados)
+
+    def atualizar(self, dados):
+        """Aplica só o que mudou: a barra em formação e as barras novas"""
+        if dados is None or len(dados.tempos) == 0:
+            return
+        if self.ativo != dados.ativo or self._ultimo_tempo is None or dados.tempos[0] > self._ultimo_tempo:
+            self.carregar(dados)
+            return
+
+        posicao = int(np.searchsorted(dados.tempos, self._ultimo_tempo))
+        if posicao < len(dados.tempos) and dados.tempos[posicao] == self._ultimo_tempo:
+            self._mover_ultimo({nome: float(v[posicao]) for nome, v in dados.series.items()})
+            posicao += 1
+        for i in range(posicao, len(dados.tempos)):
+            self._adicionar_ponto(int(dados.tempos[i]), {nome: float(v[i]) for nome, v in dados.series.items()})
+        # Só quando a janela andou (barra nova) um extremo pode ter saído dela
+        if posicao < len(dados.tempos) and self._faixa_excessiva(dados):
+            self.carregar(dados)
+            return
+        self._desenhar_marcadores(dados)
+
+    def _mover_ultimo(self, valores):
+        """Barra em formação: altera só a ponta de cada série"""
+        self._garantir_faixa(valores.values())
+        for nome, valor in valores.items():
+            if np.isnan(valor):
+                continue
+            y = self._y(valor)
+            if self._segmentos and nome in self._segmentos[-1]:
+                item = self._segmentos[-1][nome]
+                x0, y0 = self.canvas.coords(item)[:2]
+                self.canvas.coords(item, x0, y0, self._ultimo_x, y)
+            elif nome in self._linhas_iniciais:
+                item = self._linhas_iniciais[nome]
+                coordenadas = self.canvas.coords(item)
+                coordenadas[-1] = y
+                self.canvas.coords(item, *coordenadas)
+        self._ultimo = valores
+
+    def _adicionar_ponto(self, tempo, valores):
+        self._garantir_faixa(valores.values())
+        x = self._ultimo_x + self.passo
+        if x > self.largura:
+            # Janela cheia: rola tudo um passo para a esquerda e descarta o que saiu da tela
+            self.canvas.move('dados', -self.passo, 0)
+            x -= self.passo
+            self._ultimo_x -= self.passo
+            while len(self._segmentos) >= self.pontos_visiveis:
+                for item in self._segmentos.popleft().values():
+                    self.canvas.delete(item)
+            while self._itens_marcadores and self.canvas.coords(self._itens_marcadores[0][1])[0] < 0:
+                chave, item = self._itens_marcadores.popleft()
+                self.canvas.delete(item)
+                self._marcados.discard(chave)
+            for nome, item in list(self._linhas_iniciais.items()):
+                caixa = self.canvas.bbox(item)
+                if caixa is None or caixa[2] < 0:
+                    self.canvas.delete(item)
+                    del self._linhas_iniciais[nome]
+
+        segmento = {}
+        for nome, valor in valores.items():
+            anterior = self._ultimo.get(nome, float('nan'))
+            if np.isnan(valor) or np.isnan(anterior):
+                continue
+            segmento[nome] = self.canvas.create_line(
+                self._ultimo_x, self._y(anterior), x, self._y(valor),
+                fill=self.colors[PAPEIS_SERIES[nome]], width=1, tags=('dados', nome))
+        self._segmentos.append(segmento)
+        self._ultimo = valores
+        self._ultimo_x = x
+        self._ultimo_tempo = tempo
+
+    def _desenhar_marcadores(self, dados):
+        for tempo, preco, compra in dados.marcadores:
+            chave = (tempo, compra)
+            if chave in self._marcados:
+                continue
+            barras_atras = int(np.count_nonzero(dados.tempos > tempo))
+            x = self._ultimo_x - barras_atras * self.passo
+            if x < 0:
+                continue
+            self._garantir_faixa([preco])
+            item = self.canvas.create_text(
+                x, self._y(preco), text="▲" if compra else "▼", font=("Helvetica", 8),
+                fill=self.colors['accent' if compra else 'danger'],
+                tags=('dados', 'marcador_compra' if compra else 'marcador_venda'))
+            self._marcados.add(chave)
+            self._itens_marcadores.append((chave, item))
+
+    def aplicar_cores(self, colors):
+        """Troca de tema: recolore por tag, sem redesenhar"""
+        self.colors = colors
+        self.canvas.configure(bg=colors['bg_medium'])
+        for nome, papel in PAPEIS_SERIES.items():
+            self.canvas.itemconfigure(nome, fill=colors[papel])
+        self.canvas.itemconfigure('marcador_compra', fill=colors['accent'])
+        self.canvas.itemconfigure('marcador_venda', fill=colors['danger'])
@@ -0,0 +1,149 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+
+from mt5_gate import cliente_mt5, PRIORIDADE_DADOS
+
+mt5 = cliente_mt5(PRIORIDADE_DADOS)
+
+
+class SupervisorConexao:
+    """Vigia a saúde do terminal, reconecta com backoff e pausa/retoma as estratégias em conjunto"""
+
+    def __init__(self, intervalo=1.0, backoff_inicial=1.0, backoff_maximo=60.0):
+        self.intervalo = intervalo  # Segundos entre sondagens (uma chamada terminal_info)
+        self.backoff_inicial = backoff_inicial
+        self.backoff_maximo = backoff_maximo
+        self.log_system = None
+        self._credenciais = None
+        self._conectado = threading.Event()
+        self._conectado.set()  # O login só abre o painel depois de conectar
+        self._parar = threading.Event()
+        self._monitoring = False
+        self._monitor_thread = None
+        self._ao_reconectar = []  # Callbacks de recuperação (catch-up incremental)
+        self.quedas = deque(maxlen=200)  # Histórico de quedas e recuperações
+
+    def definir_credenciais(self, server, login, password):
+        """Guarda as credenciais usadas no login para as reconexões"""
+        self._credenciais = {'server': server, 'login': int(login), 'password': password}
+
+    def ao_reconectar(self, callback):
+        """Registra uma função chamada após cada reconexão, antes de liberar as estratégias"""
+        self._ao_reconectar.append(callback)
+
+    def conectado(self):
+        return self._conectado.is_set()
+
+    def aguardar_conexao(self, timeout=None):
+        """Bloqueia enquanto o terminal estiver fora; retorna True se a conexão voltou"""
+        return self._conectado.wait(timeout)
+
+    def start_monitoring(self):
+        """Inicia a supervisão da conexão em background"""
+        if self._monitoring:
+            return
+        self._monitoring = True
+        self._parar.clear()
+        self._monitor_thread = threading.Thread(target=self._monitor_connection, daemon=True)
+        self._monitor_thread.start()
+
+    def stop_monitoring(self):
+        self._monitoring = False
+        self._parar.set()
+        if self._monitor_thread:
+            self._monitor_thread.join()
+            self._monitor_thread = None
+
+    def _logar(self, mensagem):
+        if self.log_system:
+            self.log_system.logar(mensagem)
+
+    def sondar(self):
+        """Sondagem barata: o terminal responde e está conectado ao servidor da corretora"""
+        try:
+            info = mt5.terminal_info()
+        except Exception:
+            return False
+        return info is not None and bool(info.connected)
+
+    def _monitor_connection(self):
+        while self._monitoring:
+            if not self.sondar():
+                self._recuperar()
+            self._parar.wait(self.intervalo)
+
+    def _espera_backoff(self, tentativa):
+        """Backoff exponencial com jitter completo (evita reconexões sincronizadas)"""
+        return random.uniform(0, min(self.backoff_maximo, self.backoff_inicial * 2 ** tentativa))
+
+    def _reconectar(self):
+        if self._credenciais is None:
+            return False
+        try:
+            # Sem resposta do terminal a conexão IPC caiu: reinicializa com as credenciais do login
+            if mt5.terminal_info() is None:
+                mt5.shutdown()
+                if not mt5.initialize(**self._credenciais):
+                    return False
+        except Exception:
+            return False
+        return self.sondar()
+
+    def _recuperar(self):
+        """Pausa as estratégias, reconecta com backoff e faz o catch-up antes de liberá-las"""
+        self._conectado.clear()
+        inicio = time.monotonic()
+        inicio_epoch = time.time()
+        self._logar(f"⚠️ AVISO: conexão com o MetaTrader 5 perdida ({mt5.last_error()}). Estratégias pausadas")
+
+        tentativa = 0
+        while self._monitoring:
+            if self._parar.wait(self._espera_backoff(tentativa)):
+                return
+            tentativa += 1
+            if self._reconectar():
+                break
+            self._logar(f"🔄 Tentativa de reconexão {tentativa} falhou")
+        else:
+            return
+
+        reconectado = time.monotonic()
+        for callback in self._ao_reconectar:
+            try:
+                callback()
+            except Exception as e:
+                self._logar(f"❌ Erro no catch-up após reconexão: {e}")
+        fim = time.monotonic()
+
+        self.quedas.append({
+            'inicio': inicio_epoch,
+            'queda_s': reconectado - inicio,
+            'recuperacao_s': fim - reconectado,
+            'tentativas': tentativa,
+        })
+        self._conectado.set()
+        self._logar(f"✅ Conexão restabelecida após {reconectado - inicio:.1f}s "
+                    f"({tentativa} tentativas, catch-up em {fim - reconectado:.2f}s). Estratégias retomadas")
+
+    def estatisticas(self):
+        """Resumo das quedas registradas (durações em segundos)"""
+        quedas = list(self.quedas)
+        return {
+            'quedas': len(quedas),
+            'queda_total_s': sum(q['queda_s'] for q in quedas),
+            'queda_max_s': max((q['queda_s'] for q in quedas), default=0.0),
+            'recuperacao_max_s': max((q['recuperacao_s'] for q in quedas), default=0.0),
+            'historico': quedas,
+        }
+
+    def exportar(self, caminho):
+        """Grava o histórico de quedas em JSON"""
+        with open(caminho, 'w') as f:
+            json.dump(self.estatisticas(), f, indent=2)
+
+
+# Create global connection supervisor instance
+supervisor_conexao = SupervisorConexao()
@@ -1,9 +1,63 @@
-import MetaTrader5 as mt5
+from mt5_gate import cliente_mt5, PRIORIDADE_DADOS
 import numpy as np
 import pandas as pd
-import time
 import threading
-from datetime import datetime
+import time
+from collections import deque
+from datetime import datetime, time as dtime, timedelta, timezone
+from multi_timeframe import obter_feed, segundos_resolucao, TIMEFRAMES_MT5
+from position_manager import gerenciador_posicoes
+from pnl_ledger import livro_pnl
+from journal import journal
+from market_calendar import obter_calendario
+from utils import MAGIC_NUMBER, asset_manager
+from connection_supervisor import supervisor_conexao
+from ring_buffer import BufferBarras
+from regras import ConjuntoRegras
+from snapshot import gerenciador_snapshot
+from order_router import roteador_ordens, RETCODE_COMPENSADA
+from position_index import indice_posicoes
+from tick_features import fluxo_ticks
+from event_bus import barramento, TOPICO_TICK, TOPICO_EXECUCAO, EventoExecucao, POLITICA_ULTIMO
+
+mt5 = cliente_mt5(PRIORIDADE_DADOS)
+
+# Janela de horário favorável (horário do servidor), fora dela não há novas entradas
+HORARIO_INICIO = dtime(9, 30)
+HORARIO_FIM = dtime(16, 30)
+
+
+# Regras de entrada (ver regras.py). Os nomes livres são atributos da estratégia, então mudar
+# um parâmetro (ou otimizá-lo no walk-forward) não exige recompilar.
+REGRAS_PADRAO = {
+    'tendencia_alta': "ema(close, ema_rapida) > ema(close, ema_media) and close > ema(close, ema_rapida)"
+                      " and ema(close, ema_rapida) > ema(close, ema_rapida)[1]",
+    'tendencia_baixa': "ema(close, ema_rapida) < ema(close, ema_media) and close < ema(close, ema_rapida)"
+                       " and ema(close, ema_rapida) < ema(close, ema_rapida)[1]",
+    'macd_compra': "macd(close, macd_rapido, macd_lento) > sinal_macd(close, macd_rapido, macd_lento, macd_sinal)"
+                   " and macd(close, macd_rapido, macd_lento) > macd(close, macd_rapido, macd_lento)[1]",
+    'macd_venda': "macd(close, macd_rapido, macd_lento) < sinal_macd(close, macd_rapido, macd_lento, macd_sinal)"
+                  " and macd(close, macd_rapido, macd_lento) < macd(close, macd_rapido, macd_lento)[1]",
+    'rsi_compra': "rsi(close, 14) < rsi_sobrevendido and rsi(close, 14) > rsi(close, 14)[1]",
+    'rsi_venda': "rsi(close, 14) > rsi_sobrecomprado and rsi(close, 14) < rsi(close, 14)[1]",
+    'bb_compra': "close < bb_inferior(close, 20, bb_desvio)",  # Preço abaixo da banda inferior
+    'bb_venda': "close > bb_superior(close, 20, bb_desvio)",  # Preço acima da banda superior
+    'stoch_compra': "stoch(high, low, close, stoch_period) < 20"  # Estocástico subindo do sobrevendido
+                    " and stoch(high, low, close, stoch_period) > stoch(high, low, close, stoch_period)[1]",
+    'stoch_venda': "stoch(high, low, close, stoch_period) > 80"  # Estocástico caindo do sobrecomprado
+                   " and stoch(high, low, close, stoch_period) < stoch(high, low, close, stoch_period)[1]",
+    'momentum_compra': "momentum(close, 10) > 0",
+    'momentum_venda': "momentum(close, 10) < 0",
+    'volume_alto': "volume > media(volume, 20) * volume_threshold",
+    'votos_compra': "contar(tendencia_alta, macd_compra, rsi_compra, bb_compra, stoch_compra, momentum_compra)",
+    'votos_venda': "contar(tendencia_baixa, macd_venda, rsi_venda, bb_venda, stoch_venda, momentum_venda)",
+    'compra': "votos_compra >= 2 and volume_alto",
+    'venda': "votos_venda >= 2 and volume_alto",
+    'atr_atual': "atr(high, low, close, atr_period)",
+}
+CONDICOES_COMPRA = ('tendencia_alta', 'macd_compra', 'rsi_compra', 'bb_compra', 'stoch_compra', 'momentum_compra')
+CONDICOES_VENDA = ('tendencia_baixa', 'macd_venda', 'rsi_venda', 'bb_venda', 'stoch_venda', 'momentum_venda')
+REGRAS_COMPILADAS = ConjuntoRegras(REGRAS_PADRAO)
 
 
 class EstrategiaTrading:
@@ -14,8 +68,19 @@ class EstrategiaTrading:
         self.operando = True
         self.log_system = log_system
         self.ticket_atual = None
+        self.id_estrategia = f"{ativo}|{self.timeframe}"  # Dono das posições no índice
+        self.segundos_barra = segundos_resolucao(
+            next((nome for nome, tf in TIMEFRAMES_MT5.items() if tf == self.timeframe), 'M5'))
         self.lock = threading.Lock()
+        self.evento_parada = threading.Event()  # Acorda a estratégia estacionada ao parar
+        self.estacionada = False
+        self.assinatura_mercado = None  # Ticks do ativo (barramento de eventos), enquanto executa
+        self.espera_mercado_max = 60  # Mercado parado: reanalisa ao menos uma vez por minuto
         self.last_analysis_time = None
+        self.symbol_info = None  # Cached mt5.symbol_info (point/digits do not change)
+        self.barras = BufferBarras(200)  # Histórico preenchido uma vez; depois só as barras novas
+        self.marcadores = deque(maxlen=100)  # (barra, preço, compra?) das ordens executadas, para o gráfico
+        self.regras = REGRAS_COMPILADAS  # Sem estado: o mesmo conjunto compilado serve a todas as estratégias
         self.min_time_between_trades = 60  # Minimum seconds between trades
 
         # Parâmetros otimizados para mais sinais
@@ -32,12 +97,19 @@ class EstrategiaTrading:
         self.macd_lento = 26
         self.macd_sinal = 9
 
+        # Confirmação em timeframes superiores (ex.: ["H1", "H4"]), derivados de uma única série M1
+        self.timeframes_confirmacao = []
+
         # Parâmetros de gestão de risco balanceados
         self.max_daily_loss = 3.0  # Stop diário mais conservador
         self.min_rr_ratio = 1.2  # Risk/Reward mais agressivo
         self.max_positions = 3  # Limitar posições por ativo
         self.trailing_stop = True
         self.breakeven_level = 0.3  # Breakeven mais rápido
+        self.spread_maximo = 50  # Spread máximo absoluto (pontos) para enviar ordens
+        self.spread_multiplo_mediana = 2.0  # Bloqueia acima do p95 e deste múltiplo da mediana recente
+        self.usar_volatilidade_ticks = True  # Stops pelo maior entre o ATR e a amplitude esperada pelos ticks
+        self.desequilibrio_maximo = 0.6  # Não entra contra um fluxo de ticks tão unilateral (0 a 1)
 
     def converter_timeframe(self, tf):
         mapping = {
@@ -53,20 +125,74 @@ class EstrategiaTrading:
 
     def executar(self):
         self.log_system.logar(f"🚀 Iniciando estratégia para {self.ativo}", self.ativo)
+        try:
+            gerenciador_snapshot.restaurar(self)  # Warm start: barras e estado da última execução
+        except Exception as e:
+            self.log_system.logar(f"⚠️ Snapshot ignorado para {self.ativo}: {str(e)}", self.ativo)
+        # Só o último tick interessa: basta saber que o mercado mudou desde a última análise
+        self.assinatura_mercado = barramento.assinar(TOPICO_TICK, capacidade=1, politica=POLITICA_ULTIMO,
+                                                     filtro=lambda evento: evento.ativo == self.ativo)
         while self.operando:
             try:
+                if self.aguardar_reconexao():
+                    continue
+                if self.estacionar_se_fechado():
+                    continue
                 with self.lock:
                     self.analisar_e_operar()
-                time.sleep(5)
+                if fluxo_ticks.acompanhando(self.ativo):
+                    self.aguardar_mercado()  # Reage ao próximo tick
+                else:
+                    self.evento_parada.wait(5)  # Sem ticks pelo barramento: consulta periódica
             except Exception as e:
                 self.log_system.logar(f"❌ Erro na estratégia: {str(e)}", self.ativo)
-                time.sleep(10)
+                self.evento_parada.wait(10)
+        barramento.cancelar(self.assinatura_mercado)
+        gerenciador_snapshot.remover(self)
 
     def parar(self):
         with self.lock:
             self.operando = False
+            self.evento_parada.set()
+            if self.assinatura_mercado is not None:
+                self.assinatura_mercado.encerrar()  # Acorda a espera por ticks
             self.log_system.logar(f"🛑 Parando estratégia para {self.ativo}", self.ativo)
 
+    def aguardar_mercado(self):
+        """Dorme até o próximo tick do ativo (barramento) em vez de reanalisar sem mudança"""
+        if self.operando:
+            self.assinatura_mercado.aguardar(timeout=self.espera_mercado_max)
+
+    def aguardar_reconexao(self):
+        """Com o terminal fora, pausa junto com as demais estratégias até o supervisor reconectar"""
+        if supervisor_conexao.conectado():
+            return False
+        self.log_system.logar(f"⏸️ Estratégia de {self.ativo} pausada: aguardando reconexão ao MT5", self.ativo)
+        while self.operando and not supervisor_conexao.aguardar_conexao(timeout=1):
+            pass
+        if self.operando:
+            self.log_system.logar(f"▶️ Estratégia de {self.ativo} retomada", self.ativo)
+        return True
+
+    def estacionar_se_fechado(self):
+        """Com o mercado fechado, dorme até a próxima sessão sem CPU nem chamadas ao terminal"""
+        calendario = obter_calendario(self.ativo)
+        segundos = calendario.segundos_ate_abrir()
+        if not segundos:
+            self.estacionada = False
+            return False
+
+        if not self.estacionada:
+            abertura = datetime.fromtimestamp(calendario.proxima_abertura(), timezone.utc)
+            self.log_system.logar(
+                f"💤 Mercado de {self.ativo} fechado. Estratégia estacionada até {abertura:%d/%m %H:%M} (servidor)",
+                self.ativo)
+            self.estacionada = True
+        # Não dorme além da validade do calendário (offset provisório, mudança de horário): ao acordar,
+        # o laço consulta de novo a sessão com o calendário reconstruído
+        self.evento_parada.wait(max(1.0, min(segundos, calendario.valido_ate - time.monotonic())))
+        return True
+
     def analisar_e_operar(self):
         try:
             # Check if enough time has passed since last trade
@@ -77,185 +203,168 @@ class EstrategiaTrading:
             if self.operando:
                 self.log_system.logar(f"🔍 Iniciando análise de mercado para {self.ativo}", self.ativo)
 
-            barras = mt5.copy_rates_from_pos(self.ativo, self.timeframe, 0, 200)
-            if barras is None or len(barras) < 100:
+            if self.sincronizar_barras() < 100:
                 self.log_system.logar(f"❌ Erro: Não foi possível carregar velas de {self.ativo}", self.ativo)
                 return
 
-            df = pd.DataFrame(barras)
-            if df.isnull().any().any():
+            # Visões sem cópia das colunas do buffer
+            dados = self.dados_regras()
+            if np.isnan(dados['close']).any() or np.isnan(dados['high']).any() or np.isnan(dados['low']).any():
                 self.log_system.logar(f"❌ Erro: Dados inválidos para {self.ativo}", self.ativo)
                 return
 
-            # Cálculos básicos
-            try:
-                close = df['close'].values
-                high = df['high'].values
-                low = df['low'].values
-                volume = df['tick_volume'].values
-
-                if len(close) < 50:
-                    self.log_system.logar(f"❌ Erro: Dados insuficientes para {self.ativo}", self.ativo)
-                    return
-
-                # Indicadores principais
-                try:
-                    ema9 = self.ema(close, self.ema_rapida)
-                    ema21 = self.ema(close, self.ema_media)
-                    ema50 = self.ema(close, self.ema_lenta)
-
-                    macd_line, signal_line = self.macd(close, self.macd_rapido, self.macd_lento, self.macd_sinal)
-                    rsi_valores = self.rsi(close, 14)
-                    bb_superior, bb_medio, bb_inferior = self.bollinger_bands(close, 20, self.bb_desvio)
-                    stoch_k, stoch_d = self.stochastic(high, low, close, self.stoch_period)
-                    atr = self.atr(high, low, close, self.atr_period)
-                    momentum = self.momentum(close, 10)
-
-                    # Verificar indicadores
-                    if any(map(np.isnan, [ema9[-1], ema21[-1], ema50[-1], macd_line[-1], rsi_valores[-1]])):
-                        self.log_system.logar(f"❌ Erro: Indicadores com valores inválidos para {self.ativo}", self.ativo)
-                        return
-
-                    # Volume analysis
-                    volume_ma = float(np.mean(volume[-20:]))
-                    volume_atual = float(volume[-1])
-                    volume_alto = bool(volume_atual > (volume_ma * self.volume_threshold))
-
-                    # Análise de sinais
-                    try:
-                        # Tendência
-                        tendencia_alta = bool(np.all([
-                            float(ema9[-1]) > float(ema21[-1]),
-                            float(close[-1]) > float(ema9[-1]),
-                            float(ema9[-1]) > float(ema9[-2])
-                        ]))
-
-                        tendencia_baixa = bool(np.all([
-                            float(ema9[-1]) < float(ema21[-1]),
-                            float(close[-1]) < float(ema9[-1]),
-                            float(ema9[-1]) < float(ema9[-2])
-                        ]))
-
-                        # RSI
-                        rsi_compra = bool(np.all([
-                            float(rsi_valores[-1]) < self.rsi_sobrevendido,
-                            float(rsi_valores[-1]) > float(rsi_valores[-2])
-                        ]))
-
-                        rsi_venda = bool(np.all([
-                            float(rsi_valores[-1]) > self.rsi_sobrecomprado,
-                            float(rsi_valores[-1]) < float(rsi_valores[-2])
-                        ]))
-
-                        # MACD
-                        macd_compra = bool(np.all([
-                            float(macd_line[-1]) > float(signal_line[-1]),
-                            float(macd_line[-1]) > float(macd_line[-2])
-                        ]))
-
-                        macd_venda = bool(np.all([
-                            float(macd_line[-1]) < float(signal_line[-1]),
-                            float(macd_line[-1]) < float(macd_line[-2])
-                        ]))
-
-                        # Sinais de compra mais flexíveis
-                        condicoes_compra = [
-                            tendencia_alta,  # Tendência de alta
-                            macd_compra,  # MACD positivo
-                            rsi_compra,  # RSI sobrevendido
-                            float(close[-1]) < float(bb_inferior[-1]),  # Preço abaixo da banda inferior
-                            float(stoch_k[-1]) < 20 and float(stoch_k[-1]) > float(stoch_k[-2]),
-                            # Estocástico subindo do sobrevendido
-                            float(momentum[-1]) > 0  # Momentum positivo
-                        ]
-
-                        sinal_compra = bool(
-                            sum(condicoes_compra) >= 2 and  # Pelo menos 2 condições técnicas
-                            volume_alto and  # Volume suficiente
-                            self.verificar_horario_favoravel() and  # Horário adequado
-                            self.verificar_risco_posicao()  # Gestão de risco ok
-                        )
-
-                        # Sinais de venda mais flexíveis
-                        condicoes_venda = [
-                            tendencia_baixa,  # Tendência de baixa
-                            macd_venda,  # MACD negativo
-                            rsi_venda,  # RSI sobrecomprado
-                            float(close[-1]) > float(bb_superior[-1]),  # Preço acima da banda superior
-                            float(stoch_k[-1]) > 80 and float(stoch_k[-1]) < float(stoch_k[-2]),
-                            # Estocástico caindo do sobrecomprado
-                            float(momentum[-1]) < 0  # Momentum negativo
-                        ]
-
-                        sinal_venda = bool(
-                            sum(condicoes_venda) >= 2 and  # Pelo menos 2 condições técnicas
-                            volume_alto and  # Volume suficiente
-                            self.verificar_horario_favoravel() and  # Horário adequado
-                            self.verificar_risco_posicao()  # Gestão de risco ok
-                        )
-
-                        # Logs de sinais
-                        if tendencia_alta and self.operando:
-                            self.log_system.logar(f"📈 Tendência de ALTA detectada para {self.ativo} - Aguardando confirmação", self.ativo)
-                            if macd_compra or rsi_compra:
-                                self.log_system.logar(f"🎯 Confirmação técnica positiva para {self.ativo}", self.ativo)
-
-                        if tendencia_baixa and self.operando:
-                            self.log_system.logar(f"📉 Tendência de BAIXA detectada para {self.ativo} - Aguardando confirmação", self.ativo)
-                            if macd_venda or rsi_venda:
-                                self.log_system.logar(f"🎯 Confirmação técnica negativa para {self.ativo}", self.ativo)
-
-                        # Execução
-                        if sinal_compra:
-                            self.log_system.logar(f"✅ SINAL DE COMPRA CONFIRMADO para {self.ativo}", self.ativo)
-                            sl_distance = atr[-1] * 1.5
-                            tp_distance = atr[-1] * self.min_rr_ratio * 1.5
-                            self.abrir_ordem(mt5.ORDER_TYPE_BUY, sl_distance, tp_distance)
-
-                        elif sinal_venda:
-                            self.log_system.logar(f"✅ SINAL DE VENDA CONFIRMADO para {self.ativo}", self.ativo)
-                            sl_distance = atr[-1] * 1.5
-                            tp_distance = atr[-1] * self.min_rr_ratio * 1.5
-                            self.abrir_ordem(mt5.ORDER_TYPE_SELL, sl_distance, tp_distance)
-
-                    except Exception as e:
-                        self.log_system.logar(f"❌ Erro no cálculo de sinais: {str(e)}")
-                        return
-
-                except Exception as e:
-                    self.log_system.logar(f"❌ Erro no cálculo de indicadores: {str(e)}")
-                    return
-
-            except Exception as e:
-                self.log_system.logar(f"❌ Erro nos cálculos básicos: {str(e)}")
+            # Indicadores e condições técnicas: regras compiladas, avaliadas na barra atual
+            sinais = self.regras.avaliar(dados, vars(self), ultima=True)
+            atr = float(sinais['atr_atual'])
+            if np.isnan(atr):
+                self.log_system.logar(f"❌ Erro: Indicadores com valores inválidos para {self.ativo}", self.ativo)
                 return
 
+            # A volatilidade dos ticks reage dentro da barra; o ATR só depois que as barras fecham
+            amplitude = self.amplitude_ticks()
+            if amplitude is not None:
+                atr = max(atr, amplitude)
+
+            # ATR atual para o trailing stop / breakeven das posições abertas
+            info = self.obter_symbol_info()
+            if info is not None:
+                gerenciador_posicoes.atualizar_atr(self.ativo, atr, info.point, info.digits,
+                                                   self.trailing_stop, self.breakeven_level)
+
+            # Filtros que dependem do terminal só são consultados quando as regras técnicas passam
+            sinal_compra = bool(
+                sinais['compra'] and  # Pelo menos 2 condições técnicas e volume suficiente
+                self.verificar_horario_favoravel() and  # Horário adequado
+                self.verificar_risco_posicao() and  # Gestão de risco ok
+                self.fluxo_ticks_favoravel(mt5.ORDER_TYPE_BUY) and  # Ticks não estão todos contra
+                self.confirmar_timeframes_superiores(mt5.ORDER_TYPE_BUY)
+            )
+            sinal_venda = bool(
+                sinais['venda'] and
+                self.verificar_horario_favoravel() and
+                self.verificar_risco_posicao() and
+                self.fluxo_ticks_favoravel(mt5.ORDER_TYPE_SELL) and
+                self.confirmar_timeframes_superiores(mt5.ORDER_TYPE_SELL)
+            )
+
+            journal.registrar_sinal(
+                self.ativo, self.timeframe, sinal_compra, sinal_venda,
+                sinais['votos_compra'], sinais['votos_venda'], dados['close'][-1],
+                {'compra': [bool(sinais[nome]) for nome in CONDICOES_COMPRA],
+                 'venda': [bool(sinais[nome]) for nome in CONDICOES_VENDA],
+                 'volume_alto': bool(sinais['volume_alto'])})
+
+            # Logs de sinais
+            if sinais['tendencia_alta'] and self.operando:
+                self.log_system.logar(f"📈 Tendência de ALTA detectada para {self.ativo} - Aguardando confirmação", self.ativo)
+                if sinais['macd_compra'] or sinais['rsi_compra']:
+                    self.log_system.logar(f"🎯 Confirmação técnica positiva para {self.ativo}", self.ativo)
+
+            if sinais['tendencia_baixa'] and self.operando:
+                self.log_system.logar(f"📉 Tendência de BAIXA detectada para {self.ativo} - Aguardando confirmação", self.ativo)
+                if sinais['macd_venda'] or sinais['rsi_venda']:
+                    self.log_system.logar(f"🎯 Confirmação técnica negativa para {self.ativo}", self.ativo)
+
+            # Execução
+            if sinal_compra:
+                self.log_system.logar(f"✅ SINAL DE COMPRA CONFIRMADO para {self.ativo}", self.ativo)
+                sl_distance = atr * 1.5
+                tp_distance = atr * self.min_rr_ratio * 1.5
+                self.abrir_ordem(mt5.ORDER_TYPE_BUY, sl_distance, tp_distance)
+
+            elif sinal_venda:
+                self.log_system.logar(f"✅ SINAL DE VENDA CONFIRMADO para {self.ativo}", self.ativo)
+                sl_distance = atr * 1.5
+                tp_distance = atr * self.min_rr_ratio * 1.5
+                self.abrir_ordem(mt5.ORDER_TYPE_SELL, sl_distance, tp_distance)
+
         except Exception as e:
             self.log_system.logar(f"❌ Erro na análise: {str(e)}")
             return
 
+    def dados_regras(self):
+        """Séries do buffer no formato esperado pelas regras"""
+        return {
+            'open': self.barras.ultimas('open'),
+            'high': self.barras.ultimas('high'),
+            'low': self.barras.ultimas('low'),
+            'close': self.barras.ultimas('close'),
+            'volume': self.barras.ultimas('tick_volume'),
+            'spread': self.barras.ultimas('spread'),
+        }
+
+    def sincronizar_barras(self):
+        """Carrega o histórico na primeira vez; depois baixa só a barra em formação e as novas"""
+        ultimo = self.barras.ultimo_tempo()
+        if ultimo is None:
+            novas = mt5.copy_rates_from_pos(self.ativo, self.timeframe, 0, self.barras.capacidade)
+        else:
+            # Horário do servidor costuma estar à frente do UTC: margem de um dia no limite superior
+            novas = mt5.copy_rates_range(self.ativo, self.timeframe, datetime.fromtimestamp(ultimo, timezone.utc),
+                                         datetime.now(timezone.utc) + timedelta(days=1))
+        self.barras.atualizar(novas)
+        return len(self.barras)
+
+    def amplitude_ticks(self):
+        """Amplitude esperada de uma barra pela volatilidade realizada dos ticks (None sem dados suficientes)"""
+        if not self.usar_volatilidade_ticks:
+            return None
+        estatisticas = fluxo_ticks.obter(self.ativo)
+        if estatisticas is None:
+            return None
+        return estatisticas.amplitude_esperada(self.segundos_barra)
+
+    def fluxo_ticks_favoravel(self, tipo_ordem):
+        """Desequilíbrio recente entre ticks de alta e de baixa não pode ser forte contra o sinal"""
+        estatisticas = fluxo_ticks.obter(self.ativo)
+        desequilibrio = estatisticas.desequilibrio() if estatisticas is not None else None
+        if desequilibrio is None:
+            return True
+        if tipo_ordem == mt5.ORDER_TYPE_BUY:
+            return desequilibrio > -self.desequilibrio_maximo
+        return desequilibrio < self.desequilibrio_maximo
+
     def verificar_horario_favoravel(self):
         """Verifica se o horário atual é favorável para operar"""
-        hora_atual = pd.Timestamp.now().time()
+        calendario = obter_calendario(self.ativo)
+        if not calendario.esta_aberto():
+            return False
+        hora_atual = datetime.fromtimestamp(calendario.agora_servidor(), timezone.utc).time()
         # Evita horários de baixa liquidez e alta volatilidade
-        if (hora_atual >= pd.Timestamp('09:30').time() and
-                hora_atual <= pd.Timestamp('16:30').time()):
+        return HORARIO_INICIO <= hora_atual <= HORARIO_FIM
+
+    def confirmar_timeframes_superiores(self, tipo_ordem):
+        """Verifica se a tendência (EMA rápida x média) nos timeframes de confirmação concorda com o sinal"""
+        if not self.timeframes_confirmacao:
             return True
-        return False
+
+        feed = obter_feed(self.ativo)
+        for resolucao in self.timeframes_confirmacao:
+            feed.assinar(resolucao)
+        feed.atualizar()  # Apenas as barras M1 novas são baixadas
+
+        for resolucao in self.timeframes_confirmacao:
+            close = feed.barras(resolucao)['close']
+            if len(close) < self.ema_media:
+                return False
+            alta = self.ema(close, self.ema_rapida)[-1] > self.ema(close, self.ema_media)[-1]
+            if alta != (tipo_ordem == mt5.ORDER_TYPE_BUY):
+                return False
+        return True
 
     def verificar_risco_posicao(self):
         """Verifica se a posição atende aos critérios de risco"""
-        # Verifica número máximo de posições
-        posicoes = mt5.positions_total()
+        # Verifica número máximo de posições (do robô neste ativo e desta estratégia; consulta local)
+        posicoes = max(indice_posicoes.contar(self.ativo, MAGIC_NUMBER),
+                       indice_posicoes.contar_estrategia(self.id_estrategia))
         if posicoes >= self.max_positions:
             if self.operando:
-                self.log_system.logar("⚠️ Máximo de posições atingido")
+                self.log_system.logar(f"⚠️ Máximo de posições atingido em {self.ativo}", self.ativo)
             return False
 
-        # Verifica drawdown diário
-        saldo_inicial = mt5.account_info().balance
-        saldo_atual = mt5.account_info().equity
-        drawdown = (saldo_inicial - saldo_atual) / saldo_inicial * 100
+        # Verifica perda diária (realizado desde a abertura do dia + flutuante)
+        livro_pnl.atualizar(self.ativo)
+        drawdown = livro_pnl.perda_diaria_pct()
 
         if drawdown > self.max_daily_loss:
             if self.operando:
@@ -264,6 +373,21 @@ class EstrategiaTrading:
 
         return True
 
+    def obter_symbol_info(self):
+        """Retorna o symbol_info do ativo, consultando o terminal apenas na primeira vez"""
+        if self.symbol_info is None:
+            self.symbol_info = mt5.symbol_info(self.ativo)
+        return self.symbol_info
+
+    def spread_aceitavel(self, spread):
+        """Spread atual contra o limite absoluto e as estatísticas do AssetManager (leitura O(1))"""
+        if spread > self.spread_maximo:
+            return False
+        estatisticas = asset_manager.get_spread_stats(self.ativo)
+        if estatisticas is None or not estatisticas.pronto():
+            return True
+        return spread <= max(estatisticas.p95, estatisticas.mediana * self.spread_multiplo_mediana)
+
     def abrir_ordem(self, tipo_ordem, sl_distance, tp_distance):
         tick = mt5.symbol_info_tick(self.ativo)
         if tick is None:
@@ -272,7 +396,14 @@ class EstrategiaTrading:
             return
 
         preco = tick.ask if tipo_ordem == mt5.ORDER_TYPE_BUY else tick.bid
-        point = mt5.symbol_info(self.ativo).point
+        point = self.obter_symbol_info().point
+
+        spread = (tick.ask - tick.bid) / point
+        if not self.spread_aceitavel(spread):
+            if self.operando:
+                self.log_system.logar(f"⚠️ Spread de {self.ativo} alto demais ({spread:.1f} pontos). Ordem não enviada.",
+                                      self.ativo)
+            return
 
         # Stop Loss e Take Profit dinâmicos
         sl = preco - sl_distance * point if tipo_ordem == mt5.ORDER_TYPE_BUY else preco + sl_distance * point
@@ -287,24 +418,39 @@ class EstrategiaTrading:
             "sl": sl,
             "tp": tp,
             "deviation": 10,
-            "magic": 123456,
+            "magic": MAGIC_NUMBER,
             "comment": "Future MT5 Robo v2",
             "type_time": mt5.ORDER_TIME_GTC,
             "type_filling": mt5.ORDER_FILLING_IOC,
         }
 
-        resultado = mt5.order_send(request)
+        # Compensada com as ordens das outras estratégias no mesmo ativo (ver order_router.py); o roteador
+        # registra a ordem enviada e a alocação desta estratégia no journal
+        resultado = roteador_ordens.enviar(request, origem=self.id_estrategia)
 
-        if resultado.retcode != mt5.TRADE_RETCODE_DONE:
+        if resultado.retcode == RETCODE_COMPENSADA:
+            if self.operando:
+                self.log_system.logar(f"ℹ️ Ordem de {self.ativo} compensada por sinais opostos de outras estratégias: "
+                                      f"nenhuma posição aberta", self.ativo)
+        elif resultado.retcode != mt5.TRADE_RETCODE_DONE:
             if self.operando:
                 self.log_system.logar(f"❌ Erro ao enviar ordem para {self.ativo}: {resultado.comment}", self.ativo)
         else:
             self.ticket_atual = resultado.order
+            indice_posicoes.registrar_execucao(resultado.order, self.ativo, MAGIC_NUMBER, self.id_estrategia)
+            # O roteador reancora SL/TP (mesmas distâncias) no preço da ordem que enviou
+            deslocamento = (resultado.price - preco) if resultado.price else 0.0
+            preco, sl, tp = preco + deslocamento, sl + deslocamento, tp + deslocamento
+            self.marcadores.append((self.barras.ultimo_tempo(), preco, tipo_ordem == mt5.ORDER_TYPE_BUY))
+            barramento.publicar(TOPICO_EXECUCAO, EventoExecucao(
+                self.ativo, self.id_estrategia, self.ticket_atual, tipo_ordem == mt5.ORDER_TYPE_BUY,
+                resultado.volume, preco))
             direcao = "COMPRA" if tipo_ordem == mt5.ORDER_TYPE_BUY else "VENDA"
             if self.operando:
                 self.log_system.logar(f"✅ ORDEM DE {direcao} CONFIRMADA E EXECUTADA - {self.ativo}!", self.ativo)
                 self.log_system.logar(f"📊 Detalhes da Ordem ({self.ativo}):", self.ativo)
                 self.log_system.logar(f"  • Ticket: {self.ticket_atual}", self.ativo)
+                self.log_system.logar(f"  • Volume: {resultado.volume:.2f}", self.ativo)
                 self.log_system.logar(f"  • Preço: {preco:.5f}", self.ativo)
                 self.log_system.logar(f"  • Stop Loss: {sl:.5f}", self.ativo)
                 self.log_system.logar(f"  • Take Profit: {tp:.5f}", self.ativo)
@@ -0,0 +1,202 @@
+import json
+import threading
+from collections import deque, namedtuple
+
+# Tópicos e o tipo de evento que cada um transporta
+TOPICO_BARRA = 'nova_barra'
+TOPICO_TICK = 'tick'
+TOPICO_EXECUCAO = 'execucao_ordem'
+TOPICO_CONTA = 'conta'
+TOPICO_LOG = 'log'
+
+EventoBarra = namedtuple('EventoBarra', 'ativo resolucao tempo')  # tempo: abertura da barra nova (s)
+EventoTick = namedtuple('EventoTick', 'ativo time_msc bid ask')  # Último tick de cada lote coletado
+EventoExecucao = namedtuple('EventoExecucao', 'ativo origem ticket compra volume preco')
+EventoConta = namedtuple('EventoConta', 'saldo')
+EventoLog = namedtuple('EventoLog', 'ativo mensagem tipo')
+
+TIPOS_EVENTO = {
+    TOPICO_BARRA: EventoBarra,
+    TOPICO_TICK: EventoTick,
+    TOPICO_EXECUCAO: EventoExecucao,
+    TOPICO_CONTA: EventoConta,
+    TOPICO_LOG: EventoLog,
+}
+
+# Fila cheia: descarta o evento novo, descarta o mais antigo (fica o último) ou bloqueia quem publica
+POLITICA_DESCARTAR = 'descartar'
+POLITICA_ULTIMO = 'ultimo'
+POLITICA_BLOQUEAR = 'bloquear'
+POLITICAS = (POLITICA_DESCARTAR, POLITICA_ULTIMO, POLITICA_BLOQUEAR)
+
+
+def _tipo_do_topico(topico):
+    try:
+        return TIPOS_EVENTO[topico]
+    except KeyError:
+        raise ValueError(f"Tópico desconhecido: {topico}") from None
+
+
+class Assinatura:
+    """Fila limitada de um assinante; consumida por uma thread própria, pelo quadro do Tk ou por aguardar()"""
+
+    def __init__(self, topico, callback, capacidade, politica, filtro, timeout_bloqueio):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política inválida: {politica}")
+        self.topico = topico
+        self.callback = callback
+        self.capacidade = capacidade
+        self.politica = politica
+        self.filtro = filtro  # Função(evento) -> bool avaliada por quem publica
+        self.timeout_bloqueio = timeout_bloqueio  # Espera máxima de quem publica (POLITICA_BLOQUEAR)
+        self.ativa = True
+        self.entregues = 0
+        self.descartados = 0
+        self.erros = 0
+        self._fila = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def entregar(self, evento):
+        """Enfileira conforme a política; retorna se o evento entrou na fila"""
+        with self._cond:
+            if not self.ativa:
+                return False
+            if len(self._fila) >= self.capacidade:
+                if self.politica == POLITICA_DESCARTAR:
+                    self.descartados += 1
+                    return False
+                if self.politica == POLITICA_ULTIMO:
+                    self._fila.popleft()
+                    self.descartados += 1
+                elif not self._cond.wait_for(lambda: len(self._fila) < self.capacidade or not self.ativa,
+                                             self.timeout_bloqueio) or not self.ativa:
+                    self.descartados += 1
+                    return False
+            self._fila.append(evento)
+            self.entregues += 1
+            self._cond.notify_all()
+            return True
+
+    def aguardar(self, timeout=None):
+        """Bloqueia até haver eventos (ou a assinatura ser encerrada) e retorna todos os pendentes"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._fila or not self.ativa, timeout):
+                return []
+            eventos = list(self._fila)
+            self._fila.clear()
+            self._cond.notify_all()  # Libera quem publica com POLITICA_BLOQUEAR
+            return eventos
+
+    def drenar(self, max_eventos=500):
+        """Entrega ao callback até `max_eventos` eventos pendentes, sem bloquear (ex.: a cada quadro do Tk)"""
+        with self._cond:
+            eventos = [self._fila.popleft() for _ in range(min(max_eventos, len(self._fila)))]
+            if eventos:
+                self._cond.notify_all()
+        for evento in eventos:
+            self._chamar(evento)
+        return len(eventos)
+
+    def _chamar(self, evento):
+        try:
+            self.callback(evento)
+        except Exception:
+            self.erros += 1  # Um assinante com defeito não derruba a entrega aos outros
+
+    def _consumir(self):
+        while self.ativa:
+            for evento in self.aguardar():
+                self._chamar(evento)
+
+    def iniciar_thread(self):
+        self._thread = threading.Thread(target=self._consumir, daemon=True)
+        self._thread.start()
+
+    def encerrar(self):
+        """Descarta os pendentes e acorda quem estiver esperando"""
+        with self._cond:
+            self.ativa = False
+            self._fila.clear()
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+
+class BarramentoEventos:
+    """Publicação/assinatura em processo entre dados de mercado, estratégias e interface.
+
+    Cada tópico transporta um único tipo de evento. Quem publica não espera os assinantes (exceto
+    com POLITICA_BLOQUEAR e fila cheia); sem assinantes, publicar custa uma consulta ao dicionário.
+    """
+
+    def __init__(self):
+        self._assinaturas = {}  # tópico -> tupla de Assinatura (copiada ao assinar/cancelar)
+        self._lock = threading.Lock()
+        self.publicados = dict.fromkeys(TIPOS_EVENTO, 0)
+
+    def assinar(self, topico, callback=None, capacidade=1000, politica=POLITICA_DESCARTAR, filtro=None,
+                thread=True, timeout_bloqueio=1.0):
+        """Assina um tópico. Com `thread`, o callback roda numa thread própria do assinante; sem ela,
+        os eventos são consumidos com aguardar() ou drenar()"""
+        _tipo_do_topico(topico)
+        assinatura = Assinatura(topico, callback, capacidade, politica, filtro, timeout_bloqueio)
+        if thread and callback is not None:
+            assinatura.iniciar_thread()
+        with self._lock:
+            self._assinaturas[topico] = self._assinaturas.get(topico, ()) + (assinatura,)
+        return assinatura
+
+    def assinar_tk(self, renderizador, topico, callback, capacidade=1000, politica=POLITICA_ULTIMO, filtro=None):
+        """Assinatura cujo callback roda na thread do Tk, no quadro do RenderizadorUI"""
+        assinatura = self.assinar(topico, callback, capacidade, politica, filtro, thread=False)
+        renderizador.a_cada_quadro(assinatura.drenar)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            restantes = tuple(a for a in self._assinaturas.get(assinatura.topico, ()) if a is not assinatura)
+            if restantes:
+                self._assinaturas[assinatura.topico] = restantes
+            else:
+                self._assinaturas.pop(assinatura.topico, None)
+        assinatura.encerrar()
+
+    def publicar(self, topico, evento):
+        """Entrega o evento a cada assinante do tópico (qualquer thread); retorna quantos o receberam"""
+        if not isinstance(evento, _tipo_do_topico(topico)):
+            raise TypeError(f"Tópico {topico} espera {TIPOS_EVENTO[topico].__name__}, recebeu {type(evento).__name__}")
+        with self._lock:
+            self.publicados[topico] += 1  # Várias threads publicam: += fora do lock perderia contagens
+        entregues = 0
+        for assinatura in self._assinaturas.get(topico, ()):
+            if assinatura.filtro is None or assinatura.filtro(evento):
+                entregues += assinatura.entregar(evento)
+        return entregues
+
+    def tem_assinantes(self, topico):
+        return topico in self._assinaturas
+
+    def estatisticas(self):
+        with self._lock:
+            assinaturas = {topico: list(lista) for topico, lista in self._assinaturas.items()}
+            publicados = dict(self.publicados)
+        return {
+            topico: {
+                'publicados': publicados[topico],
+                'assinantes': len(assinaturas.get(topico, ())),
+                'entregues': sum(a.entregues for a in assinaturas.get(topico, ())),
+                'descartados': sum(a.descartados for a in assinaturas.get(topico, ())),
+                'erros': sum(a.erros for a in assinaturas.get(topico, ())),
+            }
+            for topico in TIPOS_EVENTO
+        }
+
+    def exportar(self, caminho):
+        with open(caminho, 'w') as f:
+            json.dump(self.estatisticas(), f, indent=2)
+
+
+# Create global event bus instance
+barramento = BarramentoEventos()
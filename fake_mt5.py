@@ -0,0 +1,436 @@
+"""Terminal MetaTrader 5 simulado, em processo, para benchmarks e testes de carga offline.
+
+Uso:
+    import fake_mt5
+    terminal = fake_mt5.instalar(n_symbols=50)   # antes de importar estrategia/utils/painel
+    from estrategia import EstrategiaTrading
+
+Os preços são funções determinísticas do tempo simulado, então todas as resoluções
+(M1...D1 e ticks) são consistentes entre si.
+"""
+import sys
+import time
+import types
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Constantes com os mesmos valores do pacote MetaTrader5
+CONSTANTES = {
+    'TIMEFRAME_M1': 1, 'TIMEFRAME_M2': 2, 'TIMEFRAME_M3': 3, 'TIMEFRAME_M5': 5, 'TIMEFRAME_M15': 15,
+    'TIMEFRAME_M30': 30, 'TIMEFRAME_H1': 16385, 'TIMEFRAME_H4': 16388, 'TIMEFRAME_D1': 16408,
+    'ORDER_TYPE_BUY': 0, 'ORDER_TYPE_SELL': 1,
+    'POSITION_TYPE_BUY': 0, 'POSITION_TYPE_SELL': 1,
+    'DEAL_TYPE_BUY': 0, 'DEAL_TYPE_SELL': 1,
+    'DEAL_ENTRY_IN': 0, 'DEAL_ENTRY_OUT': 1,
+    'TRADE_ACTION_DEAL': 1, 'TRADE_ACTION_SLTP': 6,
+    'ORDER_TIME_GTC': 0, 'ORDER_FILLING_FOK': 0, 'ORDER_FILLING_IOC': 1,
+    'TRADE_RETCODE_DONE': 10009, 'TRADE_RETCODE_INVALID_STOPS': 10016, 'TRADE_RETCODE_NO_MONEY': 10019,
+    'TRADE_RETCODE_CONNECTION': 10031,
+    'SYMBOL_TRADE_MODE_DISABLED': 0, 'SYMBOL_TRADE_MODE_FULL': 4,
+    'COPY_TICKS_ALL': -1, 'COPY_TICKS_INFO': 1, 'COPY_TICKS_TRADE': 2,
+    'TICK_FLAG_BID': 2, 'TICK_FLAG_ASK': 4, 'TICK_FLAG_LAST': 8, 'TICK_FLAG_VOLUME': 16,
+    'TICK_FLAG_BUY': 32, 'TICK_FLAG_SELL': 64,
+}
+
+SEGUNDOS_TIMEFRAME = {
+    1: 60, 2: 120, 3: 180, 5: 300, 15: 900, 30: 1800, 16385: 3600, 16388: 14400, 16408: 86400,
+}
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+
+TICKS_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8'),
+])
+
+SymbolInfo = namedtuple('SymbolInfo', 'name path description visible point digits trade_mode '
+                                      'volume_min volume_step trade_contract_size spread')
+Tick = namedtuple('Tick', 'time bid ask last volume time_msc flags volume_real')
+AccountInfo = namedtuple('AccountInfo', 'login server trade_mode balance equity profit margin margin_free currency')
+TerminalInfo = namedtuple('TerminalInfo', 'connected trade_allowed ping_last')
+Position = namedtuple('Position', 'ticket time symbol type magic volume price_open sl tp '
+                                  'price_current profit swap comment identifier')
+Deal = namedtuple('Deal', 'ticket order time time_msc type entry magic position_id volume price '
+                          'commission swap profit fee symbol comment')
+OrderSendResult = namedtuple('OrderSendResult', 'retcode deal order volume price bid ask comment request_id request')
+
+CATEGORIAS = ['Forex\\Majors', 'Forex\\Minors', 'CFD\\Indices', 'CFD\\Commodities', 'Crypto']
+
+
+class FakeMT5:
+    """Estado do terminal simulado (relógio, preços, posições e histórico de negócios)"""
+
+    def __init__(self, n_symbols=20, inicio=None, tempo_real=False, latencia=0.0,
+                 ticks_por_segundo=2.0, saldo=10000.0, seed=7, velocidade=1.0):
+        self.lock = threading.RLock()
+        self.tempo_real = tempo_real
+        self.velocidade = velocidade  # Segundos simulados por segundo real (tempo_real)
+        self.latencia = latencia
+        self.ticks_por_segundo = ticks_por_segundo
+        self.conectado = True
+        self.chamadas = {}
+        self._relogio = float(inicio if inicio is not None else 1_700_000_000 // 86400 * 86400 + 8 * 3600)
+        self._base_real = time.monotonic()
+        self._saldo = saldo
+        self._rng = np.random.default_rng(seed)
+
+        self.symbols = {}
+        self._parametros = {}
+        nomes_base = ['EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD', 'USDCAD', 'USDCHF', 'NZDUSD', 'EURJPY',
+                      'EURGBP', 'US500', 'US30', 'GER40', 'XAUUSD', 'XTIUSD', 'BTCUSD', 'ETHUSD']
+        for i in range(n_symbols):
+            nome = nomes_base[i] if i < len(nomes_base) else f"SYM{i:05d}"
+            digitos = 3 if 'JPY' in nome else 5
+            preco = 1.1 + 0.05 * (i % 17)
+            self.symbols[nome] = SymbolInfo(
+                name=nome, path=f"{CATEGORIAS[i % len(CATEGORIAS)]}\\{nome}", description=nome,
+                visible=True, point=10.0 ** -digitos, digits=digitos,
+                trade_mode=CONSTANTES['SYMBOL_TRADE_MODE_FULL'], volume_min=0.01, volume_step=0.01,
+                trade_contract_size=100000.0, spread=10,
+            )
+            # Frequências/amplitudes do processo de preço deste ativo
+            self._parametros[nome] = (
+                preco,
+                self._rng.uniform(0.002, 0.01, 4),
+                self._rng.uniform(3600, 7 * 86400, 4),
+                self._rng.uniform(0, 2 * np.pi, 4),
+                float(i * 7919 % 1000),
+            )
+
+        self._posicoes = {}
+        self._deals = []
+        self._proximo_ticket = 1000
+
+    # ---- relógio -------------------------------------------------------------------------------
+
+    def agora(self):
+        """Horário do servidor simulado (segundos)"""
+        if self.tempo_real:
+            return self._relogio + (time.monotonic() - self._base_real) * self.velocidade
+        return self._relogio
+
+    def avancar(self, segundos):
+        """Avança o relógio simulado"""
+        with self.lock:
+            self._relogio += segundos
+            self._verificar_stops()
+
+    # ---- processo de preço ---------------------------------------------------------------------
+
+    def preco(self, nome, t):
+        """Preço bid no(s) instante(s) t, determinístico"""
+        base, amplitudes, periodos, fases, semente = self._parametros[nome]
+        t = np.asarray(t, dtype=np.float64)
+        onda = np.zeros_like(t)
+        for a, p, f in zip(amplitudes, periodos, fases):
+            onda += a * np.sin(2 * np.pi * t / p + f)
+        ruido = np.sin((t // 10) * 12.9898 + semente) * 43758.5453
+        ruido = (ruido - np.floor(ruido) - 0.5) * 0.0006
+        return np.round(base * np.exp(onda + ruido), self.symbols[nome].digits)
+
+    def spread_pontos(self, nome, t):
+        """Spread em pontos, com picos ocasionais"""
+        t = np.asarray(t, dtype=np.float64)
+        pico = np.sin((t // 60) * 78.233 + self._parametros[nome][4]) > 0.97
+        return np.where(pico, 80, 8 + (t // 10 % 5)).astype(np.int32)
+
+    def _barras(self, nome, timeframe, inicios):
+        segundos = SEGUNDOS_TIMEFRAME[timeframe]
+        amostras = int(min(segundos // 10, 60))
+        offsets = np.linspace(0, segundos - 1, amostras)
+        precos = self.preco(nome, inicios[:, None] + offsets[None, :])
+
+        agora = self.agora()
+        barras = np.zeros(len(inicios), dtype=RATES_DTYPE)
+        barras['time'] = inicios
+        barras['open'] = precos[:, 0]
+        # A barra em formação só conhece os preços até o instante atual
+        aberta = inicios + segundos > agora
+        if aberta.any():
+            validos = (inicios[aberta][:, None] + offsets[None, :]) <= agora
+            validos[:, 0] = True
+            parcial = np.where(validos, precos[aberta], np.nan)
+            precos = precos.copy()
+            precos[aberta] = parcial
+            ultimo = validos.sum(axis=1) - 1
+            fechamento = precos[:, -1].copy()
+            fechamento[aberta] = parcial[np.arange(len(ultimo)), ultimo]
+        else:
+            fechamento = precos[:, -1]
+        barras['high'] = np.nanmax(precos, axis=1)
+        barras['low'] = np.nanmin(precos, axis=1)
+        barras['close'] = fechamento
+        barras['tick_volume'] = 50 + (inicios // 60 % 37) * 3
+        barras['spread'] = self.spread_pontos(nome, inicios)
+        return barras
+
+    # ---- chamadas de API -----------------------------------------------------------------------
+
+    def _chamar(self, nome):
+        self.chamadas[nome] = self.chamadas.get(nome, 0) + 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def initialize(self, *args, **kwargs):
+        self._chamar('initialize')
+        self.conectado = True
+        return True
+
+    def shutdown(self):
+        self._chamar('shutdown')
+        self.conectado = False
+
+    def last_error(self):
+        return (1, 'Success') if self.conectado else (-10004, 'No IPC connection')
+
+    def terminal_info(self):
+        self._chamar('terminal_info')
+        if not self.conectado:
+            return None
+        return TerminalInfo(connected=True, trade_allowed=True, ping_last=1500)
+
+    def account_info(self):
+        self._chamar('account_info')
+        if not self.conectado:
+            return None
+        with self.lock:
+            flutuante = sum(p.profit for p in self._posicoes_atualizadas())
+            return AccountInfo(login=123, server='Simulado', trade_mode=0, balance=self._saldo, equity=self._saldo + flutuante,
+                               profit=flutuante, margin=0.0, margin_free=self._saldo, currency='BRL')
+
+    def symbols_get(self, group=None):
+        self._chamar('symbols_get')
+        if not self.conectado:
+            return None
+        return tuple(self.symbols.values())
+
+    def symbols_total(self):
+        return len(self.symbols)
+
+    def symbol_info(self, nome):
+        self._chamar('symbol_info')
+        if not self.conectado:
+            return None
+        return self.symbols.get(nome)
+
+    def symbol_select(self, nome, habilitar=True):
+        return nome in self.symbols
+
+    def symbol_info_tick(self, nome):
+        self._chamar('symbol_info_tick')
+        if not self.conectado or nome not in self.symbols:
+            return None
+        t = self.agora()
+        bid = float(self.preco(nome, t))
+        ask = round(bid + float(self.spread_pontos(nome, t)) * self.symbols[nome].point, self.symbols[nome].digits)
+        return Tick(time=int(t), bid=bid, ask=ask, last=0.0, volume=0, time_msc=int(t * 1000),
+                    flags=6, volume_real=0.0)
+
+    def copy_rates_from_pos(self, nome, timeframe, inicio, quantidade):
+        self._chamar('copy_rates_from_pos')
+        if not self.conectado or nome not in self.symbols:
+            return None
+        segundos = SEGUNDOS_TIMEFRAME[timeframe]
+        atual = int(self.agora()) // segundos * segundos
+        inicios = atual - segundos * np.arange(inicio + quantidade - 1, inicio - 1, -1, dtype=np.int64)
+        return self._barras(nome, timeframe, inicios)
+
+    def copy_rates_from(self, nome, timeframe, data, quantidade):
+        self._chamar('copy_rates_from')
+        if not self.conectado or nome not in self.symbols:
+            return None
+        segundos = SEGUNDOS_TIMEFRAME[timeframe]
+        fim = min(int(_epoch(data)), int(self.agora())) // segundos * segundos
+        inicios = fim - segundos * np.arange(quantidade - 1, -1, -1, dtype=np.int64)
+        return self._barras(nome, timeframe, inicios)
+
+    def copy_rates_range(self, nome, timeframe, data_de, data_ate):
+        self._chamar('copy_rates_range')
+        if not self.conectado or nome not in self.symbols:
+            return None
+        segundos = SEGUNDOS_TIMEFRAME[timeframe]
+        de = -(-int(_epoch(data_de)) // segundos) * segundos
+        ate = min(int(_epoch(data_ate)), int(self.agora()))
+        inicios = np.arange(de, ate + 1, segundos, dtype=np.int64)
+        return self._barras(nome, timeframe, inicios)
+
+    def copy_ticks_from(self, nome, data, quantidade, flags=-1):
+        self._chamar('copy_ticks_from')
+        if not self.conectado or nome not in self.symbols:
+            return None
+        de = _epoch(data)
+        passo = 1.0 / self.ticks_por_segundo
+        ate = min(self.agora(), de + quantidade * passo)
+        return self._ticks(nome, de, ate, passo)
+
+    def copy_ticks_range(self, nome, data_de, data_ate, flags=-1):
+        self._chamar('copy_ticks_range')
+        if not self.conectado or nome not in self.symbols:
+            return None
+        return self._ticks(nome, _epoch(data_de), min(self.agora(), _epoch(data_ate)), 1.0 / self.ticks_por_segundo)
+
+    def _ticks(self, nome, de, ate, passo):
+        instantes = np.arange(np.ceil(de / passo) * passo, ate, passo)
+        ticks = np.zeros(len(instantes), dtype=TICKS_DTYPE)
+        if len(instantes) == 0:
+            return ticks
+        bid = self.preco(nome, instantes)
+        ticks['time'] = instantes.astype(np.int64)
+        ticks['time_msc'] = (instantes * 1000).astype(np.int64)
+        ticks['bid'] = bid
+        ticks['ask'] = bid + self.spread_pontos(nome, instantes) * self.symbols[nome].point
+        variacao = np.diff(bid, prepend=bid[0])
+        ticks['flags'] = np.where(variacao > 0, 2 | 32, np.where(variacao < 0, 2 | 64, 4))
+        ticks['volume'] = 1
+        ticks['volume_real'] = 1.0
+        return ticks
+
+    # ---- posições e ordens ---------------------------------------------------------------------
+
+    def _novo_ticket(self):
+        self._proximo_ticket += 1
+        return self._proximo_ticket
+
+    def _posicoes_atualizadas(self):
+        tick_cache = {}
+        atualizadas = []
+        for p in self._posicoes.values():
+            if p.symbol not in tick_cache:
+                t = self.agora()
+                bid = float(self.preco(p.symbol, t))
+                tick_cache[p.symbol] = (bid, bid + float(self.spread_pontos(p.symbol, t)) * self.symbols[p.symbol].point)
+            bid, ask = tick_cache[p.symbol]
+            atual = bid if p.type == 0 else ask
+            direcao = 1 if p.type == 0 else -1
+            lucro = round((atual - p.price_open) * direcao * p.volume * self.symbols[p.symbol].trade_contract_size, 2)
+            atualizadas.append(p._replace(price_current=atual, profit=lucro))
+        return atualizadas
+
+    def _verificar_stops(self):
+        for p in self._posicoes_atualizadas():
+            atingiu_sl = p.sl and ((p.type == 0 and p.price_current <= p.sl) or (p.type == 1 and p.price_current >= p.sl))
+            atingiu_tp = p.tp and ((p.type == 0 and p.price_current >= p.tp) or (p.type == 1 and p.price_current <= p.tp))
+            if atingiu_sl or atingiu_tp:
+                self._fechar(p, 'sl' if atingiu_sl else 'tp')
+
+    def _fechar(self, p, comentario):
+        self._posicoes.pop(p.ticket, None)
+        self._saldo += p.profit
+        self._registrar_deal(p.symbol, 1 - p.type, 1, p.magic, p.ticket, p.volume, p.price_current, p.profit, comentario)
+
+    def _registrar_deal(self, nome, tipo, entrada, magic, posicao, volume, preco, lucro, comentario):
+        t = self.agora()
+        deal = Deal(ticket=self._novo_ticket(), order=self._proximo_ticket, time=int(t), time_msc=int(t * 1000),
+                    type=tipo, entry=entrada, magic=magic, position_id=posicao, volume=volume, price=preco,
+                    commission=0.0, swap=0.0, profit=lucro, fee=0.0, symbol=nome, comment=comentario)
+        self._deals.append(deal)
+        return deal
+
+    def positions_total(self):
+        self._chamar('positions_total')
+        with self.lock:
+            return len(self._posicoes)
+
+    def positions_get(self, symbol=None, ticket=None, group=None):
+        self._chamar('positions_get')
+        if not self.conectado:
+            return None
+        with self.lock:
+            posicoes = self._posicoes_atualizadas()
+        if symbol is not None:
+            posicoes = [p for p in posicoes if p.symbol == symbol]
+        if ticket is not None:
+            posicoes = [p for p in posicoes if p.ticket == ticket]
+        return tuple(posicoes)
+
+    def history_deals_get(self, data_de=None, data_ate=None, group=None, ticket=None, position=None):
+        self._chamar('history_deals_get')
+        if not self.conectado:
+            return None
+        with self.lock:
+            deals = list(self._deals)
+        if ticket is not None:
+            return tuple(d for d in deals if d.ticket == ticket)
+        if position is not None:
+            return tuple(d for d in deals if d.position_id == position)
+        de, ate = _epoch(data_de), _epoch(data_ate)
+        return tuple(d for d in deals if de <= d.time <= ate)
+
+    def history_deals_total(self, data_de, data_ate):
+        return len(self.history_deals_get(data_de, data_ate))
+
+    def order_send(self, request):
+        self._chamar('order_send')
+        if not self.conectado:
+            return None
+        with self.lock:
+            acao = request.get('action')
+            nome = request.get('symbol')
+            if acao == CONSTANTES['TRADE_ACTION_SLTP']:
+                p = self._posicoes.get(request.get('position'))
+                if p is None:
+                    return self._resultado(10013, request, comentario='Invalid request')
+                self._posicoes[p.ticket] = p._replace(sl=request.get('sl', p.sl), tp=request.get('tp', p.tp))
+                return self._resultado(CONSTANTES['TRADE_RETCODE_DONE'], request, ordem=p.ticket)
+
+            if acao != CONSTANTES['TRADE_ACTION_DEAL'] or nome not in self.symbols:
+                return self._resultado(10013, request, comentario='Invalid request')
+
+            tick = self.symbol_info_tick(nome)
+            tipo = request['type']
+            preco = tick.ask if tipo == 0 else tick.bid
+
+            alvo = request.get('position')
+            if alvo:
+                p = next((x for x in self._posicoes_atualizadas() if x.ticket == alvo), None)
+                if p is None:
+                    return self._resultado(10013, request, comentario='Position not found')
+                self._fechar(p, request.get('comment', ''))
+                return self._resultado(CONSTANTES['TRADE_RETCODE_DONE'], request, ordem=self._proximo_ticket,
+                                       deal=self._deals[-1].ticket, preco=preco)
+
+            ticket = self._novo_ticket()
+            self._posicoes[ticket] = Position(
+                ticket=ticket, time=int(self.agora()), symbol=nome, type=tipo, magic=request.get('magic', 0),
+                volume=request['volume'], price_open=preco, sl=request.get('sl', 0.0), tp=request.get('tp', 0.0),
+                price_current=preco, profit=0.0, swap=0.0, comment=request.get('comment', ''), identifier=ticket,
+            )
+            deal = self._registrar_deal(nome, tipo, 0, request.get('magic', 0), ticket, request['volume'],
+                                        preco, 0.0, request.get('comment', ''))
+            return self._resultado(CONSTANTES['TRADE_RETCODE_DONE'], request, ordem=ticket, deal=deal.ticket,
+                                   preco=preco, bid=tick.bid, ask=tick.ask)
+
+    def _resultado(self, retcode, request, ordem=0, deal=0, preco=0.0, bid=0.0, ask=0.0, comentario='Request executed'):
+        if retcode != CONSTANTES['TRADE_RETCODE_DONE'] and comentario == 'Request executed':
+            comentario = 'Rejected'
+        return OrderSendResult(retcode=retcode, deal=deal, order=ordem, volume=request.get('volume', 0.0),
+                               price=preco, bid=bid, ask=ask, comment=comentario, request_id=0, request=request)
+
+
+def _epoch(data):
+    if data is None:
+        return 0.0
+    if isinstance(data, datetime):
+        if data.tzinfo is None:
+            data = data.replace(tzinfo=timezone.utc)
+        return data.timestamp()
+    return float(data)
+
+
+def instalar(**kwargs):
+    """Registra um terminal simulado como o módulo MetaTrader5 e o retorna"""
+    terminal = FakeMT5(**kwargs)
+    modulo = types.ModuleType('MetaTrader5')
+    modulo.__dict__.update(CONSTANTES)
+    for nome in dir(terminal):
+        if not nome.startswith('_') and callable(getattr(terminal, nome)):
+            setattr(modulo, nome, getattr(terminal, nome))
+    modulo.terminal = terminal
+    sys.modules['MetaTrader5'] = modulo
+    return terminal
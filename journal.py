@@ -0,0 +1,250 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+from memory_monitor import tamanho_profundo
+
+CAMINHO_JOURNAL = "journal.db"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS sinais (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    timeframe INTEGER,
+    compra INTEGER,
+    venda INTEGER,
+    votos_compra INTEGER,
+    votos_venda INTEGER,
+    close REAL,
+    detalhes TEXT
+);
+CREATE TABLE IF NOT EXISTS ordens (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    tipo INTEGER,
+    volume REAL,
+    preco REAL,
+    sl REAL,
+    tp REAL,
+    magic INTEGER,
+    retcode INTEGER,
+    ticket INTEGER,
+    deal INTEGER,
+    preco_execucao REAL,
+    comentario TEXT,
+    request TEXT
+);
+CREATE TABLE IF NOT EXISTS alocacoes (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    origem TEXT,
+    tipo INTEGER,
+    volume_pedido REAL,
+    volume REAL,
+    retcode INTEGER,
+    ticket INTEGER,
+    comentario TEXT
+);
+CREATE TABLE IF NOT EXISTS deals (
+    ticket INTEGER PRIMARY KEY,
+    time INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    tipo INTEGER,
+    entrada INTEGER,
+    magic INTEGER,
+    posicao INTEGER,
+    volume REAL,
+    preco REAL,
+    lucro REAL,
+    comissao REAL,
+    swap REAL
+);
+CREATE INDEX IF NOT EXISTS idx_sinais_symbol_time ON sinais(symbol, time);
+CREATE INDEX IF NOT EXISTS idx_sinais_time ON sinais(time);
+CREATE INDEX IF NOT EXISTS idx_ordens_symbol_time ON ordens(symbol, time);
+CREATE INDEX IF NOT EXISTS idx_ordens_time ON ordens(time);
+CREATE INDEX IF NOT EXISTS idx_ordens_ticket ON ordens(ticket);
+CREATE INDEX IF NOT EXISTS idx_alocacoes_ticket ON alocacoes(ticket);
+CREATE INDEX IF NOT EXISTS idx_alocacoes_origem_time ON alocacoes(origem, time);
+CREATE INDEX IF NOT EXISTS idx_deals_symbol_time ON deals(symbol, time);
+CREATE INDEX IF NOT EXISTS idx_deals_time ON deals(time);
+CREATE INDEX IF NOT EXISTS idx_deals_posicao ON deals(posicao);
+"""
+
+INSERTS = {
+    'sinais': "INSERT INTO sinais (time, symbol, timeframe, compra, venda, votos_compra, votos_venda, close, detalhes) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    'ordens': "INSERT INTO ordens (time, symbol, tipo, volume, preco, sl, tp, magic, retcode, ticket, deal, "
+              "preco_execucao, comentario, request) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    'alocacoes': "INSERT INTO alocacoes (time, symbol, origem, tipo, volume_pedido, volume, retcode, ticket, "
+                 "comentario) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    'deals': "INSERT OR IGNORE INTO deals (ticket, time, symbol, tipo, entrada, magic, posicao, volume, preco, "
+             "lucro, comissao, swap) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+}
+
+
+class Journal:
+    """Diário de sinais, ordens e negócios em SQLite (WAL) com escrita em lote em background"""
+
+    def __init__(self, caminho=CAMINHO_JOURNAL, tamanho_fila=100000, tamanho_lote=500, intervalo_commit=0.5):
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_commit = intervalo_commit
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+        self._thread = None
+        self._ativo = False
+        self.log_system = None
+        self.descartados = 0  # Registros perdidos por fila cheia (a thread de trading nunca espera)
+        self.perdidos = 0  # Registros de lotes que o SQLite recusou (disco cheio, banco travado, linha inválida)
+        self.gravados = 0
+
+    def _logar(self, mensagem):
+        if self.log_system:
+            self.log_system.logar(mensagem)
+
+    def iniciar(self):
+        """Inicia a thread de escrita"""
+        if self._ativo:
+            return
+        self._ativo = True
+        self._thread = threading.Thread(target=self._escrever, daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        """Grava o que estiver na fila e encerra a thread de escrita"""
+        if not self._ativo:
+            return
+        self._ativo = False
+        self._thread.join()
+        self._thread = None
+
+    def _enfileirar(self, tabela, valores):
+        if not self._ativo:
+            return
+        try:
+            self._fila.put_nowait((tabela, valores))
+        except queue.Full:
+            self.descartados += 1
+
+    # ---- API chamada pelas estratégias (não bloqueante) ---------------------------------------
+
+    def registrar_sinal(self, symbol, timeframe, compra, venda, votos_compra, votos_venda, close, detalhes=None):
+        self._enfileirar('sinais', (time.time(), symbol, timeframe, int(compra), int(venda), int(votos_compra),
+                                    int(votos_venda), float(close), json.dumps(detalhes) if detalhes else None))
+
+    def registrar_ordem(self, request, resultado=None):
+        """Registra a requisição e, se houver, o resultado de order_send"""
+        retcode = ticket = deal = preco_execucao = comentario = None
+        if resultado is not None:
+            retcode, ticket, deal = resultado.retcode, resultado.order, resultado.deal
+            preco_execucao, comentario = resultado.price, resultado.comment
+        self._enfileirar('ordens', (time.time(), request.get('symbol'), request.get('type'), request.get('volume'),
+                                    request.get('price'), request.get('sl'), request.get('tp'), request.get('magic'),
+                                    retcode, ticket, deal, preco_execucao, comentario,
+                                    json.dumps(request, default=str)))
+
+    def registrar_alocacao(self, request, origem, resultado):
+        """Parte de uma ordem do roteador atribuída a uma estratégia (ticket = ordem em `ordens`, 0 se não abriu)"""
+        self._enfileirar('alocacoes', (time.time(), request.get('symbol'), origem, request.get('type'),
+                                       request.get('volume'), resultado.volume, resultado.retcode, resultado.order,
+                                       resultado.comment))
+
+    def registrar_deal(self, deal):
+        """Registra um negócio (fill) vindo de history_deals_get"""
+        self._enfileirar('deals', (deal.ticket, deal.time, deal.symbol, deal.type, deal.entry, deal.magic,
+                                   deal.position_id, deal.volume, deal.price, deal.profit, deal.commission,
+                                   deal.swap))
+
+    # ---- thread de escrita ---------------------------------------------------------------------
+
+    def conectar(self):
+        conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        conexao.executescript(ESQUEMA)
+        return conexao
+
+    def _escrever(self):
+        conexao = None
+        try:
+            while self._ativo or not self._fila.empty():
+                lote = self._coletar_lote()
+                if not lote:
+                    continue
+                # Um erro do SQLite perde só o lote (desfeito): a thread continua gravando os próximos
+                try:
+                    if conexao is None:
+                        conexao = self.conectar()
+                    self._gravar(conexao, lote)
+                except sqlite3.Error as e:
+                    self.perdidos += len(lote)
+                    self._logar(f"❌ Journal: {len(lote)} registro(s) não gravados: {e}")
+                    if conexao is not None:
+                        conexao.close()
+                        conexao = None  # Reabre no próximo lote
+        finally:
+            if conexao is not None:
+                conexao.close()
+
+    def _coletar_lote(self):
+        """Espera o primeiro registro e junta o que chegar até o lote encher ou o intervalo passar"""
+        try:
+            lote = [self._fila.get(timeout=self.intervalo_commit)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.intervalo_commit
+        while len(lote) < self.tamanho_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _gravar(self, conexao, lote):
+        por_tabela = {}
+        for tabela, valores in lote:
+            por_tabela.setdefault(tabela, []).append(valores)
+        with conexao:
+            for tabela, linhas in por_tabela.items():
+                conexao.executemany(INSERTS[tabela], linhas)
+        self.gravados += len(lote)
+
+    def tamanho(self):
+        """Registros na fila aguardando gravação"""
+        return self._fila.qsize()
+
+    def bytes_retidos(self):
+        """Bytes retidos pela fila (monitor de memória)"""
+        with self._fila.mutex:
+            pendentes = list(self._fila.queue)
+        return tamanho_profundo(pendentes)
+
+    def estatisticas(self):
+        return {
+            'gravados': self.gravados,
+            'descartados': self.descartados,
+            'perdidos': self.perdidos,
+            'fila': self._fila.qsize(),
+        }
+
+    # ---- consultas (análise pós-trade) ---------------------------------------------------------
+
+    def consultar(self, sql, parametros=()):
+        """Executa uma consulta somente leitura em uma conexão separada (WAL permite leitura concorrente)"""
+        conexao = sqlite3.connect(f"file:{self.caminho}?mode=ro", uri=True)
+        try:
+            return conexao.execute(sql, parametros).fetchall()
+        finally:
+            conexao.close()
+
+
+# Create global journal instance
+journal = Journal()
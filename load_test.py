@@ -0,0 +1,226 @@
+"""Teste de carga: quantas estratégias simultâneas o robô aguenta.
+
+Sobe N instâncias de EstrategiaTrading (threads reais, como no painel) em M ativos sintéticos do
+MT5 simulado em tempo acelerado e aumenta N em degraus. Em cada degrau mede a latência dos ciclos,
+os fechamentos de barra perdidos (barras que nenhuma análise viu), CPU, threads, profundidade da
+fila de log e a espera no portão do terminal. O resultado é uma curva de capacidade em JSON,
+comparável entre versões.
+
+Exemplos:
+    python load_test.py --niveis 10 50 100 200 --ativos 50 --duracao 30
+    python load_test.py --saida carga_nova.json --comparar carga_atual.json --limite 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from soak_test import TextoMemoria
+
+
+class Medidor:
+    """Latências e barras vistas por estratégia durante a janela de medição"""
+
+    def __init__(self):
+        self.latencias = deque()
+        self.barras_vistas = {}  # id da estratégia -> horários de barra observados
+        self.medindo = False
+
+    def instrumentar(self, estrategia):
+        analisar = estrategia.analisar_e_operar
+        vistas = self.barras_vistas.setdefault(id(estrategia), set())
+
+        def analisar_cronometrado():
+            inicio = time.perf_counter()
+            try:
+                analisar()
+            finally:
+                if self.medindo:
+                    self.latencias.append(time.perf_counter() - inicio)
+                    vistas.add(estrategia.barras.ultimo_tempo())
+        estrategia.analisar_e_operar = analisar_cronometrado
+
+    def reiniciar(self):
+        self.latencias.clear()
+        for vistas in self.barras_vistas.values():
+            vistas.clear()
+
+
+def amostrar_fila(log, parar, amostras, intervalo=0.1):
+    """Drena o log como o quadro da UI (10 por segundo) e registra a fila antes de cada drenagem"""
+    while not parar.is_set():
+        amostras.append(log.tamanho())
+        log.drenar()
+        parar.wait(intervalo)
+
+
+def medir_degrau(n, terminal, estrategias, medidor, log, segundos_barra, args):
+    from mt5_gate import controlador_mt5
+
+    medidor.medindo = False
+    time.sleep(args.aquecimento)  # Estratégias novas baixam o histórico inteiro no primeiro ciclo
+    medidor.reiniciar()
+    fila = deque()
+    parar_fila = threading.Event()
+    threading.Thread(target=amostrar_fila, args=(log, parar_fila, fila), daemon=True).start()
+
+    inicio_sim = terminal.agora()
+    inicio_real = time.perf_counter()
+    inicio_cpu = time.process_time()
+    chamadas_antes = sum(terminal.chamadas.values())
+    medidor.medindo = True
+    time.sleep(args.duracao)
+    medidor.medindo = False
+    duracao_real = time.perf_counter() - inicio_real
+    cpu = (time.process_time() - inicio_cpu) / duracao_real * 100
+    fim_sim = terminal.agora()
+    parar_fila.set()
+
+    # Fechamentos de barra no período contra barras novas efetivamente vistas por cada estratégia
+    barra_inicial = inicio_sim // segundos_barra * segundos_barra
+    fechamentos = int(fim_sim // segundos_barra * segundos_barra - barra_inicial) // segundos_barra
+    perdidas = 0
+    for estrategia in estrategias:
+        novas = {t for t in medidor.barras_vistas[id(estrategia)] if t is not None and t > barra_inicial}
+        perdidas += max(0, fechamentos - len(novas))
+
+    latencias = np.array(medidor.latencias) * 1000
+    esperas = controlador_mt5.estatisticas()
+    return {
+        'estrategias': n,
+        'ciclos': int(len(latencias)),
+        'ciclos_por_segundo': len(latencias) / duracao_real,
+        'latencia_p50_ms': float(np.percentile(latencias, 50)) if len(latencias) else None,
+        'latencia_p95_ms': float(np.percentile(latencias, 95)) if len(latencias) else None,
+        'latencia_p99_ms': float(np.percentile(latencias, 99)) if len(latencias) else None,
+        'latencia_max_ms': float(latencias.max()) if len(latencias) else None,
+        'fechamentos_esperados': fechamentos * n,
+        'barras_perdidas': perdidas,
+        'fracao_perdida': perdidas / max(1, fechamentos * n),
+        'cpu_pct': cpu,
+        'threads': threading.active_count(),
+        'fila_log_media': float(np.mean(fila)) if fila else 0.0,
+        'fila_log_max': int(max(fila)) if fila else 0,
+        'chamadas_terminal_por_segundo': (sum(terminal.chamadas.values()) - chamadas_antes) / duracao_real,
+        'espera_portao_p95_ms': esperas['dados']['espera_p95_ms'],
+    }
+
+
+def executar(args):
+    import fake_mt5
+    terminal = fake_mt5.instalar(n_symbols=args.ativos, tempo_real=True, velocidade=args.velocidade,
+                                 ticks_por_segundo=args.ticks_por_segundo, latencia=args.latencia)
+
+    from estrategia import EstrategiaTrading
+    from log_system import LogSystem
+    from multi_timeframe import segundos_resolucao
+
+    log = LogSystem()
+    nomes = list(terminal.symbols)
+    for i in range(args.ativos):
+        log.add_log_widget(nomes[i], TextoMemoria())
+
+    segundos_barra = segundos_resolucao(args.timeframe)
+    medidor = Medidor()
+    estrategias = []
+    curva = []
+    try:
+        for n in sorted(args.niveis):
+            while len(estrategias) < n:
+                estrategia = EstrategiaTrading(nomes[len(estrategias) % args.ativos], args.timeframe, 0.1, log)
+                medidor.instrumentar(estrategia)
+                estrategias.append(estrategia)
+                threading.Thread(target=estrategia.executar, daemon=True).start()
+
+            degrau = medir_degrau(n, terminal, estrategias, medidor, log, segundos_barra, args)
+            curva.append(degrau)
+            p95 = degrau['latencia_p95_ms']
+            print(f"N={n:4d}  ciclos/s {degrau['ciclos_por_segundo']:7.1f}  p95 "
+                  f"{p95 if p95 is not None else float('nan'):8.1f} ms  perdidas {degrau['fracao_perdida']:6.1%}  "
+                  f"CPU {degrau['cpu_pct']:5.0f}%  threads {degrau['threads']:4d}  fila log {degrau['fila_log_max']:5d}")
+    finally:
+        for estrategia in estrategias:
+            estrategia.parar()
+    return curva
+
+
+def comparar(atual, base, limite):
+    """Degraus (mesmo N) em que o p95 ou a fração de barras perdidas piorou além do limite"""
+    anteriores = {d['estrategias']: d for d in base['curva']}
+    regressoes = []
+    for degrau in atual['curva']:
+        anterior = anteriores.get(degrau['estrategias'])
+        if not anterior or not anterior['latencia_p95_ms'] or degrau['latencia_p95_ms'] is None:
+            continue
+        variacao = degrau['latencia_p95_ms'] / anterior['latencia_p95_ms'] - 1
+        piorou = variacao > limite or degrau['fracao_perdida'] > anterior['fracao_perdida'] + 0.01
+        marca = '❌' if piorou else '✅'
+        print(f"{marca} N={degrau['estrategias']:4d}  p95 {anterior['latencia_p95_ms']:8.1f} -> "
+              f"{degrau['latencia_p95_ms']:8.1f} ms ({variacao:+.1%})  perdidas "
+              f"{anterior['fracao_perdida']:.1%} -> {degrau['fracao_perdida']:.1%}")
+        if piorou:
+            regressoes.append(degrau['estrategias'])
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Curva de capacidade do Future MT5 contra o MT5 simulado")
+    parser.add_argument('--niveis', type=int, nargs='+', default=[10, 25, 50, 100, 200],
+                        help="Número de estratégias em cada degrau")
+    parser.add_argument('--ativos', type=int, default=50, help="Ativos sintéticos (estratégias distribuídas entre eles)")
+    parser.add_argument('--timeframe', default='M5')
+    parser.add_argument('--velocidade', type=float, default=30.0, help="Segundos simulados por segundo real")
+    parser.add_argument('--ticks-por-segundo', type=float, default=2.0, help="Ticks por segundo simulado")
+    parser.add_argument('--latencia', type=float, default=0.0, help="Latência por chamada ao terminal (s)")
+    parser.add_argument('--aquecimento', type=float, default=8.0, help="Segundos ignorados no início de cada degrau")
+    parser.add_argument('--duracao', type=float, default=30.0, help="Segundos medidos em cada degrau")
+    parser.add_argument('--saida', default='carga_resultados.json')
+    parser.add_argument('--comparar', help="JSON de uma execução anterior")
+    parser.add_argument('--limite', type=float, default=0.25, help="Piora máxima aceita do p95 (0.25 = +25%%)")
+    args = parser.parse_args()
+
+    # Ledger, snapshot e journal gravam no diretório atual: o teste roda em um diretório temporário
+    saida = os.path.abspath(args.saida)
+    comparar_com = os.path.abspath(args.comparar) if args.comparar else None
+    os.chdir(tempfile.mkdtemp(prefix='carga_'))
+
+    curva = executar(args)
+    atual = {
+        'meta': {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'ativos': args.ativos,
+            'timeframe': args.timeframe,
+            'velocidade': args.velocidade,
+            'ticks_por_segundo': args.ticks_por_segundo,
+            'latencia': args.latencia,
+            'duracao': args.duracao,
+        },
+        'curva': curva,
+    }
+    with open(saida, 'w') as f:
+        json.dump(atual, f, indent=2)
+    print(f"💾 Curva de capacidade salva em {saida}")
+
+    if comparar_com:
+        with open(comparar_com) as f:
+            base = json.load(f)
+        regressoes = comparar(atual, base, args.limite)
+        if regressoes:
+            print(f"❌ Regressão nos degraus: {', '.join(map(str, regressoes))}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
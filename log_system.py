@@ -1,10 +1,14 @@
 import time
+from collections import deque
 from datetime import datetime
 import tkinter as tk
+from event_bus import barramento, TOPICO_LOG, EventoLog
+from memory_monitor import tamanho_profundo
 
 class LogSystem:
     def __init__(self):
         self.log_widgets = {}  # Dictionary to store text widgets for each asset
+        self._fila = deque(maxlen=5000)  # Pending messages; oldest dropped if the UI falls behind
         self.colors = {
             'success': '#2ecc71',
             'warning': '#f1c40f',
@@ -44,29 +48,40 @@ class LogSystem:
         return 'default'
 
     def logar(self, mensagem, asset=None):
-        """Log a message to a specific asset's widget or all widgets if asset is None"""
+        """Queue a message for a specific asset's widget or all widgets if asset is None (any thread)"""
         timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
         msg_type = self.get_message_type(mensagem)
-        texto_final = f"[{timestamp}] {mensagem}\n"
+        self._fila.append((asset, f"[{timestamp}] {mensagem}\n", msg_type))
+        if barramento.tem_assinantes(TOPICO_LOG):
+            barramento.publicar(TOPICO_LOG, EventoLog(asset, mensagem, msg_type))
 
-        if asset and asset in self.log_widgets:
-            # Log to specific asset widget
-            widget = self.log_widgets[asset]
-            widget.insert('end', texto_final, msg_type)
+    def tamanho(self):
+        """Pending messages not yet drawn"""
+        return len(self._fila)
+
+    def bytes_retidos(self):
+        """Bytes held by the pending messages (memory monitor)"""
+        return tamanho_profundo(self._fila)
+
+    def drenar(self, max_mensagens=500):
+        """Write queued messages to the widgets; called from the Tk thread on each UI frame"""
+        tocados = {}
+        for _ in range(min(max_mensagens, len(self._fila))):
+            asset, texto_final, msg_type = self._fila.popleft()
+            if asset:
+                widgets = (self.log_widgets[asset],) if asset in self.log_widgets else ()
+            else:
+                widgets = tuple(self.log_widgets.values())
+            for widget in widgets:
+                widget.insert('end', texto_final, msg_type)
+                tocados[id(widget)] = widget
+
+        # Scroll and trim once per widget per frame
+        for widget in tocados.values():
             widget.see('end')
-            
             # Limit log size to prevent memory issues
             if float(widget.index('end')) > 1000:  # Keep last 1000 lines
                 widget.delete('1.0', '500.0')
-        elif not asset:
-            # Log to all widgets if no specific asset
-            for widget in self.log_widgets.values():
-                widget.insert('end', texto_final, msg_type)
-                widget.see('end')
-                
-                # Limit log size
-                if float(widget.index('end')) > 1000:
-                    widget.delete('1.0', '500.0')
 
     def clear_logs(self, asset=None):
         """Clear logs for a specific asset or all assets"""
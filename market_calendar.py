@@ -0,0 +1,132 @@
+import threading
+import time
+
+from mt5_gate import cliente_mt5, PRIORIDADE_DADOS
+import numpy as np
+
+mt5 = cliente_mt5(PRIORIDADE_DADOS)
+
+MINUTOS_SEMANA = 7 * 24 * 60
+# 01/01/1970 foi uma quinta-feira: deslocamento para a semana começar na segunda-feira
+DESLOCAMENTO_EPOCH = 3 * 24 * 60
+
+# Um tick mais afastado que isso de um múltiplo de 30 min do relógio local é antigo (mercado fechado)
+# e não revela o fuso do servidor
+TOLERANCIA_TICK_OFFSET = 120
+
+_offset_conhecido = None  # Último offset obtido de um tick recente (o servidor é o mesmo para todos os ativos)
+
+
+def offset_servidor(tick, padrao=0):
+    """Servidor - relógio local (múltiplo de 30 min) a partir de um tick recente.
+
+    Com tick antigo ou ausente retorna o último offset confiável já obtido ou, sem nenhum, `padrao`.
+    """
+    global _offset_conhecido
+    if tick is not None and tick.time:
+        diferenca = tick.time - time.time()
+        offset = int(round(diferenca / 1800.0)) * 1800
+        if abs(diferenca - offset) <= TOLERANCIA_TICK_OFFSET:
+            _offset_conhecido = offset
+            return offset
+    return _offset_conhecido if _offset_conhecido is not None else padrao
+
+
+def offset_confiavel(tick):
+    """Se o tick é recente o bastante para o offset calculado com ele valer"""
+    if tick is None or not tick.time:
+        return False
+    diferenca = tick.time - time.time()
+    return abs(diferenca - round(diferenca / 1800.0) * 1800) <= TOLERANCIA_TICK_OFFSET
+
+
+def minuto_da_semana(epoch):
+    """Minuto da semana (0 = segunda 00:00) de um horário em segundos"""
+    return (int(epoch) // 60 + DESLOCAMENTO_EPOCH) % MINUTOS_SEMANA
+
+
+class CalendarioSessoes:
+    """Sessões de negociação de um ativo por minuto da semana, com consultas O(1)"""
+
+    def __init__(self, ativo, aberto, offset_servidor=0, provisorio=False):
+        self.ativo = ativo
+        self.aberto = np.asarray(aberto, dtype=bool)
+        self.offset_servidor = offset_servidor  # Servidor - relógio local, em segundos
+        self.criado_em = time.monotonic()
+        self._minutos_ate_abrir = self._calcular_minutos_ate_abrir()
+        # Offset de um tick antigo (mercado fechado): vale só até a próxima abertura estimada
+        validade = VALIDADE_CALENDARIO
+        if provisorio:
+            faltam = self.segundos_ate_abrir()
+            validade = min(VALIDADE_PROVISORIA, max(60, faltam or 0))
+        self.valido_ate = self.criado_em + validade
+
+    def _calcular_minutos_ate_abrir(self):
+        """Para cada minuto da semana, quantos minutos faltam para a próxima abertura (0 se aberto)"""
+        abertos = np.flatnonzero(self.aberto)
+        if len(abertos) == 0:
+            return np.full(MINUTOS_SEMANA, -1, dtype=np.int32)
+        minutos = np.arange(MINUTOS_SEMANA)
+        # Próximo minuto aberto (com volta para a semana seguinte)
+        posicao = np.searchsorted(abertos, minutos)
+        proximo = np.append(abertos, abertos[0] + MINUTOS_SEMANA)[posicao]
+        return (proximo - minutos).astype(np.int32)
+
+    @classmethod
+    def construir(cls, ativo, semanas=4):
+        """Infere as sessões a partir dos horários das barras M5 das últimas semanas"""
+        barras_por_semana = MINUTOS_SEMANA // 5
+        barras = mt5.copy_rates_from_pos(ativo, mt5.TIMEFRAME_M5, 0, barras_por_semana * semanas)
+        if barras is None or len(barras) == 0:
+            # Sem histórico: considera sempre aberto (comportamento anterior)
+            return cls(ativo, np.ones(MINUTOS_SEMANA, dtype=bool))
+
+        inicio = (barras['time'] // 60 + DESLOCAMENTO_EPOCH) % MINUTOS_SEMANA
+        aberto = np.zeros(MINUTOS_SEMANA, dtype=bool)
+        for deslocamento in range(5):
+            aberto[(inicio + deslocamento) % MINUTOS_SEMANA] = True
+
+        tick = mt5.symbol_info_tick(ativo)
+        return cls(ativo, aberto, offset_servidor(tick), provisorio=not offset_confiavel(tick))
+
+    def agora_servidor(self):
+        return time.time() + self.offset_servidor
+
+    def esta_aberto(self, epoch_servidor=None):
+        if epoch_servidor is None:
+            epoch_servidor = self.agora_servidor()
+        return bool(self.aberto[minuto_da_semana(epoch_servidor)])
+
+    def segundos_ate_abrir(self, epoch_servidor=None):
+        """Segundos até a próxima abertura (0 se aberto agora, None se nunca abre)"""
+        if epoch_servidor is None:
+            epoch_servidor = self.agora_servidor()
+        faltam = int(self._minutos_ate_abrir[minuto_da_semana(epoch_servidor)])
+        if faltam < 0:
+            return None
+        if faltam == 0:
+            return 0
+        return faltam * 60 - int(epoch_servidor) % 60
+
+    def proxima_abertura(self, epoch_servidor=None):
+        """Horário (servidor) da próxima abertura"""
+        if epoch_servidor is None:
+            epoch_servidor = self.agora_servidor()
+        segundos = self.segundos_ate_abrir(epoch_servidor)
+        return None if segundos is None else int(epoch_servidor) + segundos
+
+
+_calendarios = {}
+_calendarios_lock = threading.Lock()
+VALIDADE_CALENDARIO = 24 * 3600  # Reconstrói as sessões uma vez por dia
+VALIDADE_PROVISORIA = 3600  # Sem tick recente: reconstrói na próxima abertura estimada (no máximo em 1 h)
+
+
+def obter_calendario(ativo):
+    """Calendário cacheado por ativo"""
+    with _calendarios_lock:
+        calendario = _calendarios.get(ativo)
+        if calendario is None or time.monotonic() > calendario.valido_ate:
+            calendario = CalendarioSessoes.construir(ativo)
+            _calendarios[ativo] = calendario
+        return calendario
@@ -0,0 +1,176 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # Opcional: sem ele o RSS vem de /proc (Linux) ou não é medido
+    psutil = None
+
+
+def rss_atual():
+    """Memória residente do processo em bytes (None se não houver como medir)"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def tamanho_profundo(objeto, _vistos=None):
+    """Bytes de um objeto e do que ele contém (dicts, listas, deques, arrays NumPy...)"""
+    vistos = set() if _vistos is None else _vistos
+    if id(objeto) in vistos:
+        return 0
+    vistos.add(id(objeto))
+    if isinstance(objeto, np.ndarray):
+        return sys.getsizeof(objeto) + (objeto.nbytes if objeto.base is None else 0)
+    total = sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        for chave, valor in list(objeto.items()):
+            total += tamanho_profundo(chave, vistos) + tamanho_profundo(valor, vistos)
+    elif isinstance(objeto, (list, tuple, set, frozenset, deque)):
+        for item in list(objeto):
+            total += tamanho_profundo(item, vistos)
+    elif hasattr(objeto, '__dict__') and not isinstance(objeto, type):
+        total += tamanho_profundo(vars(objeto), vistos)
+    elif hasattr(objeto, '__slots__'):
+        for nome in objeto.__slots__:
+            total += tamanho_profundo(getattr(objeto, nome, None), vistos)
+    return total
+
+
+class MonitorMemoria:
+    """Amostras periódicas de RSS, contagem de bytes por subsistema e diffs de tracemalloc"""
+
+    def __init__(self, intervalo=300.0, rastrear=False, quadros=1, top=15, max_amostras=2000):
+        self.intervalo = intervalo  # Segundos entre amostras
+        self.rastrear = rastrear  # tracemalloc custa CPU em toda alocação: só em testes (soak_test) ou se pedido
+        self.quadros = quadros  # Profundidade da pilha guardada por alocação
+        self.top = top  # Linhas de código que mais cresceram, por diff
+        self.log_system = None
+        self.amostras = deque(maxlen=max_amostras)
+        self.diffs = deque(maxlen=50)
+        self._subsistemas = {}  # nome -> função que retorna bytes
+        self._snapshot_anterior = None
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._monitoring = False
+        self._monitor_thread = None
+
+    def registrar(self, nome, medir):
+        """Registra um subsistema; `medir()` retorna os bytes que ele retém"""
+        with self._lock:
+            self._subsistemas[nome] = medir
+
+    def _logar(self, mensagem):
+        if self.log_system:
+            self.log_system.logar(mensagem)
+
+    # ---- medição -------------------------------------------------------------------------------
+
+    def medir_subsistemas(self):
+        with self._lock:
+            subsistemas = list(self._subsistemas.items())
+        bytes_por_subsistema = {}
+        for nome, medir in subsistemas:
+            try:
+                bytes_por_subsistema[nome] = int(medir())
+            except Exception:
+                bytes_por_subsistema[nome] = None
+        return bytes_por_subsistema
+
+    def diff_tracemalloc(self):
+        """Linhas que mais alocaram desde o snapshot anterior (vazio no primeiro)"""
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        anterior, self._snapshot_anterior = self._snapshot_anterior, snapshot
+        if anterior is None:
+            return []
+        return [
+            {'local': str(estatistica.traceback[0]), 'bytes': estatistica.size,
+             'variacao_bytes': estatistica.size_diff, 'variacao_blocos': estatistica.count_diff}
+            for estatistica in snapshot.compare_to(anterior, 'lineno')[:self.top]
+        ]
+
+    def amostrar(self):
+        """Uma amostra completa: RSS, tracemalloc, subsistemas e o diff desde a anterior"""
+        amostra = {'tempo': time.time(), 'rss': rss_atual(), 'subsistemas': self.medir_subsistemas()}
+        if tracemalloc.is_tracing():
+            amostra['tracemalloc_atual'], amostra['tracemalloc_pico'] = tracemalloc.get_traced_memory()
+            diff = self.diff_tracemalloc()
+            if diff:
+                self.diffs.append({'tempo': amostra['tempo'], 'linhas': diff})
+        self.amostras.append(amostra)
+        return amostra
+
+    def tendencia_rss(self, janela=None):
+        """Crescimento do RSS em bytes/hora (regressão linear sobre as últimas `janela` amostras)"""
+        amostras = [a for a in list(self.amostras)[-(janela or 0):] if a['rss'] is not None]
+        if len(amostras) < 3:
+            return None
+        tempos = np.array([a['tempo'] for a in amostras])
+        rss = np.array([a['rss'] for a in amostras], dtype=np.float64)
+        if tempos[-1] == tempos[0]:
+            return None
+        return float(np.polyfit(tempos - tempos[0], rss, 1)[0] * 3600)
+
+    # ---- background ----------------------------------------------------------------------------
+
+    def start_monitoring(self):
+        """Inicia as amostras periódicas (e o tracemalloc, se habilitado)"""
+        if self._monitoring:
+            return
+        if self.rastrear and not tracemalloc.is_tracing():
+            tracemalloc.start(self.quadros)
+        self._monitoring = True
+        self._parar.clear()
+        self._monitor_thread = threading.Thread(target=self._monitor_memory, daemon=True)
+        self._monitor_thread.start()
+
+    def stop_monitoring(self):
+        self._monitoring = False
+        self._parar.set()
+        if self._monitor_thread:
+            self._monitor_thread.join()
+            self._monitor_thread = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._snapshot_anterior = None
+
+    def _monitor_memory(self):
+        while self._monitoring:
+            try:
+                amostra = self.amostrar()
+                tendencia = self.tendencia_rss(janela=12)
+                if tendencia is not None and tendencia > 50 * 2 ** 20:
+                    self._logar(f"⚠️ Memória crescendo {tendencia / 2 ** 20:.0f} MB/h "
+                                f"(RSS {amostra['rss'] / 2 ** 20:.0f} MB)")
+            except Exception as e:
+                self._logar(f"❌ Erro no monitor de memória: {e}")
+            self._parar.wait(self.intervalo)
+
+    def exportar(self, caminho):
+        """Grava amostras, tendência e diffs em JSON"""
+        with open(caminho, 'w') as f:
+            json.dump({
+                'tendencia_rss_bytes_hora': self.tendencia_rss(),
+                'amostras': list(self.amostras),
+                'diffs': list(self.diffs),
+            }, f, indent=2)
+
+
+# Create global memory monitor instance
+monitor_memoria = MonitorMemoria()
@@ -0,0 +1,166 @@
+"""Análise de robustez por Monte Carlo das sequências de operações da estratégia.
+
+A partir da lista de resultados por operação (walk-forward/backtest ou o journal), gera dezenas
+de milhares de sequências reamostradas ou embaralhadas, com slippage e operações puladas
+opcionais, e calcula as distribuições de drawdown, tempo debaixo d'água e risco de ruína.
+Tudo em matrizes NumPy processadas em lotes, com memória limitada.
+
+Exemplos:
+    python monte_carlo.py --walk-forward walk_forward.json --multiplicador 10000 --capital 10000
+    python monte_carlo.py --journal journal.db --magic 123456 --metodo embaralhar --pular 0.05
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+PERCENTIS = (1, 5, 25, 50, 75, 95, 99)
+DEAL_ENTRY_OUT = 1  # Negócio de saída: carrega o resultado da operação
+
+
+def operacoes_walk_forward(caminho):
+    """Resultados fora da amostra, em ordem, de um JSON do walk_forward.py"""
+    with open(caminho) as f:
+        dados = json.load(f)
+    return np.array([r for janela in dados['janelas'] for r in janela['resultados']], dtype=np.float64)
+
+
+def operacoes_journal(caminho, ativo=None, magic=None):
+    """Resultado líquido (lucro + comissão + swap) de cada negócio de saída registrado no journal"""
+    from journal import Journal
+
+    sql = "SELECT lucro + comissao + swap FROM deals WHERE entrada = ?"
+    parametros = [DEAL_ENTRY_OUT]
+    if ativo:
+        sql += " AND symbol = ?"
+        parametros.append(ativo)
+    if magic is not None:
+        sql += " AND magic = ?"
+        parametros.append(magic)
+    linhas = Journal(caminho).consultar(sql + " ORDER BY time, ticket", parametros)
+    return np.array([linha[0] for linha in linhas], dtype=np.float64)
+
+
+def _maior_sequencia(mascara):
+    """Maior sequência de True consecutivos em cada linha (vetorizado)"""
+    n = mascara.shape[1]
+    indices = np.arange(1, n + 1)
+    # Última posição fora da sequência até cada ponto; comprimento = distância até ela
+    ultima_quebra = np.maximum.accumulate(np.where(mascara, 0, indices), axis=1)
+    return (indices - ultima_quebra).max(axis=1)
+
+
+def _lote(resultados, quantidade, metodo, slippage, prob_pular, capital, nivel_ruina, rng):
+    n = len(resultados)
+    if metodo == 'bootstrap':
+        amostras = resultados[rng.integers(0, n, size=(quantidade, n))]
+    else:
+        amostras = rng.permuted(np.broadcast_to(resultados, (quantidade, n)), axis=1)
+    if slippage:
+        amostras = amostras - rng.uniform(0, slippage, size=amostras.shape)
+    if prob_pular:
+        amostras = np.where(rng.random(amostras.shape) < prob_pular, 0.0, amostras)
+
+    equity = capital + np.cumsum(amostras, axis=1)
+    pico = np.maximum(np.maximum.accumulate(equity, axis=1), capital)
+    drawdown = pico - equity
+    debaixo = drawdown > 0
+    return {
+        'resultado': equity[:, -1] - capital,
+        'max_drawdown': drawdown.max(axis=1),
+        'max_drawdown_pct': (drawdown / pico).max(axis=1) * 100,
+        'maior_periodo_debaixo': _maior_sequencia(debaixo),
+        'fracao_debaixo': debaixo.mean(axis=1),
+        'ruina': equity.min(axis=1) <= nivel_ruina,
+    }
+
+
+def simular(resultados, simulacoes=20000, metodo='bootstrap', slippage=0.0, prob_pular=0.0,
+            capital=10000.0, ruina_pct=50.0, memoria_mb=256, seed=None):
+    """Gera as sequências em lotes e retorna as métricas por simulação (arrays de tamanho `simulacoes`).
+
+    metodo: 'bootstrap' (reamostragem com reposição) ou 'embaralhar' (permutação da ordem).
+    slippage: custo extra por operação, sorteado uniformemente entre 0 e o valor dado.
+    prob_pular: probabilidade de cada operação não acontecer.
+    ruina_pct: perda, em % do capital inicial, considerada ruína.
+    """
+    resultados = np.asarray(resultados, dtype=np.float64)
+    if len(resultados) == 0:
+        raise ValueError("Nenhuma operação para simular")
+    if metodo not in ('bootstrap', 'embaralhar'):
+        raise ValueError(f"Método inválido: {metodo}")
+
+    rng = np.random.default_rng(seed)
+    # Cada lote mantém cerca de 6 matrizes (simulações x operações) de float64 vivas ao mesmo tempo
+    tamanho_lote = max(1, int(memoria_mb * 2 ** 20 // (len(resultados) * 8 * 6)))
+    nivel_ruina = capital * (1 - ruina_pct / 100)
+
+    partes = []
+    for inicio in range(0, simulacoes, tamanho_lote):
+        quantidade = min(tamanho_lote, simulacoes - inicio)
+        partes.append(_lote(resultados, quantidade, metodo, slippage, prob_pular, capital, nivel_ruina, rng))
+    return {nome: np.concatenate([p[nome] for p in partes]) for nome in partes[0]}
+
+
+def resumir(metricas):
+    """Percentis de cada distribuição e a probabilidade de ruína"""
+    resumo = {'simulacoes': int(len(metricas['ruina'])), 'risco_ruina': float(metricas['ruina'].mean())}
+    for nome, valores in metricas.items():
+        if nome == 'ruina':
+            continue
+        resumo[nome] = {f"p{p}": float(v) for p, v in zip(PERCENTIS, np.percentile(valores, PERCENTIS))}
+        resumo[nome]['media'] = float(valores.mean())
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo de robustez das operações da estratégia")
+    origem = parser.add_mutually_exclusive_group(required=True)
+    origem.add_argument('--walk-forward', help="JSON gerado pelo walk_forward.py (operações fora da amostra)")
+    origem.add_argument('--journal', help="Banco SQLite do journal (negócios de saída)")
+    parser.add_argument('--ativo', help="Filtra o journal por ativo")
+    parser.add_argument('--magic', type=int, help="Filtra o journal pelo magic number")
+    parser.add_argument('--multiplicador', type=float, default=1.0,
+                        help="Converte o resultado por operação em dinheiro (ex.: lote x tamanho do contrato)")
+    parser.add_argument('--capital', type=float, default=10000.0)
+    parser.add_argument('--simulacoes', type=int, default=20000)
+    parser.add_argument('--metodo', default='bootstrap', choices=['bootstrap', 'embaralhar'])
+    parser.add_argument('--slippage', type=float, default=0.0, help="Custo extra máximo por operação (dinheiro)")
+    parser.add_argument('--pular', type=float, default=0.0, help="Probabilidade de pular cada operação")
+    parser.add_argument('--ruina', type=float, default=50.0, help="Perda (%% do capital) considerada ruína")
+    parser.add_argument('--memoria-mb', type=int, default=256, help="Memória máxima por lote")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--saida', default='monte_carlo.json')
+    args = parser.parse_args()
+
+    if args.walk_forward:
+        resultados = operacoes_walk_forward(args.walk_forward)
+    else:
+        resultados = operacoes_journal(args.journal, args.ativo, args.magic)
+    resultados = resultados * args.multiplicador
+
+    inicio = time.perf_counter()
+    metricas = simular(resultados, args.simulacoes, args.metodo, args.slippage, args.pular, args.capital,
+                       args.ruina, args.memoria_mb, args.seed)
+    resumo = resumir(metricas)
+    duracao = time.perf_counter() - inicio
+
+    print(f"🎲 {resumo['simulacoes']} sequências de {len(resultados)} operações em {duracao:.1f}s")
+    for nome in ('resultado', 'max_drawdown', 'max_drawdown_pct', 'maior_periodo_debaixo'):
+        p = resumo[nome]
+        print(f"{nome:24s} p5 {p['p5']:12.2f}   p50 {p['p50']:12.2f}   p95 {p['p95']:12.2f}")
+    print(f"⚠️ Risco de ruína (perda de {args.ruina:.0f}%): {resumo['risco_ruina']:.2%}")
+
+    resumo['meta'] = {'operacoes': len(resultados), 'capital': args.capital, 'metodo': args.metodo,
+                      'slippage': args.slippage, 'pular': args.pular, 'ruina_pct': args.ruina,
+                      'duracao_s': duracao}
+    with open(args.saida, 'w') as f:
+        json.dump(resumo, f, indent=2)
+    print(f"💾 Resultados salvos em {args.saida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
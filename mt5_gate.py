@@ -0,0 +1,160 @@
+import json
+import threading
+import time
+from collections import deque
+
+import MetaTrader5 as _mt5
+
+PRIORIDADE_ORDEM = 0  # order_send / order_check
+PRIORIDADE_DADOS = 1  # Leituras das estratégias e ações do usuário
+PRIORIDADE_UI = 2  # Atualizações periódicas da interface (podem ser descartadas)
+
+NOMES_PRIORIDADE = {PRIORIDADE_ORDEM: 'ordem', PRIORIDADE_DADOS: 'dados', PRIORIDADE_UI: 'ui'}
+
+# Funções que sempre usam a classe de ordens, qualquer que seja o cliente
+FUNCOES_ORDEM = {'order_send', 'order_check'}
+
+
+class ChamadaDescartada(Exception):
+    """Chamada de baixa prioridade descartada porque o terminal está congestionado"""
+
+
+class ControladorMT5:
+    """Portão único para o terminal: prioridades, orçamento de chamadas por classe e descarte de UI"""
+
+    def __init__(self, limites=None, concorrencia=1, max_fila_ui=8, max_espera_ui=0.5):
+        # Chamadas por segundo por classe (o balde comporta um segundo de rajada)
+        self.limites = limites or {PRIORIDADE_ORDEM: 20.0, PRIORIDADE_DADOS: 50.0, PRIORIDADE_UI: 10.0}
+        self.concorrencia = concorrencia  # Chamadas simultâneas ao terminal
+        self.max_fila_ui = max_fila_ui  # Com mais chamadas esperando que isso, a UI é descartada
+        self.max_espera_ui = max_espera_ui  # UI que espera mais que isso é descartada
+        self._cond = threading.Condition()
+        self._tokens = dict(self.limites)
+        self._ultima_recarga = {p: time.monotonic() for p in self.limites}
+        self._esperando = {p: 0 for p in self.limites}
+        self._em_andamento = 0
+        self._esperas = {p: deque(maxlen=2000) for p in self.limites}
+        self._contagem = {p: 0 for p in self.limites}
+        self._descartadas = {p: 0 for p in self.limites}
+
+    def _recarregar(self, prioridade, agora):
+        limite = self.limites[prioridade]
+        decorrido = agora - self._ultima_recarga[prioridade]
+        self._tokens[prioridade] = min(limite, self._tokens[prioridade] + decorrido * limite)
+        self._ultima_recarga[prioridade] = agora
+
+    def _pode_entrar(self, prioridade):
+        if self._em_andamento >= self.concorrencia or self._tokens[prioridade] < 1:
+            return False
+        # Prioridade estrita: classes mais importantes esperando passam na frente
+        return not any(self._esperando[p] for p in self.limites if p < prioridade)
+
+    def adquirir(self, prioridade):
+        inicio = time.monotonic()
+        with self._cond:
+            if prioridade == PRIORIDADE_UI and sum(self._esperando.values()) >= self.max_fila_ui:
+                self._descartadas[prioridade] += 1
+                raise ChamadaDescartada("Terminal congestionado: atualização de UI descartada")
+
+            self._esperando[prioridade] += 1
+            try:
+                while True:
+                    agora = time.monotonic()
+                    self._recarregar(prioridade, agora)
+                    if self._pode_entrar(prioridade):
+                        break
+                    if prioridade == PRIORIDADE_UI and agora - inicio > self.max_espera_ui:
+                        self._descartadas[prioridade] += 1
+                        raise ChamadaDescartada("Terminal congestionado: atualização de UI adiada demais")
+                    if self._tokens[prioridade] < 1:
+                        # Acorda no próximo token (ou quando alguém liberar o terminal)
+                        espera = (1 - self._tokens[prioridade]) / self.limites[prioridade]
+                    else:
+                        espera = None  # Terminal ocupado ou prioridade maior na frente: liberar() notifica
+                    if prioridade == PRIORIDADE_UI:
+                        restante = inicio + self.max_espera_ui - agora
+                        espera = restante if espera is None else min(espera, restante)
+                    self._cond.wait(timeout=espera)
+            finally:
+                self._esperando[prioridade] -= 1
+
+            self._tokens[prioridade] -= 1
+            self._em_andamento += 1
+            self._esperas[prioridade].append(time.monotonic() - inicio)
+            self._contagem[prioridade] += 1
+
+    def definir_limites(self, limites):
+        """Altera o orçamento (chamadas por segundo) de uma ou mais classes"""
+        with self._cond:
+            self.limites.update(limites)
+            for prioridade, limite in limites.items():
+                self._tokens[prioridade] = limite
+            self._cond.notify_all()
+
+    def liberar(self):
+        with self._cond:
+            self._em_andamento -= 1
+            self._cond.notify_all()
+
+    def chamar(self, prioridade, funcao, *args, **kwargs):
+        """Executa uma função do MetaTrader5 respeitando prioridade e orçamento"""
+        self.adquirir(prioridade)
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            self.liberar()
+
+    def estatisticas(self):
+        """Tempo de espera por classe (ms): média, p95 e máximo das últimas chamadas"""
+        with self._cond:
+            resultado = {}
+            for prioridade, esperas in self._esperas.items():
+                ordenadas = sorted(esperas)
+                n = len(ordenadas)
+                resultado[NOMES_PRIORIDADE[prioridade]] = {
+                    'chamadas': self._contagem[prioridade],
+                    'descartadas': self._descartadas[prioridade],
+                    'limite_por_segundo': self.limites[prioridade],
+                    'espera_media_ms': sum(ordenadas) / n * 1000 if n else 0.0,
+                    'espera_p95_ms': ordenadas[min(n - 1, int(n * 0.95))] * 1000 if n else 0.0,
+                    'espera_max_ms': ordenadas[-1] * 1000 if n else 0.0,
+                }
+            return resultado
+
+    def exportar(self, caminho):
+        """Grava as estatísticas em JSON para dimensionar os orçamentos"""
+        with open(caminho, 'w') as f:
+            json.dump(self.estatisticas(), f, indent=2)
+
+
+class ClienteMT5:
+    """Substituto do módulo MetaTrader5 que passa todas as chamadas pelo controlador"""
+
+    def __init__(self, controlador, prioridade):
+        self._controlador = controlador
+        self._prioridade = prioridade
+
+    def __getattr__(self, nome):
+        valor = getattr(_mt5, nome)
+        if callable(valor):
+            prioridade = PRIORIDADE_ORDEM if nome in FUNCOES_ORDEM else self._prioridade
+            controlador = self._controlador
+            funcao = valor  # O nome `valor` é reatribuído abaixo; a closure precisa da função original
+
+            def chamada(*args, **kwargs):
+                return controlador.chamar(prioridade, funcao, *args, **kwargs)
+
+            chamada.__name__ = nome
+            valor = chamada
+        # Cacheia no próprio cliente: próximos acessos não passam por __getattr__
+        setattr(self, nome, valor)
+        return valor
+
+
+# Create global gate instance
+controlador_mt5 = ControladorMT5()
+
+
+def cliente_mt5(prioridade):
+    """Cliente com a prioridade padrão dada, para usar no lugar de `import MetaTrader5 as mt5`"""
+    return ClienteMT5(controlador_mt5, prioridade)
@@ -0,0 +1,284 @@
+from mt5_gate import cliente_mt5, PRIORIDADE_DADOS
+import numpy as np
+import threading
+from datetime import datetime, timedelta, timezone
+
+mt5 = cliente_mt5(PRIORIDADE_DADOS)
+
+# Mesmo layout do array retornado por mt5.copy_rates_*
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tick_volume', '<u8'),
+    ('spread', '<i4'),
+    ('real_volume', '<u8'),
+])
+
+UNIDADES = {'M': 60, 'H': 3600, 'D': 86400}
+
+# Timeframes nativos do MT5 (usados apenas para semear o histórico na assinatura)
+TIMEFRAMES_MT5 = {
+    'M1': mt5.TIMEFRAME_M1,
+    'M5': mt5.TIMEFRAME_M5,
+    'M15': mt5.TIMEFRAME_M15,
+    'M30': mt5.TIMEFRAME_M30,
+    'H1': mt5.TIMEFRAME_H1,
+    'H4': mt5.TIMEFRAME_H4,
+    'D1': mt5.TIMEFRAME_D1,
+}
+
+
+def segundos_resolucao(resolucao):
+    """Converte 'M1', 'M3', 'H4', 'D1'... em segundos (aceita resoluções que o MT5 não oferece)"""
+    unidade, numero = resolucao[0].upper(), resolucao[1:]
+    if unidade not in UNIDADES or not numero.isdigit() or int(numero) <= 0:
+        raise ValueError(f"Resolução inválida: {resolucao}")
+    return UNIDADES[unidade] * int(numero)
+
+
+def agregar_barras(base, segundos):
+    """Agrega barras base (RATES_DTYPE) em barras de `segundos`, de forma vetorizada"""
+    if len(base) == 0:
+        return np.empty(0, dtype=RATES_DTYPE)
+
+    balde = base['time'] // segundos * segundos
+    inicios = np.concatenate(([0], np.flatnonzero(np.diff(balde)) + 1))
+    fins = np.concatenate((inicios[1:], [len(base)])) - 1
+
+    barras = np.empty(len(inicios), dtype=RATES_DTYPE)
+    barras['time'] = balde[inicios]
+    barras['open'] = base['open'][inicios]
+    barras['high'] = np.maximum.reduceat(base['high'], inicios)
+    barras['low'] = np.minimum.reduceat(base['low'], inicios)
+    barras['close'] = base['close'][fins]
+    barras['tick_volume'] = np.add.reduceat(base['tick_volume'], inicios)
+    barras['spread'] = base['spread'][fins]
+    barras['real_volume'] = np.add.reduceat(base['real_volume'], inicios)
+    return barras
+
+
+class AgregadorTempo:
+    """Mantém barras de uma resolução temporal derivadas incrementalmente das barras base"""
+
+    def __init__(self, resolucao, max_barras=500):
+        self.resolucao = resolucao
+        self.segundos = segundos_resolucao(resolucao)
+        self.max_barras = max_barras
+        self.barras = np.empty(0, dtype=RATES_DTYPE)
+
+    def semear(self, barras):
+        """Carrega histórico inicial (nativo do MT5 ou agregado da base)"""
+        self.barras = np.asarray(barras, dtype=RATES_DTYPE)[-self.max_barras:].copy()
+
+    def inicio_barra_aberta(self):
+        """Horário de abertura da última barra (a única que ainda pode mudar)"""
+        return int(self.barras['time'][-1]) if len(self.barras) else None
+
+    def atualizar(self, base):
+        """Recalcula a barra aberta e acrescenta as novas a partir das barras base recentes"""
+        inicio = self.inicio_barra_aberta()
+        if inicio is not None:
+            base = base[base['time'] >= inicio]
+        novas = agregar_barras(base, self.segundos)
+        if len(novas) == 0:
+            return 0
+
+        if inicio is not None and novas['time'][0] == inicio:
+            self.barras[-1] = novas[0]
+            novas = novas[1:]
+        if len(novas):
+            self.barras = np.concatenate((self.barras, novas))[-self.max_barras:]
+        return len(novas)
+
+
+class AgregadorRange:
+    """Barras de range: cada barra fecha quando a amplitude atinge `tamanho` (em preço)"""
+
+    def __init__(self, tamanho, max_barras=500):
+        self.resolucao = f"R{tamanho}"
+        self.tamanho = float(tamanho)
+        self.max_barras = max_barras
+        self.barras = np.empty(0, dtype=RATES_DTYPE)
+        self._aberta = None
+        self.ultimo_tempo = None  # Última barra base fechada já consumida
+
+    def atualizar(self, base):
+        """Consome apenas barras base fechadas (a última da base ainda está em formação)"""
+        fechadas = base[:-1]
+        if self.ultimo_tempo is not None:
+            fechadas = fechadas[fechadas['time'] > self.ultimo_tempo]
+        if len(fechadas) == 0:
+            return 0
+
+        concluidas = []
+        for barra in fechadas:
+            if self._aberta is None:
+                self._aberta = barra.copy()
+                self._aberta['high'] = self._aberta['low'] = barra['open']
+            aberta = self._aberta
+            aberta['high'] = max(aberta['high'], barra['high'])
+            aberta['low'] = min(aberta['low'], barra['low'])
+            aberta['close'] = barra['close']
+            aberta['tick_volume'] += barra['tick_volume']
+            aberta['real_volume'] += barra['real_volume']
+            if aberta['high'] - aberta['low'] >= self.tamanho:
+                concluidas.append(aberta)
+                self._aberta = None
+
+        self.ultimo_tempo = int(fechadas['time'][-1])
+        if concluidas:
+            self.barras = np.concatenate((self.barras, np.array(concluidas, dtype=RATES_DTYPE)))[-self.max_barras:]
+        return len(concluidas)
+
+
+class AgregadorTicks:
+    """Barras de N ticks, alimentadas com arrays de mt5.copy_ticks_*"""
+
+    def __init__(self, ticks_por_barra, max_barras=500):
+        self.resolucao = f"T{ticks_por_barra}"
+        self.ticks_por_barra = int(ticks_por_barra)
+        self.max_barras = max_barras
+        self.barras = np.empty(0, dtype=RATES_DTYPE)
+        self._pendentes = None
+
+    def atualizar(self, base):
+        """Barras de ticks não dependem das barras base"""
+        return 0
+
+    def adicionar_ticks(self, ticks):
+        """Agrega ticks (campos time e bid) em barras completas de N ticks"""
+        if len(ticks) == 0:
+            return 0
+        tempos = np.asarray(ticks['time'], dtype=np.int64)
+        precos = np.asarray(ticks['bid'], dtype=np.float64)
+        if self._pendentes is not None:
+            tempos = np.concatenate((self._pendentes[0], tempos))
+            precos = np.concatenate((self._pendentes[1], precos))
+
+        n = len(precos) // self.ticks_por_barra
+        completos = n * self.ticks_por_barra
+        self._pendentes = (tempos[completos:], precos[completos:])
+        if n == 0:
+            return 0
+
+        blocos = precos[:completos].reshape(n, self.ticks_por_barra)
+        barras = np.zeros(n, dtype=RATES_DTYPE)
+        barras['time'] = tempos[:completos:self.ticks_por_barra]
+        barras['open'] = blocos[:, 0]
+        barras['high'] = blocos.max(axis=1)
+        barras['low'] = blocos.min(axis=1)
+        barras['close'] = blocos[:, -1]
+        barras['tick_volume'] = self.ticks_por_barra
+        self.barras = np.concatenate((self.barras, barras))[-self.max_barras:]
+        return n
+
+
+class FeedMultiTimeframe:
+    """Mantém uma única série base (M1) por ativo e deriva dela todas as resoluções assinadas"""
+
+    def __init__(self, ativo, base='M1', capacidade_base=2000):
+        self.ativo = ativo
+        self.base = base
+        self.timeframe_base = TIMEFRAMES_MT5[base]
+        self.capacidade_base = capacidade_base
+        self.barras_base = np.empty(0, dtype=RATES_DTYPE)
+        self.agregadores = {}
+        self.lock = threading.Lock()
+
+    def assinar(self, resolucao, max_barras=500):
+        """Assina uma resolução: 'M5', 'H4', 'M3' (customizada), 'R0.0050' (range) ou 'T100' (ticks)"""
+        with self.lock:
+            if resolucao in self.agregadores:
+                return self.agregadores[resolucao]
+
+            if resolucao[0] == 'R':
+                agregador = AgregadorRange(float(resolucao[1:]), max_barras)
+            elif resolucao[0] == 'T':
+                agregador = AgregadorTicks(int(resolucao[1:]), max_barras)
+            else:
+                agregador = AgregadorTempo(resolucao, max_barras)
+                # Semeia o histórico uma única vez; daqui em diante só a base é baixada
+                if resolucao in TIMEFRAMES_MT5 and resolucao != self.base:
+                    historico = mt5.copy_rates_from_pos(self.ativo, TIMEFRAMES_MT5[resolucao], 0, max_barras)
+                    if historico is not None and len(historico):
+                        agregador.semear(historico)
+                if len(agregador.barras) == 0 and len(self.barras_base):
+                    agregador.semear(agregar_barras(self.barras_base, agregador.segundos))
+
+            self.agregadores[resolucao] = agregador
+            return agregador
+
+    def cancelar(self, resolucao):
+        with self.lock:
+            self.agregadores.pop(resolucao, None)
+
+    def atualizar(self):
+        """Baixa apenas as barras base novas (e a barra em formação) e propaga aos agregadores"""
+        with self.lock:
+            if len(self.barras_base) == 0:
+                novas = mt5.copy_rates_from_pos(self.ativo, self.timeframe_base, 0, self.capacidade_base)
+            else:
+                inicio = datetime.fromtimestamp(int(self.barras_base['time'][-1]), timezone.utc)
+                # Horário do servidor costuma estar à frente do UTC: margem de um dia no limite superior
+                novas = mt5.copy_rates_range(self.ativo, self.timeframe_base, inicio,
+                                             datetime.now(timezone.utc) + timedelta(days=1))
+            if novas is None or len(novas) == 0:
+                return 0
+
+            novas = np.asarray(novas, dtype=RATES_DTYPE)
+            if len(self.barras_base) and novas['time'][0] == self.barras_base['time'][-1]:
+                self.barras_base[-1] = novas[0]
+                novas = novas[1:]
+            self.barras_base = np.concatenate((self.barras_base, novas))[-self.capacidade_base:]
+
+            for agregador in self.agregadores.values():
+                if len(agregador.barras) == 0 and isinstance(agregador, AgregadorTempo):
+                    agregador.semear(agregar_barras(self.barras_base, agregador.segundos))
+                else:
+                    agregador.atualizar(self.barras_base)
+            return len(novas)
+
+    def restaurar_base(self, barras):
+        """Warm start: série base salva em snapshot; o próximo atualizar() baixa só o que falta"""
+        with self.lock:
+            if len(self.barras_base) == 0:
+                self.barras_base = np.asarray(barras, dtype=RATES_DTYPE)[-self.capacidade_base:].copy()
+
+    def adicionar_ticks(self, ticks):
+        """Encaminha ticks já baixados às barras de ticks assinadas"""
+        with self.lock:
+            for agregador in self.agregadores.values():
+                if isinstance(agregador, AgregadorTicks):
+                    agregador.adicionar_ticks(ticks)
+
+    def barras(self, resolucao, n=None):
+        """Últimas `n` barras da resolução (a última pode estar em formação)"""
+        with self.lock:
+            barras = self.agregadores[resolucao].barras
+            return barras if n is None else barras[-n:]
+
+
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+
+def obter_feed(ativo):
+    """Feed compartilhado por ativo: várias estratégias no mesmo ativo usam a mesma série base"""
+    with _feeds_lock:
+        if ativo not in _feeds:
+            _feeds[ativo] = FeedMultiTimeframe(ativo)
+        return _feeds[ativo]
+
+
+def feeds_ativos():
+    with _feeds_lock:
+        return list(_feeds.values())
+
+
+def atualizar_feeds():
+    """Catch-up de todos os feeds: cada um baixa só as barras desde a última que já tinha"""
+    for feed in feeds_ativos():
+        feed.atualizar()
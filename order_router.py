@@ -0,0 +1,235 @@
+import json
+import math
+import threading
+import time
+from collections import namedtuple
+
+from mt5_gate import cliente_mt5, PRIORIDADE_ORDEM
+from journal import journal
+
+mt5 = cliente_mt5(PRIORIDADE_ORDEM)
+
+# Mesmos campos do resultado de mt5.order_send: o roteador é um substituto direto
+ResultadoRoteado = namedtuple('ResultadoRoteado', 'retcode deal order volume price bid ask comment request_id request')
+
+RETCODE_SEM_RESPOSTA = 10031  # TRADE_RETCODE_CONNECTION: terminal não respondeu
+RETCODE_COMPENSADA = 10007  # TRADE_RETCODE_CANCEL: cancelada por compensar uma intenção oposta (nada abriu)
+
+
+class IntencaoOrdem:
+    """Ordem a mercado pedida por uma estratégia, aguardando a rodada de compensação"""
+
+    __slots__ = ('request', 'origem', 'criada', 'evento', 'resultado')
+
+    def __init__(self, request, origem):
+        self.request = request
+        self.origem = origem
+        self.criada = time.monotonic()
+        self.evento = threading.Event()
+        self.resultado = None
+
+    @property
+    def compra(self):
+        return self.request['type'] == mt5.ORDER_TYPE_BUY
+
+    def concluir(self, resultado):
+        self.resultado = resultado
+        self.evento.set()
+
+
+class RoteadorOrdens:
+    """Agrega as intenções de todas as estratégias em janelas curtas e compensa compras e vendas do
+    mesmo ativo: só o volume líquido vai à corretora, rateado entre as intenções do lado dominante.
+
+    A parte compensada não abre posição e é devolvida como não executada (RETCODE_COMPENSADA), para
+    que nenhuma estratégia conte uma posição que não existe. Intenções de estratégias diferentes ou
+    com SL/TP diferentes nunca são fundidas: cada estratégia recebe o ticket de uma posição só dela.
+    """
+
+    def __init__(self, janela=0.25, timeout=10.0):
+        self.janela = janela  # Segundos que a primeira intenção de um ativo espera por outras
+        self.timeout = timeout
+        self.log_system = None
+        self._pendentes = {}  # ativo -> [IntencaoOrdem]
+        self._cond = threading.Condition()
+        self._volume_step = {}  # ativo -> passo de volume (cache de symbol_info)
+        self._monitoring = False
+        self._monitor_thread = None
+        self.intencoes = 0
+        self.ordens_enviadas = 0
+        self.volume_cruzado = 0.0  # Volume compensado (não enviado à corretora nem executado)
+
+    def _logar(self, mensagem, ativo=None):
+        if self.log_system:
+            self.log_system.logar(mensagem, ativo)
+
+    def enviar(self, request, origem=None):
+        """Substitui mt5.order_send para ordens a mercado: bloqueia até o rateio da rodada"""
+        intencao = IntencaoOrdem(request, origem)
+        with self._cond:
+            roteando = self._monitoring
+            if roteando:
+                self._pendentes.setdefault(request['symbol'], []).append(intencao)
+                self.intencoes += 1
+                self._cond.notify_all()
+        if not roteando:
+            resultado = self._enviar_ordem(request)
+            journal.registrar_alocacao(request, origem, resultado)
+            return resultado
+        if not intencao.evento.wait(self.janela + self.timeout):
+            return ResultadoRoteado(RETCODE_SEM_RESPOSTA, 0, 0, 0.0, 0.0, 0.0, 0.0,
+                                    'Roteador sem resposta', 0, request)
+        return intencao.resultado
+
+    # ---- rodada de compensação -----------------------------------------------------------------
+
+    def start_monitoring(self):
+        """Inicia a thread que fecha as rodadas e envia as ordens líquidas"""
+        if self._monitoring:
+            return
+        self._monitoring = True
+        self._monitor_thread = threading.Thread(target=self._monitor_orders, daemon=True)
+        self._monitor_thread.start()
+
+    def stop_monitoring(self):
+        with self._cond:
+            self._monitoring = False
+            self._cond.notify_all()
+        if self._monitor_thread:
+            self._monitor_thread.join()
+            self._monitor_thread = None
+
+    def _monitor_orders(self):
+        while True:
+            with self._cond:
+                while self._monitoring and not self._pendentes:
+                    self._cond.wait()
+                if not self._pendentes:
+                    return  # Parado e sem nada pendente
+                agora = time.monotonic()
+                prazo = min(intencoes[0].criada for intencoes in self._pendentes.values()) + self.janela
+                if self._monitoring and prazo > agora:
+                    self._cond.wait(prazo - agora)
+                    continue
+                # Fecha a rodada de todos os ativos cuja primeira intenção já esperou a janela
+                prontos = {ativo: intencoes for ativo, intencoes in self._pendentes.items()
+                           if not self._monitoring or intencoes[0].criada + self.janela <= agora}
+                for ativo in prontos:
+                    del self._pendentes[ativo]
+            for ativo, intencoes in prontos.items():
+                try:
+                    self._executar(ativo, intencoes)
+                except Exception as e:
+                    self._logar(f"❌ Erro no roteamento de ordens de {ativo}: {e}", ativo)
+                    for intencao in intencoes:
+                        if not intencao.evento.is_set():
+                            intencao.concluir(ResultadoRoteado(RETCODE_SEM_RESPOSTA, 0, 0, 0.0, 0.0, 0.0, 0.0,
+                                                               str(e), 0, intencao.request))
+
+    def _passo_volume(self, ativo):
+        if ativo not in self._volume_step:
+            info = mt5.symbol_info(ativo)
+            self._volume_step[ativo] = getattr(info, 'volume_step', 0.01) if info is not None else 0.01
+        return self._volume_step[ativo]
+
+    def _enviar_ordem(self, request):
+        """Uma ordem na corretora: registrada uma única vez no journal"""
+        resultado = self._converter(mt5.order_send(request), request)
+        journal.registrar_ordem(request, resultado)
+        self.ordens_enviadas += 1
+        return resultado
+
+    @staticmethod
+    def _distancias(request):
+        """SL/TP como distância do preço pedido: intenções só são fundidas se elas coincidirem"""
+        return tuple(round(request[campo] - request['price'], 10) if request.get(campo) else None
+                     for campo in ('sl', 'tp'))
+
+    def _concluir(self, intencao, resultado):
+        journal.registrar_alocacao(intencao.request, intencao.origem, resultado)
+        intencao.concluir(resultado)
+
+    def _executar(self, ativo, intencoes):
+        """Uma rodada de um ativo: compensa compras e vendas e envia só o volume líquido"""
+        if len(intencoes) == 1:
+            self._concluir(intencoes[0], self._enviar_ordem(intencoes[0].request))
+            return
+
+        compras = [i for i in intencoes if i.compra]
+        vendas = [i for i in intencoes if not i.compra]
+        volume_compra = sum(i.request['volume'] for i in compras)
+        volume_venda = sum(i.request['volume'] for i in vendas)
+        passo = self._passo_volume(ativo)
+        liquido = round(round((volume_compra - volume_venda) / passo) * passo, 8)
+        dominantes, opostas = (compras, vendas) if liquido > 0 else (vendas, compras)
+        volume_dominante = sum(i.request['volume'] for i in dominantes)
+
+        tick = mt5.symbol_info_tick(ativo)
+        if tick is None:
+            raise RuntimeError("sem cotação")
+
+        def compensada(intencao):
+            return ResultadoRoteado(RETCODE_COMPENSADA, 0, 0, 0.0, 0.0, tick.bid, tick.ask,
+                                    'Compensada: sem posição aberta', 0, intencao.request)
+
+        # Lado oposto (ou os dois, sem líquido): compensado, nada foi aberto
+        for intencao in (opostas if liquido else intencoes):
+            self._concluir(intencao, compensada(intencao))
+
+        # Lado dominante: cada intenção recebe sua fração do líquido, arredondada para baixo ao passo;
+        # só intenções da mesma estratégia e com as mesmas distâncias de SL/TP vão juntas numa ordem
+        grupos = {}
+        fator = abs(liquido) / volume_dominante if liquido else 0.0
+        for intencao in (dominantes if liquido else ()):
+            volume = round(math.floor(intencao.request['volume'] * fator / passo + 1e-9) * passo, 8)
+            if volume:
+                chave = (intencao.origem, self._distancias(intencao.request))
+                grupos.setdefault(chave, []).append((intencao, volume))
+            else:
+                self._concluir(intencao, compensada(intencao))
+
+        for alocacoes in grupos.values():
+            modelo = alocacoes[0][0].request
+            preco = tick.ask if modelo['type'] == mt5.ORDER_TYPE_BUY else tick.bid
+            request = dict(modelo, volume=round(sum(volume for _, volume in alocacoes), 8), price=preco,
+                           comment=f"{modelo.get('comment', '')} [{len(alocacoes)} intenções]"[:31])
+            for campo in ('sl', 'tp'):
+                if modelo.get(campo):
+                    request[campo] = modelo[campo] - modelo['price'] + preco
+            resultado = self._enviar_ordem(request)
+            executado = resultado.retcode == mt5.TRADE_RETCODE_DONE
+            for intencao, volume in alocacoes:
+                self._concluir(intencao, resultado._replace(volume=volume if executado else 0.0,
+                                                            request=intencao.request))
+
+        cruzado = min(volume_compra, volume_venda)
+        self.volume_cruzado += cruzado
+        diferenca = abs(volume_compra - volume_venda)
+        if not grupos and diferenca > 1e-9:
+            self._logar(f"⚖️ {ativo}: diferença de {diferenca:g} lote(s) entre compras e vendas abaixo do passo "
+                        f"{passo:g}: nenhuma ordem enviada", ativo)
+        elif cruzado:
+            self._logar(f"🔀 {ativo}: {len(intencoes)} ordens compensadas ({cruzado:.2f} lote(s) sem execução, "
+                        f"líquido {liquido:+.2f} em {len(grupos)} ordem(ns))", ativo)
+
+    @staticmethod
+    def _converter(resultado, request):
+        if resultado is None:
+            return ResultadoRoteado(RETCODE_SEM_RESPOSTA, 0, 0, 0.0, 0.0, 0.0, 0.0, 'Terminal sem resposta', 0, request)
+        return ResultadoRoteado(resultado.retcode, resultado.deal, resultado.order, resultado.volume, resultado.price,
+                                resultado.bid, resultado.ask, resultado.comment, resultado.request_id, request)
+
+    def estatisticas(self):
+        return {
+            'intencoes': self.intencoes,
+            'ordens_enviadas': self.ordens_enviadas,
+            'volume_cruzado': self.volume_cruzado,
+        }
+
+    def exportar(self, caminho):
+        with open(caminho, 'w') as f:
+            json.dump(self.estatisticas(), f, indent=2)
+
+
+# Create global order router instance
+roteador_ordens = RoteadorOrdens()
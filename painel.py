@@ -1,13 +1,29 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import MetaTrader5 as mt5
-from utils import obter_saldo
+from mt5_gate import cliente_mt5, ChamadaDescartada, controlador_mt5, PRIORIDADE_DADOS
+from utils import obter_saldo, asset_manager
+from tick_features import fluxo_ticks
 from estrategia import EstrategiaTrading
 from log_system import LogSystem
+from symbol_index import SymbolIndex
+from theme_registry import ThemeRegistry
+from ui_state import EstadoUI, RenderizadorUI
+from chart_panel import GraficoAtivo, DadosGrafico
+from position_manager import gerenciador_posicoes
+from journal import journal
+from connection_supervisor import supervisor_conexao
+from multi_timeframe import atualizar_feeds, feeds_ativos
+from pnl_ledger import livro_pnl
+from order_router import roteador_ordens
+from snapshot import gerenciador_snapshot
+from memory_monitor import monitor_memoria, tamanho_profundo
+from event_bus import barramento, TOPICO_CONTA, TOPICO_EXECUCAO, EventoConta, POLITICA_ULTIMO
 import threading
 import time
 from datetime import datetime
 
+mt5 = cliente_mt5(PRIORIDADE_DADOS)
+
 
 class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
     def __init__(self, root):
@@ -42,8 +58,10 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
 
         self.is_dark_mode = True
         self.colors = self.dark_theme
+        self.tema = ThemeRegistry()  # Widgets tagged with semantic color roles
 
         self.root.configure(bg=self.colors['bg_dark'])
+        self.tema.registrar(self.root, bg='bg_dark')
         self.root.resizable(False, False)
         self.centralizar_janela(1000, 700)
 
@@ -52,7 +70,10 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
         self.estrategias = {}  # Dictionary to store strategy instances
         self.asset_frames = {}  # Dictionary to store asset UI frames
         self.status_labels = {}  # Dictionary to store status labels
+        self.graficos = {}  # Price/indicator chart per asset card
         self.max_assets = 4  # Maximum number of assets to trade
+        self.symbol_index = SymbolIndex()  # Busca incremental de ativos
+        self.max_sugestoes = 30  # Maximum matches shown in the asset pickers
 
         # Trading variables for each asset
         self.ativo_selecionado = {}
@@ -67,6 +88,10 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             self.operando[i] = False
 
         self.log_system = LogSystem()
+        # Background threads only write to the state store; one root.after frame renders what changed
+        self.fps_ui = 10
+        self.estado_ui = EstadoUI()
+        self.renderizador_ui = RenderizadorUI(self.root, self.estado_ui, self.fps_ui)
 
         self.setup_styles()
         self.setup_ui()
@@ -111,6 +136,7 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
         # Main container with padding
         main_container = tk.Frame(self.root, bg=self.colors['bg_dark'], padx=20, pady=20)
         main_container.pack(fill="both", expand=True)
+        self.tema.registrar(main_container, bg='bg_dark')
 
         # Header
         self.setup_header(main_container)
@@ -124,6 +150,7 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
         # Time display
         time_frame = tk.Frame(main_container, bg=self.colors['bg_medium'], padx=20, pady=10)
         time_frame.pack(fill="x")
+        self.tema.registrar(time_frame, bg='bg_medium')
 
         self.time_label = tk.Label(
             time_frame,
@@ -133,6 +160,7 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             bg=self.colors['bg_medium']
         )
         self.time_label.pack(side="right")
+        self.tema.registrar(self.time_label, fg='text_secondary', bg='bg_medium')
 
         # Start data update threads
         self.start_update_threads()
@@ -141,10 +169,12 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
         # Create a frame at the top of the window
         switcher_frame = tk.Frame(parent, bg=self.colors['bg_dark'])
         switcher_frame.pack(fill="x")
+        self.tema.registrar(switcher_frame, bg='bg_dark')
 
         # Add padding frame to position the button
         padding_frame = tk.Frame(switcher_frame, bg=self.colors['bg_dark'], height=10)
         padding_frame.pack(fill="x")
+        self.tema.registrar(padding_frame, bg='bg_dark')
 
         # Create the theme toggle button with a more visible style
         self.theme_button = tk.Button(
@@ -162,17 +192,15 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             cursor="hand2"
         )
         self.theme_button.pack(side="right", padx=20, pady=5)
+        self.tema.registrar(self.theme_button, fg='text', bg='bg_light',
+                            activebackground='accent_hover', activeforeground='text')
 
     def toggle_theme(self):
         self.is_dark_mode = not self.is_dark_mode
         self.colors = self.dark_theme if self.is_dark_mode else self.light_theme
 
         # Update theme button with animation effect
-        self.theme_button.config(
-            text="☀️ Modo Claro" if self.is_dark_mode else "🌙 Modo Escuro",
-            fg=self.colors['text'],
-            bg=self.colors['bg_light']
-        )
+        self.theme_button.config(text="☀️ Modo Claro" if self.is_dark_mode else "🌙 Modo Escuro")
 
         # Create animation effect
         self.theme_button.config(relief="sunken")
@@ -185,61 +213,20 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
         self.root.event_generate('<<ThemeChanged>>')
 
     def update_theme(self):
-        # Update root
-        self.root.configure(bg=self.colors['bg_dark'])
-
-        # Update all frames and widgets
-        for widget in self.root.winfo_children():
-            self.update_widget_colors(widget)
-
-    def update_widget_colors(self, widget):
-        widget_type = widget.winfo_class()
-
-        if widget_type in ['Frame', 'Labelframe']:
-            if widget.cget('bg') in [self.dark_theme['bg_dark'], self.light_theme['bg_dark']]:
-                widget.configure(bg=self.colors['bg_dark'])
-            elif widget.cget('bg') in [self.dark_theme['bg_medium'], self.light_theme['bg_medium']]:
-                widget.configure(bg=self.colors['bg_medium'])
-            elif widget.cget('bg') in [self.dark_theme['bg_light'], self.light_theme['bg_light']]:
-                widget.configure(bg=self.colors['bg_light'])
-
-        elif widget_type == 'Label':
-            widget.configure(
-                bg=widget.master.cget('bg'),
-                fg=self.colors['text'] if widget.cget('fg') == self.dark_theme['text'] else self.colors[
-                    'text_secondary']
-            )
-
-        elif widget_type == 'Button':
-            if widget.cget('bg') == self.colors['accent']:
-                # Don't change accent buttons
-                pass
-            else:
-                widget.configure(
-                    bg=self.colors['bg_light'],
-                    fg=self.colors['text'],
-                    activebackground=self.colors['accent_hover'],
-                    activeforeground=self.colors['text']
-                )
-
-        elif widget_type == 'Text':
-            widget.configure(
-                bg=self.colors['bg_light'],
-                fg=self.colors['text'],
-                insertbackground=self.colors['text']
-            )
-
-        # Update children widgets
-        for child in widget.winfo_children():
-            self.update_widget_colors(child)
+        # Single pass over the widgets registered by the builders (no tree walk, no cget)
+        self.tema.aplicar(self.colors)
+        for grafico in self.graficos.values():
+            grafico.aplicar_cores(self.colors)
 
     def setup_header(self, parent):
         header = tk.Frame(parent, bg=self.colors['bg_dark'])
         header.pack(fill="x", pady=(0, 20))
+        self.tema.registrar(header, bg='bg_dark')
 
         # Logo and title container
         title_container = tk.Frame(header, bg=self.colors['bg_dark'])
         title_container.pack(side="left")
+        self.tema.registrar(title_container, bg='bg_dark')
 
         logo_label = tk.Label(
             title_container,
@@ -249,6 +236,7 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             bg=self.colors['bg_dark']
         )
         logo_label.pack(side="left", padx=(0, 10))
+        self.tema.registrar(logo_label, fg='accent', bg='bg_dark')
 
         title_label = tk.Label(
             title_container,
@@ -258,18 +246,22 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             bg=self.colors['bg_dark']
         )
         title_label.pack(side="left")
+        self.tema.registrar(title_label, fg='text', bg='bg_dark')
 
         # Balance display
         self.saldo_frame = tk.Frame(header, bg=self.colors['bg_light'], padx=15, pady=10)
         self.saldo_frame.pack(side="right")
+        self.tema.registrar(self.saldo_frame, bg='bg_light')
 
-        tk.Label(
+        saldo_titulo = tk.Label(
             self.saldo_frame,
             text="SALDO",
             font=("Helvetica", 10, "bold"),
             fg=self.colors['text_secondary'],
             bg=self.colors['bg_light']
-        ).pack()
+        )
+        saldo_titulo.pack()
+        self.tema.registrar(saldo_titulo, fg='text_secondary', bg='bg_light')
 
         self.saldo_label = tk.Label(
             self.saldo_frame,
@@ -279,10 +271,12 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             bg=self.colors['bg_light']
         )
         self.saldo_label.pack()
+        self.tema.registrar(self.saldo_label, fg='accent', bg='bg_light')
 
     def setup_dashboard(self, parent):
         dashboard = tk.Frame(parent, bg=self.colors['bg_medium'], padx=20, pady=20)
         dashboard.pack(fill="both", expand=True)
+        self.tema.registrar(dashboard, bg='bg_medium')
 
         # Create 2x2 grid for assets
         for i in range(2):
@@ -297,38 +291,42 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
 
     def create_input_group(self, parent, label):
         frame = tk.Frame(parent, bg=self.colors['bg_medium'])
+        self.tema.registrar(frame, bg='bg_medium')
 
-        tk.Label(
+        titulo = tk.Label(
             frame,
             text=label,
             font=("Helvetica", 10, "bold"),
             fg=self.colors['text_secondary'],
             bg=self.colors['bg_medium']
-        ).pack(anchor="w", pady=(0, 5))
+        )
+        titulo.pack(anchor="w", pady=(0, 5))
+        self.tema.registrar(titulo, fg='text_secondary', bg='bg_medium')
 
         return frame
 
     def setup_control_panel(self, parent):
         control_panel = tk.Frame(parent, bg=self.colors['bg_medium'], padx=20, pady=20)
         control_panel.pack(fill="x", pady=(0, 20))
+        self.tema.registrar(control_panel, bg='bg_medium')
 
         # Global refresh button
         self.btn_atualizar = self.create_button(
             control_panel,
             "🔄 Atualizar Ativos",
             self.carregar_ativos,
-            self.colors['bg_light']
+            'bg_light'
         )
         self.btn_atualizar.pack(side="right")
 
     def create_button(self, parent, text, command, color):
-        return tk.Button(
+        button = tk.Button(
             parent,
             text=text,
             command=command,
             font=("Helvetica", 11, "bold"),
             fg=self.colors['text'],
-            bg=color,
+            bg=self.colors[color],
             activebackground=self.colors['accent_hover'],
             activeforeground=self.colors['text'],
             relief="flat",
@@ -336,6 +334,8 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             pady=8,
             cursor="hand2"
         )
+        return self.tema.registrar(button, fg='text', bg=color,
+                                   activebackground='accent_hover', activeforeground='text')
 
     def create_asset_card(self, parent, index, row, col):
         # Create card with 3D effect
@@ -348,6 +348,7 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             highlightbackground=self.colors['accent']
         )
         card.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
+        self.tema.registrar(card, bg='bg_light', highlightbackground='accent')
         
         # Add inner shadow effect
         inner_frame = tk.Frame(
@@ -357,10 +358,12 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             pady=15
         )
         inner_frame.pack(fill="both", expand=True)
+        self.tema.registrar(inner_frame, bg='bg_light')
 
         # Asset header
         header = tk.Frame(inner_frame, bg=self.colors['bg_light'])
         header.pack(fill="x", pady=(0, 10))
+        self.tema.registrar(header, bg='bg_light')
 
         title = tk.Label(
             header,
@@ -370,10 +373,12 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             bg=self.colors['bg_light']
         )
         title.pack(side="left")
+        self.tema.registrar(title, fg='accent', bg='bg_light')
 
         # Trading controls
         controls = tk.Frame(inner_frame, bg=self.colors['bg_light'])
         controls.pack(fill="x", pady=(0, 10))
+        self.tema.registrar(controls, bg='bg_light')
 
         # Asset selection
         asset_frame = self.create_input_group(controls, "Ativo")
@@ -384,6 +389,7 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             width=20
         )
         combo_ativo.pack(fill="x")
+        combo_ativo.bind('<KeyRelease>', lambda e: self.filtrar_ativos(index, e))
 
         # Timeframe selection
         timeframe_frame = self.create_input_group(controls, "Timeframe")
@@ -410,6 +416,7 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             width=20
         )
         entry_lote.pack(fill="x")
+        self.tema.registrar(entry_lote, bg='bg_medium', fg='text', insertbackground='text')
 
         # Organize frames horizontally
         asset_frame.pack(side="left", padx=(0, 5))
@@ -419,6 +426,7 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
         # Status and buttons
         status_frame = tk.Frame(inner_frame, bg=self.colors['bg_light'])
         status_frame.pack(fill="x", pady=10)
+        self.tema.registrar(status_frame, bg='bg_light')
 
         self.status_labels[index] = tk.Label(
             status_frame,
@@ -428,10 +436,12 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             bg=self.colors['bg_light']
         )
         self.status_labels[index].pack(side="left")
+        self.tema.registrar(self.status_labels[index], fg='text_secondary', bg='bg_light')
 
         # Control buttons with modern styling
         btn_frame = tk.Frame(status_frame, bg=self.colors['bg_light'])
         btn_frame.pack(side="right")
+        self.tema.registrar(btn_frame, bg='bg_light')
 
         start_btn = tk.Button(
             btn_frame,
@@ -446,6 +456,7 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             cursor="hand2"
         )
         start_btn.pack(side="left", padx=2)
+        self.tema.registrar(start_btn, fg='text', bg='accent', activebackground='accent_hover')
 
         stop_btn = tk.Button(
             btn_frame,
@@ -460,10 +471,16 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             cursor="hand2"
         )
         stop_btn.pack(side="left", padx=2)
+        self.tema.registrar(stop_btn, fg='text', bg='danger', activebackground='danger')
+
+        # Price, EMAs, Bollinger bands and trade markers of the running strategy
+        self.graficos[index] = GraficoAtivo(inner_frame, self.colors)
+        self.graficos[index].canvas.pack(fill="x", pady=(0, 5))
 
         # Log area with modern styling
         log_frame = tk.Frame(inner_frame, bg=self.colors['bg_medium'])
         log_frame.pack(fill="both", expand=True)
+        self.tema.registrar(log_frame, bg='bg_medium')
 
         text_log = tk.Text(
             log_frame,
@@ -476,6 +493,7 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             pady=10
         )
         text_log.pack(side="left", fill="both", expand=True)
+        self.tema.registrar(text_log, bg='bg_medium', fg='text', insertbackground='text')
 
         scrollbar = ttk.Scrollbar(log_frame, command=text_log.yview)
         scrollbar.pack(side="right", fill="y")
@@ -494,24 +512,97 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
         self.log_system.add_log_widget(f"asset_{index}", text_log)
 
     def start_update_threads(self):
-        # Update balance
+        # UI frame: clock, balance, status labels and queued log messages
+        self.renderizador_ui.vincular('hora', lambda texto: self.time_label.config(text=texto))
+        self.renderizador_ui.a_cada_quadro(self.atualizar_hora)
+        for index in self.status_labels:
+            self.renderizador_ui.vincular(f'status_{index}',
+                                          lambda valor, index=index: self.renderizar_status(index, valor))
+        for index, grafico in self.graficos.items():
+            self.renderizador_ui.vincular(f'grafico_{index}', grafico.atualizar)
+        self.renderizador_ui.a_cada_quadro(self.log_system.drenar)
+        self.renderizador_ui.iniciar()
+        # Balance: published on the event bus when it changes, drawn on the Tk thread
+        barramento.assinar_tk(self.renderizador_ui, TOPICO_CONTA,
+                              lambda evento: self.saldo_label.config(text=f"R$ {evento.saldo:.2f}"), capacidade=1)
         threading.Thread(target=self.atualizar_saldo_loop, daemon=True).start()
-        # Update time
-        threading.Thread(target=self.atualizar_hora_loop, daemon=True).start()
+        # Chart data (copied and computed off the Tk thread)
+        threading.Thread(target=self.atualizar_graficos_loop, daemon=True).start()
+        # Trailing stop / breakeven of open positions (one batch per second)
+        gerenciador_posicoes.log_system = self.log_system
+        gerenciador_posicoes.start_monitoring()
+        # Trade/signal journal (SQLite, background batched writes)
+        journal.log_system = self.log_system
+        journal.iniciar()
+        # Per-symbol status and streaming spread statistics (orders are gated on the live spread)
+        asset_manager.start_monitoring()
+        # Tick stream per symbol: realized volatility, tick rate and imbalance for stops and entry filters
+        fluxo_ticks.log_system = self.log_system
+        fluxo_ticks.start_monitoring()
+        # Market orders from all strategies netted per symbol in short windows
+        roteador_ordens.log_system = self.log_system
+        roteador_ordens.start_monitoring()
+        # Terminal health: reconnect, pause/resume strategies and catch up only the missed bars/deals
+        supervisor_conexao.log_system = self.log_system
+        supervisor_conexao.ao_reconectar(atualizar_feeds)
+        supervisor_conexao.ao_reconectar(lambda: livro_pnl.atualizar(forcar=True))
+        supervisor_conexao.start_monitoring()
+        # Warm-start snapshot of strategy state (periodic checkpoint, final save on shutdown)
+        gerenciador_snapshot.log_system = self.log_system
+        gerenciador_snapshot.start_monitoring()
+        # Memory: RSS trend and bytes held per subsystem (tracemalloc diffs only with monitor_memoria.rastrear = True)
+        monitor_memoria.log_system = self.log_system
+        monitor_memoria.registrar('estrategias', lambda: sum(
+            tamanho_profundo(e.barras) + tamanho_profundo(e.marcadores) for e in list(self.estrategias.values())))
+        monitor_memoria.registrar('feeds', lambda: sum(tamanho_profundo(f.barras_base) + tamanho_profundo(f.agregadores)
+                                                       for f in feeds_ativos()))
+        monitor_memoria.registrar('log_fila', self.log_system.bytes_retidos)
+        monitor_memoria.registrar('journal_fila', journal.bytes_retidos)
+        monitor_memoria.registrar('estado_ui', self.estado_ui.bytes_retidos)
+        monitor_memoria.start_monitoring()
         # Load initial assets
         self.carregar_ativos()
 
-    def atualizar_hora_loop(self):
-        while True:
-            current_time = datetime.now().strftime("%H:%M:%S")
-            self.time_label.config(text=current_time)
-            time.sleep(1)
+    def atualizar_hora(self):
+        """Clock on the UI frame (the label is only redrawn when the second changes)"""
+        self.estado_ui.definir('hora', datetime.now().strftime("%H:%M:%S"))
 
     def atualizar_saldo_loop(self):
+        # An order fill wakes the loop at once; otherwise the balance is checked every 5s
+        execucoes = barramento.assinar(TOPICO_EXECUCAO, capacidade=1, politica=POLITICA_ULTIMO)
+        ultimo = None
+        while True:
+            try:
+                saldo = obter_saldo()
+                if saldo != ultimo:
+                    ultimo = saldo
+                    barramento.publicar(TOPICO_CONTA, EventoConta(saldo))
+            except ChamadaDescartada:
+                pass  # Terminal congested: keep the last balance shown
+            execucoes.aguardar(timeout=5)
+
+    def renderizar_status(self, index, valor):
+        texto, papel = valor
+        self.status_labels[index].config(text=texto)
+        self.tema.atualizar_papeis(self.status_labels[index], self.colors, fg=papel)
+
+    def atualizar_graficos_loop(self):
+        assinaturas = {}
         while True:
-            saldo = obter_saldo()
-            self.saldo_label.config(text=f"R$ {saldo:.2f}")
-            time.sleep(5)
+            for index, estrategia in list(self.estrategias.items()):
+                try:
+                    dados = DadosGrafico.da_estrategia(estrategia)
+                except Exception:
+                    continue
+                if dados is None:
+                    continue
+                # Publish only when the forming bar, a new bar or a new trade changed something
+                assinatura = (dados.ativo, int(dados.tempos[-1]), float(dados.series['close'][-1]),
+                              len(dados.marcadores))
+                if assinaturas.get(index) != assinatura:
+                    assinaturas[index] = assinatura
+                    self.estado_ui.definir(f'grafico_{index}', dados)
+            time.sleep(1)
 
     def tem_ativos_operando(self):
         """Check if any assets are currently running"""
@@ -520,20 +611,33 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
     def carregar_ativos(self):
         try:
             symbols = mt5.symbols_get()
-            lista_ativos = [symbol.name for symbol in symbols if symbol.visible]
-            
-            # Update all asset comboboxes
+            self.symbol_index.construir(symbol for symbol in symbols if symbol.visible)
+            sugestoes = self.symbol_index.buscar('', self.max_sugestoes)
+
+            # Update all asset comboboxes (only the top matches, the index holds the rest)
             for i in range(self.max_assets):
                 if i in self.asset_frames:
-                    self.asset_frames[i]['combo_ativo']['values'] = lista_ativos
-                    if lista_ativos:
+                    self.asset_frames[i]['combo_ativo']['values'] = sugestoes
+                    if sugestoes:
                         self.asset_frames[i]['combo_ativo'].current(0)
-            
+
             ativos_ativos = sum(1 for i in range(self.max_assets) if i in self.asset_frames)
-            self.log_system.logar(f"✅ {len(lista_ativos)} ativos disponíveis carregados em {ativos_ativos} cards")
+            self.log_system.logar(f"✅ {len(self.symbol_index)} ativos disponíveis carregados em {ativos_ativos} cards")
         except Exception as e:
             self.log_system.logar(f"❌ Erro ao carregar ativos: {e}")
 
+    def filtrar_ativos(self, index, event):
+        """Type-ahead: show only the best matches for the text typed in the asset picker"""
+        if event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            return
+        consulta = self.ativo_selecionado[index].get()
+        categoria = None
+        # "Forex/EUR" filtra pela categoria (caminho do símbolo no MT5)
+        if '/' in consulta or '\\' in consulta:
+            categoria, _, consulta = consulta.replace('\\', '/').rpartition('/')
+        self.asset_frames[index]['combo_ativo']['values'] = self.symbol_index.buscar(
+            consulta, self.max_sugestoes, categoria)
+
     def verificar_campos(self, index):
         """Verify fields for a specific asset"""
         ativo = self.ativo_selecionado[index].get().strip()
@@ -603,21 +707,27 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
             self.log_system.logar(f"✅ Mercado para o ativo {ativo} está ABERTO.")
 
         self.operando[index] = True
-        self.status_labels[index].config(text="● OPERANDO", fg=self.colors['accent'])
+        self.estado_ui.definir(f'status_{index}', ("● OPERANDO", 'accent'))
         self.log_system.logar(
             f"✅ Ambiente OK. Iniciando análise no ativo {ativo}, timeframe {timeframe}, lote {lote_float}. Spread atual: {spread:.1f} pontos.",
             f"asset_{index}")
         
         # Create and store strategy instance
+        asset_manager.add_asset(ativo)
+        fluxo_ticks.adicionar_ativo(ativo)
         self.estrategias[index] = EstrategiaTrading(ativo, timeframe, lote_float, self.log_system)
         threading.Thread(target=self.estrategias[index].executar, daemon=True).start()
 
     def parar_robo(self, index):
         self.operando[index] = False
-        self.status_labels[index].config(text="⭘ AGUARDANDO", fg=self.colors['text_secondary'])
+        self.estado_ui.definir(f'status_{index}', ("⭘ AGUARDANDO", 'text_secondary'))
         if index in self.estrategias:
+            ativo = self.estrategias[index].ativo
             self.estrategias[index].parar()
             del self.estrategias[index]
+            if all(e.ativo != ativo for e in self.estrategias.values()):
+                asset_manager.remove_asset(ativo)
+                fluxo_ticks.remover_ativo(ativo)
         self.log_system.logar(f"🛑 Análise parada para Ativo {index + 1}", f"asset_{index}")
 
 
@@ -629,10 +739,32 @@ class PainelApp:  # Changed from EnhancedPainelApp to PainelApp to match imports
                 for index in range(self.max_assets):
                     if self.operando[index]:
                         self.parar_robo(index)
+                self.encerrar_servicos()
                 self.root.destroy()
         else:
+            self.encerrar_servicos()
             self.root.destroy()
 
+    def encerrar_servicos(self):
+        """Stop background services, save the warm-start snapshot and export gate, outage and memory statistics"""
+        self.renderizador_ui.parar()
+        supervisor_conexao.stop_monitoring()
+        gerenciador_posicoes.stop_monitoring()
+        roteador_ordens.stop_monitoring()
+        asset_manager.stop_monitoring()
+        fluxo_ticks.stop_monitoring()
+        journal.parar()
+        try:
+            gerenciador_snapshot.stop_monitoring()
+            monitor_memoria.stop_monitoring()
+            monitor_memoria.exportar("memoria_stats.json")
+            controlador_mt5.exportar("mt5_gate_stats.json")
+            supervisor_conexao.exportar("conexao_stats.json")
+            roteador_ordens.exportar("roteador_stats.json")
+            barramento.exportar("eventos_stats.json")
+        except OSError:
+            pass
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = PainelApp(root)
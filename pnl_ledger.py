@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from mt5_gate import cliente_mt5, PRIORIDADE_DADOS
+from journal import journal
+from market_calendar import offset_servidor
+
+mt5 = cliente_mt5(PRIORIDADE_DADOS)
+
+CAMINHO_LEDGER = "pnl_ledger.json"
+
+
+def _data_servidor(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc)
+
+
+class LivroPnL:
+    """Livro de P&L diário incremental: equity de abertura + negócios novos + flutuante"""
+
+    def __init__(self, caminho=CAMINHO_LEDGER, intervalo_minimo=1.0):
+        self.caminho = caminho
+        self.intervalo_minimo = intervalo_minimo  # Checagens mais próximas que isso usam o cache
+        self._lock = threading.Lock()
+        self._ultima_atualizacao = 0.0
+
+        self.login = None  # Conta dona do livro: outra conta começa um livro novo
+        self.servidor = None
+        self.dia = None  # Data do servidor (YYYY-MM-DD)
+        self.equity_inicio = None
+        self.cursor_tempo = 0  # Horário (servidor) do último negócio processado
+        self.cursor_ticket = 0
+        self.realizado = {}  # (ativo, magic) -> P&L realizado no dia
+        self.flutuante = {}  # (ativo, magic) -> P&L flutuante atual
+        self.offset_servidor = 0  # Servidor - relógio local, em segundos
+
+        self.carregar()
+
+    # ---- persistência --------------------------------------------------------------------------
+
+    def carregar(self):
+        if not os.path.exists(self.caminho):
+            return
+        try:
+            with open(self.caminho, "r") as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.login = dados.get("login")
+        self.servidor = dados.get("servidor")
+        self.dia = dados.get("dia")
+        self.equity_inicio = dados.get("equity_inicio")
+        self.cursor_tempo = dados.get("cursor_tempo", 0)
+        self.cursor_ticket = dados.get("cursor_ticket", 0)
+        self.offset_servidor = dados.get("offset_servidor", 0)
+        self.realizado = {(ativo, int(magic)): valor for ativo, magic, valor in dados.get("realizado", [])}
+
+    def salvar(self):
+        dados = {
+            "login": self.login,
+            "servidor": self.servidor,
+            "dia": self.dia,
+            "equity_inicio": self.equity_inicio,
+            "cursor_tempo": self.cursor_tempo,
+            "cursor_ticket": self.cursor_ticket,
+            "offset_servidor": self.offset_servidor,
+            "realizado": [[ativo, magic, valor] for (ativo, magic), valor in self.realizado.items()],
+        }
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w") as f:
+            json.dump(dados, f)
+        os.replace(temporario, self.caminho)
+
+    # ---- atualização ---------------------------------------------------------------------------
+
+    def _trocar_conta(self, conta):
+        """Descarta o livro de outra conta (ou de outro servidor, com outro fuso)"""
+        if conta.server != self.servidor:
+            self.offset_servidor = 0
+        self.login = conta.login
+        self.servidor = conta.server
+        self.dia = None
+        self.equity_inicio = None
+        self.cursor_tempo = 0
+        self.cursor_ticket = 0
+        self.realizado = {}
+
+    def agora_servidor(self):
+        return time.time() + self.offset_servidor
+
+    def _iniciar_dia(self, ativo_referencia, conta):
+        """Snapshot de abertura do dia; reconstrói o realizado se o app abriu no meio do dia"""
+        tick = mt5.symbol_info_tick(ativo_referencia) if ativo_referencia else None
+        # Fuso do servidor só de um tick recente; com o mercado fechado mantém o offset salvo
+        self.offset_servidor = offset_servidor(tick, self.offset_servidor)
+
+        meia_noite = int(self.agora_servidor()) // 86400 * 86400
+        self.dia = _data_servidor(meia_noite).strftime("%Y-%m-%d")
+        self.realizado = {}
+        self.cursor_tempo = meia_noite
+        self.cursor_ticket = 0
+        realizado_hoje = self._consumir_deals()
+        # Aproximação: saldo no início do dia = saldo atual - resultado realizado hoje
+        self.equity_inicio = conta.balance - realizado_hoje
+
+    def _consumir_deals(self):
+        """Processa apenas os negócios posteriores ao cursor; retorna o P&L realizado novo"""
+        deals = mt5.history_deals_get(_data_servidor(self.cursor_tempo),
+                                      _data_servidor(self.agora_servidor()) + timedelta(days=1))
+        if not deals:
+            return 0.0
+
+        novo = 0.0
+        for deal in deals:
+            if deal.ticket <= self.cursor_ticket:
+                continue
+            journal.registrar_deal(deal)
+            resultado = deal.profit + deal.commission + deal.swap + getattr(deal, 'fee', 0.0)
+            if resultado:
+                chave = (deal.symbol, deal.magic)
+                self.realizado[chave] = self.realizado.get(chave, 0.0) + resultado
+                novo += resultado
+            self.cursor_ticket = max(self.cursor_ticket, deal.ticket)
+            self.cursor_tempo = max(self.cursor_tempo, deal.time)
+        return novo
+
+    def atualizar(self, ativo_referencia=None, forcar=False):
+        """Atualiza o livro (no máximo uma vez por intervalo_minimo, salvo `forcar`)"""
+        with self._lock:
+            if not forcar and time.monotonic() - self._ultima_atualizacao < self.intervalo_minimo:
+                return
+            conta = mt5.account_info()
+            if conta is None:
+                return
+
+            if (conta.login, conta.server) != (self.login, self.servidor):
+                self._trocar_conta(conta)
+            dia_atual = _data_servidor(self.agora_servidor()).strftime("%Y-%m-%d")
+            mudou = False
+            if self.dia != dia_atual or self.equity_inicio is None:
+                self._iniciar_dia(ativo_referencia, conta)
+                mudou = True
+            elif self._consumir_deals():
+                mudou = True
+
+            flutuante = {}
+            for posicao in mt5.positions_get() or ():
+                chave = (posicao.symbol, posicao.magic)
+                flutuante[chave] = flutuante.get(chave, 0.0) + posicao.profit + posicao.swap
+            self.flutuante = flutuante
+
+            if mudou:
+                self.salvar()
+            self._ultima_atualizacao = time.monotonic()
+
+    # ---- consultas -----------------------------------------------------------------------------
+
+    def resultado_dia(self, ativo=None, magic=None):
+        """P&L do dia (realizado + flutuante), opcionalmente filtrado por ativo e/ou magic"""
+        with self._lock:
+            total = 0.0
+            for origem in (self.realizado, self.flutuante):
+                for (a, m), valor in origem.items():
+                    if (ativo is None or a == ativo) and (magic is None or m == magic):
+                        total += valor
+            return total
+
+    def perda_diaria_pct(self):
+        """Perda do dia em % da equity de abertura (0 quando o dia está positivo)"""
+        if not self.equity_inicio:
+            return 0.0
+        return max(0.0, -self.resultado_dia() / self.equity_inicio * 100)
+
+
+# Create global ledger instance
+livro_pnl = LivroPnL()
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from mt5_gate import cliente_mt5, PRIORIDADE_DADOS
+
+mt5 = cliente_mt5(PRIORIDADE_DADOS)
+
+
+class IndicePosicoes:
+    """Posições abertas indexadas por (ativo, magic) e por estratégia, mantidas por diferenças.
+
+    Alimentado pelo positions_get periódico do gerenciador de posições e pelas execuções das
+    próprias estratégias; as consultas de limite são leituras O(1) em memória.
+    """
+
+    def __init__(self, validade=2.0):
+        self.validade = validade  # Sem sincronização há mais que isso, a próxima consulta busca no terminal
+        self._lock = threading.Lock()
+        self._posicoes = {}  # ticket -> (ativo, magic)
+        self._contagem = {}  # (ativo, magic) -> posições abertas
+        self._donos = {}  # ticket -> {id da estratégia}
+        self._por_estrategia = {}  # id da estratégia -> {ticket}
+        self._registrados = {}  # ticket -> instante do registro, até um snapshot posterior confirmá-lo
+        self._ultima_sincronizacao = 0.0
+
+    def _adicionar(self, ticket, ativo, magic):
+        self._posicoes[ticket] = (ativo, magic)
+        chave = (ativo, magic)
+        self._contagem[chave] = self._contagem.get(chave, 0) + 1
+
+    def _remover(self, ticket):
+        chave = self._posicoes.pop(ticket)
+        restante = self._contagem[chave] - 1
+        if restante:
+            self._contagem[chave] = restante
+        else:
+            del self._contagem[chave]
+        self._registrados.pop(ticket, None)
+        for estrategia in self._donos.pop(ticket, ()):
+            tickets = self._por_estrategia[estrategia]
+            tickets.discard(ticket)
+            if not tickets:
+                del self._por_estrategia[estrategia]
+
+    def sincronizar(self, posicoes, tirado_em=None):
+        """Aplica um snapshot de positions_get: só as posições abertas/fechadas desde o anterior mudam o índice.
+
+        `tirado_em` é o time.monotonic() de antes da chamada ao terminal: execuções registradas depois
+        dele podem não estar no snapshot e não são removidas (nem perdem o dono).
+        """
+        if tirado_em is None:
+            tirado_em = time.monotonic()
+        atuais = {p.ticket: p for p in posicoes}
+        with self._lock:
+            for ticket in self._posicoes.keys() - atuais.keys():
+                if self._registrados.get(ticket, 0.0) < tirado_em:
+                    self._remover(ticket)
+            for ticket in [t for t, instante in self._registrados.items() if t in atuais and instante < tirado_em]:
+                del self._registrados[ticket]  # Confirmado pelo terminal
+            for ticket in atuais.keys() - self._posicoes.keys():
+                self._adicionar(ticket, atuais[ticket].symbol, atuais[ticket].magic)
+            self._ultima_sincronizacao = time.monotonic()
+
+    def registrar_execucao(self, ticket, ativo, magic, estrategia=None):
+        """Execução própria: entra no índice já, sem esperar o próximo snapshot"""
+        if not ticket:
+            return
+        with self._lock:
+            if ticket not in self._posicoes:
+                self._adicionar(ticket, ativo, magic)
+            self._registrados[ticket] = time.monotonic()
+            if estrategia is not None:
+                self._donos.setdefault(ticket, set()).add(estrategia)
+                self._por_estrategia.setdefault(estrategia, set()).add(ticket)
+
+    def atualizar_se_antigo(self):
+        """Sem o gerenciador de posições rodando, sincroniza na consulta (no máximo uma vez por validade)"""
+        if time.monotonic() - self._ultima_sincronizacao < self.validade:
+            return
+        tirado_em = time.monotonic()
+        posicoes = mt5.positions_get()
+        if posicoes is not None:
+            self.sincronizar(posicoes, tirado_em)
+
+    def contar(self, ativo, magic):
+        self.atualizar_se_antigo()
+        with self._lock:
+            return self._contagem.get((ativo, magic), 0)
+
+    def contar_estrategia(self, estrategia):
+        self.atualizar_se_antigo()
+        with self._lock:
+            return len(self._por_estrategia.get(estrategia, ()))
+
+    def tickets_estrategia(self, estrategia):
+        """Tickets abertos atribuídos à estratégia (para o snapshot de warm start)"""
+        with self._lock:
+            return sorted(self._por_estrategia.get(estrategia, ()))
+
+    def total(self):
+        with self._lock:
+            return len(self._posicoes)
+
+
+# Create global position index instance
+indice_posicoes = IndicePosicoes()
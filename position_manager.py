@@ -0,0 +1,159 @@
+from mt5_gate import cliente_mt5, PRIORIDADE_DADOS
+import numpy as np
+import threading
+import time
+from utils import MAGIC_NUMBER
+from connection_supervisor import supervisor_conexao
+from position_index import indice_posicoes
+
+mt5 = cliente_mt5(PRIORIDADE_DADOS)
+
+
+class GerenciadorPosicoes:
+    """Trailing stop e breakeven em lote para todas as posições do robô"""
+
+    def __init__(self, magic=MAGIC_NUMBER, intervalo=1.0):
+        self.magic = magic
+        self.intervalo = intervalo  # Segundos entre lotes (uma chamada positions_get por lote)
+        self.multiplicador_atr = 1.5  # Distância do trailing em ATRs (mesma do stop inicial)
+        self.passo_minimo = 10  # Alteração mínima do SL, em pontos, para enviar modificação
+        self.espera_rejeicao = 5.0  # Primeira espera após uma modificação recusada (dobra a cada recusa)
+        self.espera_rejeicao_max = 300.0
+        self.log_system = None
+        self._parametros = {}  # ativo -> (atr, point, digits, trailing, breakeven_level)
+        self._rejeicoes = {}  # ticket -> (SL recusado, próxima tentativa, espera atual)
+        self._lock = threading.Lock()
+        self._monitoring = False
+        self._monitor_thread = None
+        self.modificacoes_enviadas = 0
+
+    def atualizar_atr(self, ativo, atr, point, digits, trailing=True, breakeven_level=0.3):
+        """Registra o ATR mais recente calculado pela estratégia do ativo"""
+        if atr is None or np.isnan(atr):
+            return
+        with self._lock:
+            self._parametros[ativo] = (float(atr), float(point), int(digits), bool(trailing), float(breakeven_level))
+
+    def remover_ativo(self, ativo):
+        with self._lock:
+            self._parametros.pop(ativo, None)
+
+    def start_monitoring(self):
+        """Inicia a gestão das posições em background"""
+        if self._monitoring:
+            return
+        self._monitoring = True
+        self._monitor_thread = threading.Thread(target=self._monitor_positions, daemon=True)
+        self._monitor_thread.start()
+
+    def stop_monitoring(self):
+        self._monitoring = False
+        if self._monitor_thread:
+            self._monitor_thread.join()
+            self._monitor_thread = None
+
+    def _monitor_positions(self):
+        while self._monitoring:
+            if not supervisor_conexao.aguardar_conexao(timeout=self.intervalo):
+                continue
+            try:
+                self.processar()
+            except Exception as e:
+                self._logar(f"❌ Erro na gestão de posições: {e}")
+            time.sleep(self.intervalo)
+
+    def _logar(self, mensagem, ativo=None):
+        if self.log_system:
+            self.log_system.logar(mensagem, ativo)
+
+    def calcular_novos_stops(self, tipo, abertura, sl, tp, atual, atr, point, trailing, breakeven_level):
+        """Calcula (vetorizado) os novos SLs; retorna (novos_sl, máscara de posições a modificar)"""
+        direcao = np.where(tipo == mt5.POSITION_TYPE_BUY, 1.0, -1.0)
+        lucro = (atual - abertura) * direcao
+        # Sem TP, o alvo de referência do breakeven é a própria distância do trailing
+        alvo = np.where(tp > 0, np.abs(tp - abertura), atr * self.multiplicador_atr)
+
+        # SL atual normalizado: 0 significa "sem stop" (pior nível possível)
+        sl_efetivo = np.where(sl > 0, sl, -np.inf * direcao)
+
+        # Breakeven: leva o SL para o preço de entrada ao atingir a fração configurada do alvo
+        candidato_be = np.where((lucro > 0) & (lucro >= breakeven_level * alvo), abertura, np.nan)
+        # Trailing: acompanha o preço a uma distância fixa em ATRs
+        candidato_trailing = np.where(trailing & (lucro > 0), atual - direcao * atr * self.multiplicador_atr, np.nan)
+
+        # Para compras o melhor SL é o maior, para vendas o menor (comparação no espaço "direção")
+        candidatos = np.stack([sl_efetivo * direcao, candidato_be * direcao, candidato_trailing * direcao])
+        novos = np.nanmax(candidatos, axis=0) * direcao
+
+        with np.errstate(invalid='ignore'):  # inf - inf quando não há SL nem candidato
+            melhora = (novos - sl_efetivo) * direcao
+        modificar = np.isfinite(novos) & (melhora >= self.passo_minimo * point)
+        return novos, modificar
+
+    def processar(self):
+        """Um lote: uma chamada positions_get, cálculo vetorizado e só as modificações necessárias"""
+        tirado_em = time.monotonic()
+        posicoes = mt5.positions_get()
+        if posicoes is not None:
+            indice_posicoes.sincronizar(posicoes, tirado_em)  # O mesmo snapshot mantém o índice das verificações de risco
+            abertas = {p.ticket for p in posicoes}
+            for ticket in self._rejeicoes.keys() - abertas:
+                del self._rejeicoes[ticket]
+        if not posicoes:
+            return 0
+
+        with self._lock:
+            parametros = dict(self._parametros)
+        nossas = [p for p in posicoes if p.magic == self.magic and p.symbol in parametros]
+        if not nossas:
+            return 0
+
+        params = [parametros[p.symbol] for p in nossas]
+        novos, modificar = self.calcular_novos_stops(
+            tipo=np.array([p.type for p in nossas]),
+            abertura=np.array([p.price_open for p in nossas]),
+            sl=np.array([p.sl for p in nossas]),
+            tp=np.array([p.tp for p in nossas]),
+            atual=np.array([p.price_current for p in nossas]),
+            atr=np.array([x[0] for x in params]),
+            point=np.array([x[1] for x in params]),
+            trailing=np.array([x[3] for x in params]),
+            breakeven_level=np.array([x[4] for x in params]),
+        )
+
+        enviadas = 0
+        agora = time.monotonic()
+        for i in np.flatnonzero(modificar):
+            posicao = nossas[i]
+            novo_sl = round(float(novos[i]), params[i][2])
+            rejeicao = self._rejeicoes.get(posicao.ticket)
+            if rejeicao is not None and rejeicao[0] == novo_sl and agora < rejeicao[1]:
+                continue  # Mesmo pedido recusado há pouco: aguarda a espera antes de reenviar
+            resultado = mt5.order_send({
+                "action": mt5.TRADE_ACTION_SLTP,
+                "symbol": posicao.symbol,
+                "position": posicao.ticket,
+                "sl": novo_sl,
+                "tp": posicao.tp,
+                "magic": self.magic,
+            })
+            if resultado is not None and resultado.retcode == mt5.TRADE_RETCODE_DONE:
+                enviadas += 1
+                self._rejeicoes.pop(posicao.ticket, None)
+                self._logar(f"🔒 SL ajustado ({posicao.symbol} #{posicao.ticket}): {posicao.sl:.5f} → {novo_sl:.5f}")
+                continue
+            if rejeicao is None:  # Registra só a primeira recusa de cada posição
+                comentario = resultado.comment if resultado is not None else mt5.last_error()
+                self._logar(f"⚠️ AVISO: falha ao ajustar SL de #{posicao.ticket}: {comentario} "
+                            f"(novas tentativas com espera crescente)")
+            espera = self.espera_rejeicao
+            if rejeicao is not None and rejeicao[0] == novo_sl:
+                espera = min(rejeicao[2] * 2, self.espera_rejeicao_max)
+            self._rejeicoes[posicao.ticket] = (novo_sl, agora + espera, espera)
+
+        self.modificacoes_enviadas += enviadas
+        return enviadas
+
+
+# Create global position manager instance
+gerenciador_posicoes = GerenciadorPosicoes()
@@ -0,0 +1,256 @@
+"""Linguagem de regras da estratégia, compilada uma vez para expressões NumPy vetorizadas.
+
+Cada regra é uma expressão com sintaxe Python restrita:
+    close, open, high, low, volume, spread     séries de barras
+    ema(close, ema_rapida), rsi(close, 14)...   indicadores (ver FUNCOES)
+    x[1]                                       valor de x uma barra atrás
+    < > <= >= ==, and, or, not, + - * /        comparações e aritmética
+    cruza_acima(a, b), cruza_abaixo(a, b)      cruzamentos
+    pelo_menos(2, c1, c2, ...), contar(...)    votação
+Demais nomes são regras definidas antes no mesmo conjunto ou parâmetros passados na avaliação.
+
+As séries podem ter qualquer forma (..., barras): uma série (ao vivo ou histórico inteiro de um
+backtest) ou uma matriz ativos x barras (triagem). O tempo é sempre o último eixo.
+"""
+import ast
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+SERIES = ('open', 'high', 'low', 'close', 'volume', 'spread')
+
+
+def _por_coluna(x, aplicar):
+    """Aplica uma operação do pandas ao longo do último eixo de um array (..., barras)"""
+    x = np.asarray(x, dtype=np.float64)
+    forma = x.shape
+    resultado = aplicar(pd.DataFrame(x.reshape(-1, forma[-1]).T))
+    return resultado.values.T.reshape(forma)
+
+
+def _deslocar(x, barras):
+    """x `barras` barras atrás, alinhado com a barra atual (NaN/False antes do início)"""
+    x = np.asarray(x)
+    if barras == 0:
+        return x
+    if x.dtype == bool:
+        deslocado = np.zeros_like(x)
+    else:
+        deslocado = np.full(x.shape, np.nan)
+    deslocado[..., barras:] = x[..., :-barras]
+    return deslocado
+
+
+def ema(x, periodo):
+    return _por_coluna(x, lambda df: df.ewm(span=int(periodo), adjust=False).mean())
+
+
+def media(x, periodo):
+    return _por_coluna(x, lambda df: df.rolling(window=int(periodo)).mean())
+
+
+def desvio(x, periodo):
+    return _por_coluna(x, lambda df: df.rolling(window=int(periodo)).std())
+
+
+def maximo(x, periodo):
+    return _por_coluna(x, lambda df: df.rolling(window=int(periodo)).max())
+
+
+def minimo(x, periodo):
+    return _por_coluna(x, lambda df: df.rolling(window=int(periodo)).min())
+
+
+def rsi(x, periodo=14):
+    """RSI com médias simples de ganhos e perdas (mesmo cálculo de EstrategiaTrading.rsi)"""
+    x = np.asarray(x, dtype=np.float64)
+    delta = x - _deslocar(x, 1)
+    ganho = np.where(delta > 0, delta, 0.0)
+    perda = np.where(delta < 0, -delta, 0.0)
+    media_ganho = media(ganho[..., 1:], periodo)
+    media_perda = media(perda[..., 1:], periodo)
+    rs = media_ganho / np.where(media_perda == 0, 0.000001, media_perda)
+    resultado = np.full(x.shape, 50.0)
+    resultado[..., 1:] = np.where(np.isnan(rs), 50.0, 100 - 100 / (1 + rs))
+    return resultado
+
+
+def macd(x, rapido=12, lento=26, sinal=9):
+    return ema(x, rapido) - ema(x, lento)
+
+
+def sinal_macd(x, rapido=12, lento=26, sinal=9):
+    return ema(macd(x, rapido, lento), sinal)
+
+
+def bb_superior(x, periodo=20, desvios=2):
+    return media(x, periodo) + desvio(x, periodo) * desvios
+
+
+def bb_inferior(x, periodo=20, desvios=2):
+    return media(x, periodo) - desvio(x, periodo) * desvios
+
+
+def stoch(high, low, close, periodo=14, suavizacao=3):
+    """%K suavizado do estocástico"""
+    menor = minimo(low, periodo)
+    maior = maximo(high, periodo)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        k = 100 * (np.asarray(close, dtype=np.float64) - menor) / (maior - menor)
+    return media(k, suavizacao)
+
+
+def atr(high, low, close, periodo=14):
+    close_anterior = _deslocar(np.asarray(close, dtype=np.float64), 1)
+    faixas = np.stack([np.asarray(high, dtype=np.float64) - low,
+                       np.abs(high - close_anterior), np.abs(low - close_anterior)])
+    return media(np.nanmax(faixas, axis=0), periodo)
+
+
+def momentum(x, periodo=10):
+    x = np.asarray(x, dtype=np.float64)
+    periodo = int(periodo)
+    resultado = np.empty_like(x)
+    resultado[..., periodo:] = x[..., periodo:] - x[..., :-periodo]
+    resultado[..., :periodo] = resultado[..., periodo:periodo + 1]
+    return resultado
+
+
+def cruza_acima(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    return (a > b) & (_deslocar(a, 1) <= _deslocar(b, 1))
+
+
+def cruza_abaixo(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    return (a < b) & (_deslocar(a, 1) >= _deslocar(b, 1))
+
+
+def contar(*condicoes):
+    return sum(np.asarray(c, dtype=np.int16) for c in condicoes)
+
+
+def pelo_menos(n, *condicoes):
+    return contar(*condicoes) >= n
+
+
+FUNCOES = {
+    'ema': ema, 'media': media, 'desvio': desvio, 'maximo': maximo, 'minimo': minimo,
+    'rsi': rsi, 'macd': macd, 'sinal_macd': sinal_macd, 'bb_superior': bb_superior,
+    'bb_inferior': bb_inferior, 'stoch': stoch, 'atr': atr, 'momentum': momentum,
+    'cruza_acima': cruza_acima, 'cruza_abaixo': cruza_abaixo, 'contar': contar,
+    'pelo_menos': pelo_menos, 'abs': np.abs,
+}
+
+COMPARACOES = {
+    ast.Lt: np.less, ast.Gt: np.greater, ast.LtE: np.less_equal, ast.GtE: np.greater_equal,
+    ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+ARITMETICA = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+
+class ErroRegra(ValueError):
+    """Regra com sintaxe ou nome inválido"""
+
+
+class ConjuntoRegras:
+    """Conjunto ordenado de regras nomeadas, compilado uma vez e avaliado sobre arrays"""
+
+    def __init__(self, regras):
+        self.textos = dict(regras)
+        self._compiladas = {}
+        for nome, texto in self.textos.items():
+            try:
+                arvore = ast.parse(texto, mode='eval').body
+            except SyntaxError as e:
+                raise ErroRegra(f"Regra '{nome}': sintaxe inválida ({e.msg})") from None
+            self._compiladas[nome] = self._compilar(arvore, nome)
+
+    def _compilar(self, no, regra):
+        """Converte um nó da AST em uma função ctx -> array (subexpressões iguais são calculadas uma vez)"""
+        chave = ast.dump(no)
+
+        if isinstance(no, ast.Constant) and isinstance(no.value, (int, float)):
+            valor = no.value
+            return lambda ctx: valor
+
+        if isinstance(no, ast.Name):
+            nome = no.id
+            if nome in SERIES:
+                return lambda ctx: ctx['dados'][nome]
+            if nome in self._compiladas:
+                return lambda ctx: ctx['regras'][nome]
+            if nome in FUNCOES:
+                raise ErroRegra(f"Regra '{regra}': '{nome}' é uma função")
+
+            def parametro(ctx):
+                try:
+                    return ctx['parametros'][nome]
+                except KeyError:
+                    raise ErroRegra(f"Regra '{regra}': nome desconhecido '{nome}'") from None
+            return parametro
+
+        if isinstance(no, ast.BoolOp):
+            operandos = [self._compilar(v, regra) for v in no.values]
+            operacao = np.logical_and if isinstance(no.op, ast.And) else np.logical_or
+            return lambda ctx: reduce(operacao, (f(ctx) for f in operandos))
+
+        if isinstance(no, ast.UnaryOp) and isinstance(no.op, (ast.Not, ast.USub)):
+            operando = self._compilar(no.operand, regra)
+            if isinstance(no.op, ast.Not):
+                return lambda ctx: np.logical_not(operando(ctx))
+            return lambda ctx: np.negative(operando(ctx))
+
+        if isinstance(no, ast.BinOp) and type(no.op) in ARITMETICA:
+            operacao = ARITMETICA[type(no.op)]
+            esquerda, direita = self._compilar(no.left, regra), self._compilar(no.right, regra)
+            return lambda ctx: operacao(esquerda(ctx), direita(ctx))
+
+        if isinstance(no, ast.Compare) and all(type(op) in COMPARACOES for op in no.ops):
+            termos = [self._compilar(no.left, regra)] + [self._compilar(c, regra) for c in no.comparators]
+            operacoes = [COMPARACOES[type(op)] for op in no.ops]
+
+            def comparar(ctx):
+                valores = [f(ctx) for f in termos]
+                partes = [op(valores[i], valores[i + 1]) for i, op in enumerate(operacoes)]
+                return reduce(np.logical_and, partes)
+            return comparar
+
+        if isinstance(no, ast.Subscript):
+            indice = no.slice
+            if not (isinstance(indice, ast.Constant) and isinstance(indice.value, int) and indice.value >= 0):
+                raise ErroRegra(f"Regra '{regra}': use x[n] com n inteiro >= 0 para barras anteriores")
+            serie, barras = self._compilar(no.value, regra), indice.value
+            return self._memorizar(chave, lambda ctx: _deslocar(serie(ctx), barras))
+
+        if isinstance(no, ast.Call) and isinstance(no.func, ast.Name) and not no.keywords:
+            if no.func.id not in FUNCOES:
+                raise ErroRegra(f"Regra '{regra}': função desconhecida '{no.func.id}'")
+            funcao = FUNCOES[no.func.id]
+            argumentos = [self._compilar(a, regra) for a in no.args]
+            return self._memorizar(chave, lambda ctx: funcao(*(a(ctx) for a in argumentos)))
+
+        raise ErroRegra(f"Regra '{regra}': expressão não suportada: {ast.unparse(no)}")
+
+    @staticmethod
+    def _memorizar(chave, funcao):
+        def memorizada(ctx):
+            cache = ctx['cache']
+            if chave not in cache:
+                cache[chave] = funcao(ctx)
+            return cache[chave]
+        return memorizada
+
+    def avaliar(self, dados, parametros=None, ultima=False):
+        """Avalia todas as regras sobre as séries (arrays (..., barras)).
+
+        `ultima=True` devolve só o valor na barra mais recente (uso ao vivo).
+        """
+        ctx = {'dados': dados, 'parametros': parametros or {}, 'regras': {}, 'cache': {}}
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for nome, funcao in self._compiladas.items():
+                ctx['regras'][nome] = np.asarray(funcao(ctx))
+        if ultima:
+            return {nome: valor[..., -1] if valor.ndim else valor for nome, valor in ctx['regras'].items()}
+        return ctx['regras']
@@ -0,0 +1,81 @@
+import numpy as np
+
+from multi_timeframe import RATES_DTYPE
+
+CAMPOS = ('time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread')
+
+
+class BufferBarras:
+    """Histórico OHLCV de tamanho fixo por ativo/timeframe, pré-alocado e por colunas.
+
+    Cada barra é gravada duas vezes (posição p e p + capacidade), então as últimas N barras
+    são sempre um trecho contíguo da coluna: leitura sem cópia e sem concatenar.
+    """
+
+    def __init__(self, capacidade=200):
+        self.capacidade = capacidade
+        self._colunas = {nome: np.zeros(2 * capacidade, dtype=RATES_DTYPE[nome]) for nome in CAMPOS}
+        self._posicao = 0  # Próxima posição de escrita (0..capacidade-1)
+        self._tamanho = 0
+
+    def __len__(self):
+        return self._tamanho
+
+    def ultimo_tempo(self):
+        """Horário de abertura da barra mais recente (None se vazio)"""
+        if self._tamanho == 0:
+            return None
+        return int(self._colunas['time'][self._posicao - 1 + self.capacidade])
+
+    def _gravar(self, posicao, barra):
+        for nome in CAMPOS:
+            coluna = self._colunas[nome]
+            coluna[posicao] = coluna[posicao + self.capacidade] = barra[nome]
+
+    def anexar(self, barra):
+        """Acrescenta uma barra em O(1), descartando a mais antiga quando cheio"""
+        self._gravar(self._posicao, barra)
+        self._posicao = (self._posicao + 1) % self.capacidade
+        self._tamanho = min(self._tamanho + 1, self.capacidade)
+
+    def substituir_ultima(self, barra):
+        """Atualiza a barra em formação em O(1)"""
+        self._gravar((self._posicao - 1) % self.capacidade, barra)
+
+    def atualizar(self, barras):
+        """Incorpora barras de mt5.copy_rates_*: atualiza a última se repetida e anexa as novas"""
+        if barras is None or len(barras) == 0:
+            return 0
+        ultimo = self.ultimo_tempo()
+        if ultimo is not None:
+            tempos = barras['time']
+            barras = barras[tempos >= ultimo]
+            if len(barras) and barras['time'][0] == ultimo:
+                self.substituir_ultima(barras[0])
+                barras = barras[1:]
+
+        novas = len(barras)
+        if novas == 1:
+            self.anexar(barras[0])
+        elif novas > 1:
+            barras = barras[-self.capacidade:]
+            k = len(barras)
+            posicoes = (self._posicao + np.arange(k)) % self.capacidade
+            for nome in CAMPOS:
+                coluna = self._colunas[nome]
+                coluna[posicoes] = coluna[posicoes + self.capacidade] = barras[nome]
+            self._posicao = (self._posicao + k) % self.capacidade
+            self._tamanho = min(self._tamanho + k, self.capacidade)
+        return novas
+
+    def ultimas(self, campo, n=None):
+        """Visão somente leitura (sem cópia) das últimas `n` barras de uma coluna, da mais antiga à atual"""
+        n = self._tamanho if n is None else min(n, self._tamanho)
+        fim = self._posicao + self.capacidade
+        visao = self._colunas[campo][fim - n:fim]
+        visao.flags.writeable = False
+        return visao
+
+    def limpar(self):
+        self._posicao = 0
+        self._tamanho = 0
@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from mt5_gate import cliente_mt5, PRIORIDADE_DADOS
+from multi_timeframe import RATES_DTYPE, TIMEFRAMES_MT5, segundos_resolucao, obter_feed, feeds_ativos
+from position_index import indice_posicoes
+from utils import MAGIC_NUMBER
+
+mt5 = cliente_mt5(PRIORIDADE_DADOS)
+
+CAMINHO_SNAPSHOT = "snapshot.npz"
+VERSAO = 1
+
+# Timeframe do MT5 -> segundos por barra (validade das barras salvas)
+SEGUNDOS_TIMEFRAME = {valor: segundos_resolucao(nome) for nome, valor in TIMEFRAMES_MT5.items()}
+
+
+def _chave(ativo, timeframe):
+    return f"{ativo}|{timeframe}"
+
+
+class GerenciadorSnapshot:
+    """Warm start: salva barras, campos de execução e metadados das estratégias em um .npz
+    (no encerramento e em checkpoints periódicos) e os restaura, reconciliados com o terminal."""
+
+    def __init__(self, caminho=CAMINHO_SNAPSHOT, intervalo=60.0):
+        self.caminho = caminho
+        self.intervalo = intervalo  # Segundos entre checkpoints
+        self.log_system = None
+        self._lock = threading.Lock()
+        self._estrategias = {}  # chave -> estratégia em execução
+        self._estados = {}  # chave -> estado salvo (carregado do disco ou da estratégia já parada)
+        self._feeds = {}  # ativo -> (salvo_em, barras base M1)
+        self._parar = threading.Event()
+        self._monitoring = False
+        self._monitor_thread = None
+        self.restauradas = 0
+
+        self.carregar()
+
+    def _logar(self, mensagem, ativo=None):
+        if self.log_system:
+            self.log_system.logar(mensagem, ativo)
+
+    # ---- persistência --------------------------------------------------------------------------
+
+    def carregar(self):
+        if not os.path.exists(self.caminho):
+            return
+        try:
+            with np.load(self.caminho, allow_pickle=False) as arquivo:
+                meta = json.loads(str(arquivo['meta']))
+                if meta.get('versao') != VERSAO:
+                    return
+                for i, estado in enumerate(meta['estrategias']):
+                    estado['barras'] = arquivo[f'barras_{i}']
+                    self._estados[_chave(estado['ativo'], estado['timeframe'])] = estado
+                for i, feed in enumerate(meta['feeds']):
+                    self._feeds[feed['ativo']] = (feed['salvo_em'], arquivo[f'feed_{i}'])
+        except (OSError, ValueError, KeyError):
+            self._estados, self._feeds = {}, {}
+
+    def salvar(self):
+        """Grava o estado das estratégias (em execução e paradas) e dos feeds multi-timeframe"""
+        with self._lock:
+            for chave, estrategia in self._estrategias.items():
+                self._estados[chave] = self._capturar(estrategia)
+            estados = list(self._estados.values())
+
+        arrays = {}
+        meta = {'versao': VERSAO, 'estrategias': [], 'feeds': []}
+        for i, estado in enumerate(estados):
+            arrays[f'barras_{i}'] = estado['barras']
+            meta['estrategias'].append({nome: valor for nome, valor in estado.items() if nome != 'barras'})
+        feeds = {feed.ativo: feed for feed in feeds_ativos()}
+        for i, ativo in enumerate(sorted(feeds)):
+            with feeds[ativo].lock:
+                arrays[f'feed_{i}'] = feeds[ativo].barras_base.copy()
+            meta['feeds'].append({'ativo': ativo, 'salvo_em': time.time()})
+        arrays['meta'] = np.array(json.dumps(meta))
+
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(temporario, self.caminho)
+
+    def _capturar(self, estrategia):
+        """Cópia do estado de uma estratégia (sob o lock dela)"""
+        with estrategia.lock:
+            n = len(estrategia.barras)
+            barras = np.zeros(n, dtype=RATES_DTYPE)
+            for campo in ('time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread'):
+                barras[campo] = estrategia.barras.ultimas(campo)
+            info = estrategia.symbol_info
+            return {
+                'ativo': estrategia.ativo,
+                'timeframe': estrategia.timeframe,
+                'salvo_em': time.time(),
+                'barras': barras,
+                'ticket_atual': estrategia.ticket_atual,
+                'last_analysis_time': estrategia.last_analysis_time.timestamp()
+                if estrategia.last_analysis_time else None,
+                'symbol_info': dict(info._asdict() if hasattr(info, '_asdict') else vars(info)) if info else None,
+                'marcadores': [[int(t), float(p), bool(c)] for t, p, c in estrategia.marcadores],
+                'posicoes': self._posicoes_proprias(estrategia.ativo) or [],
+                'tickets': indice_posicoes.tickets_estrategia(estrategia.id_estrategia),  # Donas: esta estratégia
+            }
+
+    @staticmethod
+    def _posicoes_proprias(ativo):
+        """Tickets das posições do robô no ativo (None se o terminal não respondeu)"""
+        try:
+            posicoes = mt5.positions_get(symbol=ativo)
+        except Exception:
+            return None
+        if posicoes is None:
+            return None
+        return sorted(p.ticket for p in posicoes if p.magic == MAGIC_NUMBER)
+
+    # ---- registro das estratégias --------------------------------------------------------------
+
+    def restaurar(self, estrategia):
+        """Registra a estratégia para os checkpoints e aplica o estado salvo, se houver"""
+        chave = _chave(estrategia.ativo, estrategia.timeframe)
+        with self._lock:
+            self._estrategias[chave] = estrategia
+            estado = self._estados.pop(chave, None)
+        self._restaurar_feed(estrategia.ativo)
+        if estado is None:
+            return False
+
+        idade = time.time() - estado['salvo_em']
+        barras = estado['barras']
+        with estrategia.lock:
+            # Além da capacidade do buffer o catch-up custaria o mesmo que um início a frio
+            if len(barras) and idade < estrategia.barras.capacidade * SEGUNDOS_TIMEFRAME.get(estrategia.timeframe, 60):
+                estrategia.barras.limpar()
+                estrategia.barras.atualizar(barras)
+            if estado['symbol_info'] and estrategia.symbol_info is None:
+                estrategia.symbol_info = SimpleNamespace(**estado['symbol_info'])
+            if estado['last_analysis_time']:
+                estrategia.last_analysis_time = datetime.fromtimestamp(estado['last_analysis_time'])
+            estrategia.marcadores.extend(tuple(m) for m in estado['marcadores'])
+            estrategia.ticket_atual = estado['ticket_atual']
+        self._reconciliar(estrategia, estado['posicoes'], estado.get('tickets', [estado['ticket_atual']]))
+
+        self.restauradas += 1
+        self._logar(f"♻️ Estado de {estrategia.ativo} restaurado ({len(estrategia.barras)} barras, "
+                    f"salvo há {idade / 60:.0f} min)", estrategia.ativo)
+        return True
+
+    def _restaurar_feed(self, ativo):
+        salvo = self._feeds.pop(ativo, None)
+        if salvo is None:
+            return
+        salvo_em, barras = salvo
+        feed = obter_feed(ativo)
+        if time.time() - salvo_em < feed.capacidade_base * SEGUNDOS_TIMEFRAME[feed.timeframe_base]:
+            feed.restaurar_base(barras)
+
+    def _reconciliar(self, estrategia, posicoes_salvas, tickets_salvos):
+        """Confere as posições salvas com as abertas no terminal (fechadas/abertas enquanto parado) e
+        devolve à estratégia, no índice de posições, todas as suas que continuam abertas"""
+        atuais = self._posicoes_proprias(estrategia.ativo)
+        if atuais is None:
+            self._logar(f"⚠️ Não foi possível reconciliar as posições de {estrategia.ativo}", estrategia.ativo)
+            return
+        fechadas = set(posicoes_salvas) - set(atuais)
+        novas = set(atuais) - set(posicoes_salvas)
+        if fechadas:
+            self._logar(f"ℹ️ {len(fechadas)} posição(ões) de {estrategia.ativo} fechada(s) enquanto o robô "
+                        f"estava parado", estrategia.ativo)
+        if novas:
+            self._logar(f"ℹ️ {len(novas)} posição(ões) do robô em {estrategia.ativo} desconhecida(s) no snapshot",
+                        estrategia.ativo)
+        with estrategia.lock:
+            if estrategia.ticket_atual not in atuais:
+                estrategia.ticket_atual = atuais[-1] if atuais else None
+            for ticket in (set(tickets_salvos) & set(atuais)) | {estrategia.ticket_atual}:
+                indice_posicoes.registrar_execucao(ticket, estrategia.ativo, MAGIC_NUMBER, estrategia.id_estrategia)
+
+    def remover(self, estrategia):
+        """Estratégia parada: guarda o último estado para o próximo snapshot"""
+        chave = _chave(estrategia.ativo, estrategia.timeframe)
+        with self._lock:
+            if self._estrategias.get(chave) is not estrategia:
+                return
+            del self._estrategias[chave]
+            self._estados[chave] = self._capturar(estrategia)
+
+    # ---- checkpoints ---------------------------------------------------------------------------
+
+    def start_monitoring(self):
+        """Inicia os checkpoints periódicos em background"""
+        if self._monitoring:
+            return
+        self._monitoring = True
+        self._parar.clear()
+        self._monitor_thread = threading.Thread(target=self._monitor_snapshot, daemon=True)
+        self._monitor_thread.start()
+
+    def stop_monitoring(self):
+        """Para os checkpoints e grava o snapshot final"""
+        self._monitoring = False
+        self._parar.set()
+        if self._monitor_thread:
+            self._monitor_thread.join()
+            self._monitor_thread = None
+        self.salvar()
+
+    def _monitor_snapshot(self):
+        while self._monitoring:
+            self._parar.wait(self.intervalo)
+            if not self._monitoring:
+                break
+            try:
+                self.salvar()
+            except Exception as e:
+                self._logar(f"❌ Erro ao salvar snapshot: {e}")
+
+
+# Create global snapshot manager instance
+gerenciador_snapshot = GerenciadorSnapshot()
@@ -0,0 +1,209 @@
+"""Teste de longa duração (soak): muitas estratégias contra o MT5 simulado por dias simulados.
+
+Cada passo avança o relógio do terminal simulado, roda um ciclo de cada estratégia, atualiza o
+AssetManager, a gestão de posições e drena o log para widgets que guardam o texto de verdade.
+A cada hora simulada registra RSS, tracemalloc, bytes por subsistema e a latência dos ciclos.
+Falha (código 1) se a memória ou a latência derivarem além dos limites após o aquecimento.
+
+Exemplos:
+    python soak_test.py --estrategias 20 --dias 3
+    python soak_test.py --estrategias 50 --dias 30 --limite-memoria-mb 50 --limite-latencia 1.5
+    python soak_test.py --estrategias 50 --dias 30 --sem-tracemalloc   # ~20x mais rápido, só RSS
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+class TextoMemoria:
+    """Substituto de tk.Text que guarda as linhas (o crescimento do conteúdo entra na medição)"""
+
+    def __init__(self):
+        self.linhas = ['']
+
+    def tag_configure(self, *args, **kwargs):
+        pass
+
+    def insert(self, indice, texto, *tags):
+        partes = texto.split('\n')
+        self.linhas[-1] += partes[0]
+        self.linhas.extend(partes[1:])
+
+    def see(self, indice):
+        pass
+
+    def index(self, indice):
+        return f"{len(self.linhas) + 1}.0"
+
+    def delete(self, inicio, fim=None):
+        if fim == 'end':
+            self.linhas = ['']
+        else:
+            del self.linhas[int(float(inicio)) - 1:int(float(fim)) - 1]
+
+
+def percentil(valores, p):
+    return float(np.percentile(valores, p)) if len(valores) else 0.0
+
+
+def executar(args):
+    import fake_mt5
+    terminal = fake_mt5.instalar(n_symbols=max(args.estrategias, args.monitorados))
+
+    from estrategia import EstrategiaTrading
+    from log_system import LogSystem
+    from memory_monitor import MonitorMemoria, tamanho_profundo
+    from mt5_gate import controlador_mt5
+    from multi_timeframe import feeds_ativos
+    from position_manager import gerenciador_posicoes
+    from utils import AssetManager
+
+    # O relógio simulado corre muito à frente do real: o orçamento por segundo do portão não se aplica
+    controlador_mt5.definir_limites({prioridade: 1e9 for prioridade in controlador_mt5.limites})
+
+    nomes = list(terminal.symbols)
+    log = LogSystem()
+    widgets = {f"asset_{i}": TextoMemoria() for i in range(args.estrategias)}
+    for asset, widget in widgets.items():
+        log.add_log_widget(asset, widget)
+
+    estrategias = []
+    for i in range(args.estrategias):
+        estrategia = EstrategiaTrading(nomes[i], args.timeframe, 0.1, log)
+        estrategia.timeframes_confirmacao = args.confirmacao
+        estrategias.append(estrategia)
+
+    manager = AssetManager()
+    for nome in nomes[:args.monitorados]:
+        manager.add_asset(nome)
+
+    monitor = MonitorMemoria(rastrear=not args.sem_tracemalloc)
+    monitor.registrar('estrategias', lambda: sum(tamanho_profundo(e.barras) + tamanho_profundo(e.marcadores)
+                                                 for e in estrategias))
+    monitor.registrar('feeds', lambda: sum(tamanho_profundo(f.barras_base) + tamanho_profundo(f.agregadores)
+                                           for f in feeds_ativos()))
+    monitor.registrar('asset_manager', lambda: tamanho_profundo(manager._status) + tamanho_profundo(manager._ids))
+    monitor.registrar('log_fila', log.bytes_retidos)
+    monitor.registrar('log_widgets', lambda: sum(tamanho_profundo(w.linhas) for w in widgets.values()))
+    if monitor.rastrear:
+        import tracemalloc
+        tracemalloc.start(monitor.quadros)
+
+    passos = int(args.dias * 86400 // args.passo)
+    passos_por_amostra = max(1, int(3600 // args.passo))
+    latencias = []
+    janelas = []
+    inicio = time.perf_counter()
+    for passo in range(passos):
+        terminal.avancar(args.passo)
+        for estrategia in estrategias:
+            t0 = time.perf_counter()
+            estrategia.last_analysis_time = None
+            estrategia.analisar_e_operar()
+            latencias.append(time.perf_counter() - t0)
+        for nome in nomes[:args.monitorados]:
+            manager.update_asset_status(nome)
+        gerenciador_posicoes.processar()
+        log.drenar(max_mensagens=10 ** 6)
+
+        if (passo + 1) % passos_por_amostra == 0 or passo == passos - 1:
+            amostra = monitor.amostrar()
+            amostra['horas_simuladas'] = (passo + 1) * args.passo / 3600
+            amostra['ciclo_p50_ms'] = percentil(latencias, 50) * 1000
+            amostra['ciclo_p95_ms'] = percentil(latencias, 95) * 1000
+            janelas.append(amostra)
+            latencias = []
+            if args.verboso:
+                print(f"{amostra['horas_simuladas']:8.1f}h  RSS {(amostra['rss'] or 0) / 2 ** 20:8.1f} MB  "
+                      f"p95 {amostra['ciclo_p95_ms']:7.2f} ms")
+    duracao = time.perf_counter() - inicio
+    return janelas, monitor, duracao
+
+
+def avaliar(janelas, monitor, args):
+    """Compara o fim do teste com a primeira amostra após o aquecimento"""
+    aquecidas = janelas[int(len(janelas) * args.aquecimento):] or janelas[-1:]
+    base, final = aquecidas[0], aquecidas[-1]
+    ultimas = aquecidas[-max(1, len(aquecidas) // 10):]
+    primeiras = aquecidas[:max(1, len(aquecidas) // 10)]
+
+    crescimento_rss = ((final['rss'] or 0) - (base['rss'] or 0)) / 2 ** 20
+    crescimento_python = (final.get('tracemalloc_atual', 0) - base.get('tracemalloc_atual', 0)) / 2 ** 20
+    deriva_latencia = (np.median([j['ciclo_p95_ms'] for j in ultimas]) /
+                       max(np.median([j['ciclo_p95_ms'] for j in primeiras]), 1e-9))
+    subsistemas = {nome: (final['subsistemas'].get(nome) or 0) - (base['subsistemas'].get(nome) or 0)
+                   for nome in final['subsistemas']}
+
+    falhas = []
+    if crescimento_rss > args.limite_memoria_mb:
+        falhas.append(f"RSS cresceu {crescimento_rss:.1f} MB (limite {args.limite_memoria_mb} MB)")
+    if crescimento_python > args.limite_memoria_mb:
+        falhas.append(f"Heap Python cresceu {crescimento_python:.1f} MB (limite {args.limite_memoria_mb} MB)")
+    if deriva_latencia > args.limite_latencia:
+        falhas.append(f"Latência p95 do ciclo derivou {deriva_latencia:.2f}x (limite {args.limite_latencia}x)")
+    return {
+        'crescimento_rss_mb': crescimento_rss,
+        'crescimento_tracemalloc_mb': crescimento_python,
+        'tendencia_rss_bytes_hora': monitor.tendencia_rss(),
+        'deriva_latencia_p95': float(deriva_latencia),
+        'crescimento_subsistemas_bytes': subsistemas,
+        'falhas': falhas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test do Future MT5 contra o MT5 simulado")
+    parser.add_argument('--estrategias', type=int, default=20)
+    parser.add_argument('--monitorados', type=int, default=100, help="Ativos atualizados no AssetManager")
+    parser.add_argument('--timeframe', default='M5')
+    parser.add_argument('--confirmacao', nargs='*', default=['H1'], help="Timeframes de confirmação")
+    parser.add_argument('--dias', type=float, default=3.0, help="Dias simulados")
+    parser.add_argument('--passo', type=int, default=300, help="Segundos simulados por passo")
+    parser.add_argument('--aquecimento', type=float, default=0.1, help="Fração inicial ignorada na avaliação")
+    parser.add_argument('--limite-memoria-mb', type=float, default=20.0, help="Crescimento máximo após aquecimento")
+    parser.add_argument('--limite-latencia', type=float, default=1.5, help="Deriva máxima do p95 do ciclo (x)")
+    parser.add_argument('--sem-tracemalloc', action='store_true', help="Só RSS (sem o custo do tracemalloc)")
+    parser.add_argument('--saida', default='soak_resultados.json')
+    parser.add_argument('--verboso', action='store_true')
+    args = parser.parse_args()
+
+    # Ledger, snapshot e journal gravam no diretório atual: o teste roda em um diretório temporário
+    saida = os.path.abspath(args.saida)
+    os.chdir(tempfile.mkdtemp(prefix='soak_'))
+
+    janelas, monitor, duracao = executar(args)
+    resultado = avaliar(janelas, monitor, args)
+
+    print(f"🧪 {args.estrategias} estratégias, {args.dias:g} dias simulados em {duracao:.0f}s")
+    print(f"   RSS {resultado['crescimento_rss_mb']:+.1f} MB   heap Python {resultado['crescimento_tracemalloc_mb']:+.1f} MB"
+          f"   deriva p95 {resultado['deriva_latencia_p95']:.2f}x")
+    for nome, variacao in resultado['crescimento_subsistemas_bytes'].items():
+        print(f"   {nome:16s} {variacao / 1024:+10.1f} KB")
+    if monitor.diffs:
+        print("   Maiores crescimentos (tracemalloc, último intervalo):")
+        for linha in monitor.diffs[-1]['linhas'][:5]:
+            print(f"     {linha['variacao_bytes'] / 1024:+9.1f} KB  {linha['local']}")
+
+    resultado['meta'] = {'estrategias': args.estrategias, 'dias': args.dias, 'passo': args.passo,
+                         'timeframe': args.timeframe, 'duracao_s': duracao}
+    resultado['amostras'] = janelas
+    resultado['diffs'] = list(monitor.diffs)
+    with open(saida, 'w') as f:
+        json.dump(resultado, f, indent=2)
+    print(f"💾 Resultados salvos em {saida}")
+
+    for falha in resultado['falhas']:
+        print(f"❌ {falha}")
+    if resultado['falhas']:
+        return 1
+    print("✅ Memória e latência estáveis")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
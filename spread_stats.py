@@ -0,0 +1,101 @@
+class QuantilP2:
+    """Estimador P² (Jain & Chlamtac) de um quantil: cinco marcadores, memória constante"""
+
+    __slots__ = ('p', 'n', 'alturas', 'posicoes', 'desejadas', 'incrementos')
+
+    def __init__(self, p):
+        self.p = p
+        self.limpar()
+
+    def limpar(self):
+        p = self.p
+        self.n = 0
+        self.alturas = []
+        self.posicoes = [1, 2, 3, 4, 5]
+        self.desejadas = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.incrementos = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def adicionar(self, x):
+        q = self.alturas
+        self.n += 1
+        if self.n <= 5:
+            q.append(x)
+            if self.n == 5:
+                q.sort()
+            return
+
+        n = self.posicoes
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desejadas[i] += self.incrementos[i]
+
+        # Ajusta os marcadores internos que se afastaram da posição desejada
+        for i in (1, 2, 3):
+            d = self.desejadas[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolica = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if q[i - 1] < parabolica < q[i + 1]:
+                    q[i] = parabolica
+                else:
+                    q[i] += d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def valor(self):
+        if self.n == 0:
+            return None
+        if self.n < 5:
+            ordenadas = sorted(self.alturas)
+            return ordenadas[min(len(ordenadas) - 1, int(round(self.p * (len(ordenadas) - 1))))]
+        return self.alturas[2]
+
+
+class EstatisticasSpread:
+    """Mediana e p95 do spread de um ativo por janelas de `janela` amostras, em memória constante.
+
+    Os valores publicados (mediana, p95) são leituras O(1): vêm da janela em andamento assim que
+    ela tem `minimo` amostras e, até lá, da janela anterior.
+    """
+
+    __slots__ = ('janela', 'minimo', 'ultimo', 'mediana', 'p95', 'amostras', '_mediana', '_p95', '_na_janela')
+
+    def __init__(self, janela=600, minimo=30):
+        self.janela = janela
+        self.minimo = minimo
+        self.ultimo = None
+        self.mediana = None
+        self.p95 = None
+        self.amostras = 0
+        self._mediana = QuantilP2(0.5)
+        self._p95 = QuantilP2(0.95)
+        self._na_janela = 0
+
+    def atualizar(self, spread):
+        self.ultimo = spread
+        self.amostras += 1
+        if self._na_janela >= self.janela:
+            self._mediana.limpar()
+            self._p95.limpar()
+            self._na_janela = 0
+        self._mediana.adicionar(spread)
+        self._p95.adicionar(spread)
+        self._na_janela += 1
+        if self._na_janela >= self.minimo:
+            self.mediana = self._mediana.valor()
+            self.p95 = self._p95.valor()
+
+    def pronto(self):
+        return self.mediana is not None
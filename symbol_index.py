@@ -0,0 +1,110 @@
+import re
+import threading
+from bisect import bisect_left, bisect_right
+
+
+class SymbolIndex:
+    """Índice de busca incremental de ativos (prefixo, substring e fuzzy)"""
+
+    def __init__(self, symbols=()):
+        self._lock = threading.Lock()
+        self._subindices = {}
+        self.construir(symbols)
+
+    def construir(self, symbols):
+        """Reconstrói o índice a partir de objetos SymbolInfo ou tuplas (nome, caminho)"""
+        nomes = []
+        caminhos = []
+        for symbol in symbols:
+            if isinstance(symbol, tuple):
+                nome, caminho = symbol
+            else:
+                nome, caminho = symbol.name, getattr(symbol, 'path', '')
+            nomes.append(nome)
+            caminhos.append(caminho or '')
+
+        with self._lock:
+            self.nomes = nomes
+            self.caminhos = caminhos
+            self._construir_estruturas()
+            self._subindices = {}
+
+    def _construir_estruturas(self):
+        lower = [nome.lower() for nome in self.nomes]
+
+        # Prefixo: lista ordenada + bisect
+        self._ordem = sorted(range(len(lower)), key=lower.__getitem__)
+        self._ordenados = [lower[i] for i in self._ordem]
+
+        # Substring e fuzzy: um único bloco de texto pesquisado pelo motor de regex (C)
+        self._blob = '\n'.join(lower)
+        self._inicios = []
+        pos = 0
+        for nome in lower:
+            self._inicios.append(pos)
+            pos += len(nome) + 1
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def categorias(self):
+        """Retorna as categorias de primeiro nível (primeiro segmento do caminho)"""
+        return sorted({self._categoria(c) for c in self.caminhos if c})
+
+    @staticmethod
+    def _categoria(caminho):
+        return re.split(r'[\\/]', caminho, maxsplit=1)[0]
+
+    def _subindice(self, categoria):
+        """Índice restrito aos ativos cujo caminho começa com a categoria (cacheado)"""
+        chave = categoria.lower().replace('/', '\\')
+        with self._lock:
+            sub = self._subindices.get(chave)
+            if sub is None:
+                pares = [(n, c) for n, c in zip(self.nomes, self.caminhos)
+                         if c.lower().replace('/', '\\').startswith(chave)]
+                sub = SymbolIndex(pares)
+                self._subindices[chave] = sub
+            return sub
+
+    def buscar(self, consulta, limite=20, categoria=None):
+        """Retorna até `limite` nomes: prefixos primeiro, depois substrings e por fim fuzzy"""
+        if categoria:
+            return self._subindice(categoria).buscar(consulta, limite)
+
+        consulta = (consulta or '').strip().lower()
+        if not consulta:
+            return self.nomes[:limite]
+
+        resultado = []
+        vistos = set()
+
+        def adicionar(indice):
+            if indice not in vistos:
+                vistos.add(indice)
+                resultado.append(indice)
+            return len(resultado) >= limite
+
+        # 1. Prefixo: O(log n + k)
+        ini = bisect_left(self._ordenados, consulta)
+        fim = bisect_right(self._ordenados, consulta + '\uffff')
+        for pos in range(ini, fim):
+            if adicionar(self._ordem[pos]):
+                return self._nomes(resultado)
+
+        # 2. Substring em qualquer posição do nome
+        for match in re.finditer(re.escape(consulta), self._blob):
+            if adicionar(bisect_right(self._inicios, match.start()) - 1):
+                return self._nomes(resultado)
+
+        # 3. Fuzzy: caracteres da consulta em ordem, com lacunas, dentro do mesmo nome
+        # (classes negadas evitam backtracking: cada caractere casa na primeira ocorrência)
+        padrao = '^' + ''.join('[^\n%s]*%s' % (re.escape(ch), re.escape(ch)) for ch in consulta)
+        for match in re.finditer(padrao, self._blob, re.MULTILINE):
+            if adicionar(bisect_right(self._inicios, match.start()) - 1):
+                break
+
+        return self._nomes(resultado)
+
+    def _nomes(self, indices):
+        return [self.nomes[i] for i in indices]
@@ -0,0 +1,51 @@
+import threading
+import tkinter as tk
+
+
+class ThemeRegistry:
+    """Registry of widgets tagged with semantic color roles for incremental re-theming"""
+
+    def __init__(self):
+        self._widgets = {}  # widget path -> (widget, {option: color role})
+        self._lock = threading.Lock()
+
+    def registrar(self, widget, **papeis):
+        """Tag a widget with color roles, e.g. registrar(label, fg='text', bg='bg_dark')"""
+        with self._lock:
+            self._widgets[str(widget)] = (widget, papeis)
+        return widget
+
+    def atualizar_papeis(self, widget, colors=None, **papeis):
+        """Change the roles of an already registered widget (and apply them right away)"""
+        with self._lock:
+            atual = self._widgets.get(str(widget), (widget, {}))[1]
+            atual = {**atual, **papeis}
+            self._widgets[str(widget)] = (widget, atual)
+        if colors is not None:
+            widget.configure(**{opcao: colors[papel] for opcao, papel in papeis.items()})
+
+    def remover(self, widget):
+        """Stop tracking a widget"""
+        with self._lock:
+            self._widgets.pop(str(widget), None)
+
+    def __len__(self):
+        return len(self._widgets)
+
+    def aplicar(self, colors):
+        """Apply a color palette in a single pass over the registered widgets"""
+        with self._lock:
+            itens = list(self._widgets.items())
+
+        mortos = []
+        for caminho, (widget, papeis) in itens:
+            try:
+                widget.configure(**{opcao: colors[papel] for opcao, papel in papeis.items()})
+            except tk.TclError:
+                # Widget destroyed since it was registered
+                mortos.append(caminho)
+
+        if mortos:
+            with self._lock:
+                for caminho in mortos:
+                    self._widgets.pop(caminho, None)
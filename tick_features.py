@@ -0,0 +1,213 @@
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from mt5_gate import cliente_mt5, PRIORIDADE_DADOS
+from connection_supervisor import supervisor_conexao
+from multi_timeframe import obter_feed
+from event_bus import barramento, TOPICO_BARRA, TOPICO_TICK, EventoBarra, EventoTick
+
+mt5 = cliente_mt5(PRIORIDADE_DADOS)
+
+# Amplitude esperada (máxima - mínima) de um passeio aleatório em T segundos: sqrt(8/pi) * sigma * sqrt(T)
+FATOR_AMPLITUDE = math.sqrt(8 / math.pi)
+
+
+class EstatisticasTick:
+    """Volatilidade realizada, taxa de ticks e desequilíbrio bid/ask de um ativo, em médias exponenciais
+    no tempo (meia-vida em segundos).
+
+    Cada lote de ticks é incorporado de forma vetorizada com pesos exp(-(t_fim - t_i) / tau); o estado
+    são cinco somas decaídas, então a memória é constante e as leituras são O(1).
+    """
+
+    __slots__ = ('tau', 'minimo', 'ticks', 'ultimo_msc', 'ultimo_mid',
+                 '_soma_r2', '_soma_dt', '_soma_ticks', '_soma_sinal', '_soma_abs')
+
+    def __init__(self, meia_vida=120.0, minimo=50):
+        self.tau = meia_vida / math.log(2)
+        self.minimo = minimo  # Ticks antes de publicar
+        self.ticks = 0
+        self.ultimo_msc = None
+        self.ultimo_mid = None
+        self._soma_r2 = 0.0  # Retornos log do preço médio ao quadrado
+        self._soma_dt = 0.0  # Segundos decorridos (mesmo decaimento: normaliza as outras somas)
+        self._soma_ticks = 0.0
+        self._soma_sinal = 0.0  # +1 tick de alta, -1 de baixa (regra do tick no preço médio)
+        self._soma_abs = 0.0
+
+    def adicionar(self, ticks):
+        """Incorpora um lote de ticks (array de mt5.copy_ticks_*, em ordem de tempo)"""
+        if len(ticks) == 0:
+            return
+        tempos = np.asarray(ticks['time_msc'], dtype=np.float64) / 1000.0
+        mid = np.log((np.asarray(ticks['bid'], dtype=np.float64) + np.asarray(ticks['ask'], dtype=np.float64)) / 2)
+        if self.ultimo_msc is None:
+            anterior_t, anterior_mid = tempos[0], mid[0]
+        else:
+            anterior_t, anterior_mid = self.ultimo_msc / 1000.0, self.ultimo_mid
+        dt = np.diff(tempos, prepend=anterior_t)
+        retornos = np.diff(mid, prepend=anterior_mid)
+        sinais = np.sign(retornos)
+
+        fim = tempos[-1]
+        pesos = np.exp((tempos - fim) / self.tau)
+        decaimento = math.exp((anterior_t - fim) / self.tau)
+        self._soma_r2 = self._soma_r2 * decaimento + float(pesos @ (retornos * retornos))
+        self._soma_dt = self._soma_dt * decaimento + float(pesos @ dt)
+        self._soma_ticks = self._soma_ticks * decaimento + float(pesos.sum())
+        self._soma_sinal = self._soma_sinal * decaimento + float(pesos @ sinais)
+        self._soma_abs = self._soma_abs * decaimento + float(pesos @ np.abs(sinais))
+
+        self.ticks += len(ticks)
+        self.ultimo_msc = int(ticks['time_msc'][-1])
+        self.ultimo_mid = float(mid[-1])
+
+    def pronto(self):
+        return self.ticks >= self.minimo and self._soma_dt > 0
+
+    def volatilidade(self):
+        """Desvio padrão do retorno log por raiz de segundo (None até ter ticks suficientes)"""
+        if not self.pronto():
+            return None
+        return math.sqrt(self._soma_r2 / self._soma_dt)
+
+    def amplitude_esperada(self, segundos):
+        """Amplitude (em preço) esperada para uma barra de `segundos`: comparável ao ATR, para stops"""
+        sigma = self.volatilidade()
+        if sigma is None:
+            return None
+        return FATOR_AMPLITUDE * sigma * math.sqrt(segundos) * math.exp(self.ultimo_mid)
+
+    def taxa_ticks(self):
+        """Ticks por segundo"""
+        if not self.pronto():
+            return None
+        return self._soma_ticks / self._soma_dt
+
+    def desequilibrio(self):
+        """De -1 (só ticks de baixa) a +1 (só ticks de alta)"""
+        if not self.pronto() or not self._soma_abs:
+            return None
+        return self._soma_sinal / self._soma_abs
+
+
+class FluxoTicks:
+    """Baixa os ticks novos de cada ativo com copy_ticks_from a partir de um cursor (time_msc) e alimenta
+    as EstatisticasTick e as barras de ticks do feed do ativo"""
+
+    def __init__(self, intervalo=1.0, lote=10000, aquecimento=600, meia_vida=120.0):
+        self.intervalo = intervalo  # Segundos entre rodadas de coleta
+        self.lote = lote  # Ticks por chamada ao terminal
+        self.aquecimento = aquecimento  # Segundos de histórico baixados ao começar um ativo
+        self.meia_vida = meia_vida
+        self.log_system = None
+        self._estatisticas = {}  # ativo -> EstatisticasTick
+        self._cursores = {}  # ativo -> (time_msc do último tick, quantos ticks nesse milissegundo)
+        self._lock = threading.Lock()
+        self._monitoring = False
+        self._monitor_thread = None
+
+    def adicionar_ativo(self, ativo):
+        with self._lock:
+            if ativo not in self._estatisticas:
+                self._estatisticas[ativo] = EstatisticasTick(self.meia_vida)
+
+    def remover_ativo(self, ativo):
+        with self._lock:
+            self._estatisticas.pop(ativo, None)
+            self._cursores.pop(ativo, None)
+
+    def obter(self, ativo):
+        """Estatísticas do ativo (None se não acompanhado); leitura O(1)"""
+        return self._estatisticas.get(ativo)
+
+    def _logar(self, mensagem, ativo=None):
+        if self.log_system:
+            self.log_system.logar(mensagem, ativo)
+
+    def coletar(self, ativo):
+        """Baixa e incorpora os ticks desde o cursor; retorna quantos eram novos"""
+        estatisticas = self._estatisticas.get(ativo)
+        if estatisticas is None:
+            return 0
+        cursor = anterior = self._cursores.get(ativo)
+        if cursor is None:
+            tick = mt5.symbol_info_tick(ativo)
+            if tick is None:
+                return 0
+            cursor = (tick.time_msc - self.aquecimento * 1000, 0)
+
+        novos = 0
+        ultimo = None
+        while True:
+            ultimo_msc, vistos = cursor
+            ticks = mt5.copy_ticks_from(ativo, datetime.fromtimestamp(ultimo_msc / 1000, timezone.utc),
+                                        self.lote, mt5.COPY_TICKS_ALL)
+            if ticks is None or len(ticks) == 0:
+                break
+            # A consulta recomeça no milissegundo do cursor: descarta o que já foi incorporado
+            tempos = ticks['time_msc']
+            iguais = np.flatnonzero(tempos == ultimo_msc)
+            novo = tempos > ultimo_msc
+            novo[iguais[vistos:]] = True
+            lote = ticks[novo]
+            if len(lote) == 0:
+                break
+            estatisticas.adicionar(lote)
+            obter_feed(ativo).adicionar_ticks(lote)
+            fim = int(lote['time_msc'][-1])
+            no_fim = int(np.count_nonzero(lote['time_msc'] == fim))
+            cursor = (fim, no_fim + (vistos if fim == ultimo_msc else 0))
+            novos += len(lote)
+            ultimo = lote[-1]
+            if len(ticks) < self.lote:
+                break
+        self._cursores[ativo] = cursor
+
+        if ultimo is not None:
+            barramento.publicar(TOPICO_TICK, EventoTick(ativo, int(ultimo['time_msc']), float(ultimo['bid']),
+                                                        float(ultimo['ask'])))
+            # Primeiro tick de um minuto novo: barra M1 nova (as resoluções maiores filtram pelo tempo)
+            minuto = int(ultimo['time_msc']) // 60000 * 60
+            if anterior is not None and anterior[0] // 60000 * 60 != minuto:
+                barramento.publicar(TOPICO_BARRA, EventoBarra(ativo, 'M1', minuto))
+        return novos
+
+    def acompanhando(self, ativo):
+        """Coleta rodando e ativo acompanhado: os ticks dele chegam pelo barramento de eventos"""
+        return self._monitoring and ativo in self._estatisticas
+
+    def start_monitoring(self):
+        """Inicia a coleta periódica de ticks de todos os ativos acompanhados"""
+        if self._monitoring:
+            return
+        self._monitoring = True
+        self._monitor_thread = threading.Thread(target=self._monitor_ticks, daemon=True)
+        self._monitor_thread.start()
+
+    def stop_monitoring(self):
+        self._monitoring = False
+        if self._monitor_thread:
+            self._monitor_thread.join()
+            self._monitor_thread = None
+
+    def _monitor_ticks(self):
+        while self._monitoring:
+            if not supervisor_conexao.aguardar_conexao(timeout=1):
+                continue  # Terminal offline: o cursor retoma de onde parou
+            with self._lock:
+                ativos = list(self._estatisticas)
+            for ativo in ativos:
+                try:
+                    self.coletar(ativo)
+                except Exception as e:
+                    self._logar(f"❌ Erro ao coletar ticks de {ativo}: {e}", ativo)
+            time.sleep(self.intervalo)
+
+
+# Create global tick flow instance
+fluxo_ticks = FluxoTicks()
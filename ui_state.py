@@ -0,0 +1,98 @@
+import threading
+import time
+import tkinter as tk
+
+from memory_monitor import tamanho_profundo
+
+_AUSENTE = object()
+
+
+class EstadoUI:
+    """Estado da interface: qualquer thread escreve, só o renderizador (thread do Tk) lê as alterações"""
+
+    def __init__(self):
+        self._valores = {}
+        self._alterados = set()
+        self._lock = threading.Lock()
+
+    def definir(self, chave, valor):
+        """Publica um valor; escritas repetidas antes do próximo quadro se fundem em uma"""
+        with self._lock:
+            if self._valores.get(chave, _AUSENTE) != valor:
+                self._valores[chave] = valor
+                self._alterados.add(chave)
+
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            return self._valores.get(chave, padrao)
+
+    def tamanho(self):
+        with self._lock:
+            return len(self._valores)
+
+    def bytes_retidos(self):
+        """Bytes retidos pelos valores publicados (monitor de memória)"""
+        with self._lock:
+            valores = dict(self._valores)
+        return tamanho_profundo(valores)
+
+    def coletar_alteracoes(self):
+        """Valores alterados desde a última coleta"""
+        with self._lock:
+            alterados, self._alterados = self._alterados, set()
+            return {chave: self._valores[chave] for chave in alterados}
+
+
+class RenderizadorUI:
+    """Um único root.after a `fps` quadros por segundo aplica aos widgets só o que mudou"""
+
+    def __init__(self, root, estado, fps=10):
+        self.root = root
+        self.estado = estado
+        self.fps = fps
+        self._renderizadores = {}  # chave -> função(valor) que atualiza o(s) widget(s)
+        self._por_quadro = []  # Funções chamadas a cada quadro (ex.: drenar a fila de log)
+        self._renderizado = {}
+        self._after_id = None
+        self.quadros = 0
+        self.atualizacoes = 0
+        self.tempo_max_quadro = 0.0
+
+    def vincular(self, chave, renderizar):
+        """Associa uma chave do estado à função que a desenha"""
+        self._renderizadores[chave] = renderizar
+
+    def a_cada_quadro(self, funcao):
+        self._por_quadro.append(funcao)
+
+    def iniciar(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(0, self._quadro)
+
+    def parar(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+
+    def _quadro(self):
+        inicio = time.perf_counter()
+        try:
+            for chave, valor in self.estado.coletar_alteracoes().items():
+                renderizar = self._renderizadores.get(chave)
+                if renderizar is None or self._renderizado.get(chave, _AUSENTE) == valor:
+                    continue
+                try:
+                    renderizar(valor)
+                except tk.TclError:
+                    continue  # Widget destruído
+                self._renderizado[chave] = valor
+                self.atualizacoes += 1
+            for funcao in self._por_quadro:
+                funcao()
+        finally:
+            self.quadros += 1
+            self.tempo_max_quadro = max(self.tempo_max_quadro, time.perf_counter() - inicio)
+            self._after_id = self.root.after(max(1, int(1000 / self.fps)), self._quadro)
@@ -1,111 +1,247 @@
 import json
 import os
-import MetaTrader5 as mt5
+from mt5_gate import cliente_mt5, controlador_mt5, ChamadaDescartada, PRIORIDADE_DADOS, PRIORIDADE_UI
+from connection_supervisor import supervisor_conexao
+from spread_stats import EstatisticasSpread
+from event_bus import barramento, TOPICO_TICK, POLITICA_ULTIMO
 from datetime import datetime
+from types import MappingProxyType
 import threading
 import time
 
+import numpy as np
+
+mt5 = cliente_mt5(PRIORIDADE_DADOS)
+mt5_ui = cliente_mt5(PRIORIDADE_UI)  # Periodic refreshes, shed when the terminal is congested
+
 CAMINHO_LOGIN_SALVO = "login_salvo.json"
+MAGIC_NUMBER = 123456  # Identifica as ordens e posições abertas pelo robô
+
+# Status codes of the compact asset records (row 'status' of STATUS_DTYPE)
+STATUS_LIVRE, STATUS_INICIALIZANDO, STATUS_ATIVO, STATUS_RESTRITO, STATUS_ERRO = range(5)
+STATUS_NOMES = ('unknown', 'initializing', 'active', 'restricted', 'error')
+STATUS_MENSAGENS = ('Asset not monitored', 'Initializing monitoring', 'Trading available',
+                    'Trading restricted', 'Unable to get market data')
+
+# One fixed-layout row (58 bytes) per monitored asset, updated in place; times are epoch seconds
+# (last_full: last symbol_info refresh, last_tick: last tick event) and NaN prices mean no quote
+STATUS_DTYPE = np.dtype([
+    ('status', 'u1'),
+    ('trading_allowed', '?'),
+    ('last_update', '<f8'),
+    ('last_full', '<f8'),
+    ('last_tick', '<f8'),
+    ('point', '<f8'),
+    ('spread', '<f8'),
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+])
+# Rows returned by AssetManager.snapshot(): the same fields plus the symbol name
+SNAPSHOT_DTYPE = np.dtype([('ativo', 'U32')] + STATUS_DTYPE.descr)
+
+_STATUS_DESCONHECIDO = MappingProxyType({
+    'status': 'unknown',
+    'message': 'Asset not monitored',
+    'last_update': None,
+    'spread': None,
+    'bid': None,
+    'ask': None,
+    'trading_allowed': False
+})
+
 
 class AssetManager:
-    def __init__(self):
-        self._assets_status = {}
-        self._lock = threading.Lock()
+    def __init__(self, capacidade=64):
+        self._status = np.zeros(capacidade, dtype=STATUS_DTYPE)  # Row per asset, reused after removal
+        self._ids = {}  # asset -> row in self._status
+        self._livres = []  # Rows freed by remove_asset
+        self._erros = {}  # row -> exception message (only while the asset is in error)
+        self._spreads = {}  # asset -> EstatisticasSpread (streaming median/p95, constant memory)
+        self._lock = threading.Lock()  # Never held across terminal calls (they may wait on the gate)
+        self.refresh_interval = 1  # Minimum seconds between quote refreshes of one asset
+        self.tick_margin = 3  # Tick-fed assets are polled only after this long without a tick event
+        self.full_refresh_interval = 60  # Seconds between symbol_info refreshes (trade mode, point)
+        self._tick_subscription = None
         self._monitoring = False
         self._monitor_thread = None
 
     def start_monitoring(self):
         """Start monitoring asset status"""
         self._monitoring = True
+        # Quotes of assets covered by the tick stream arrive as events instead of being polled
+        self._tick_subscription = barramento.assinar(TOPICO_TICK, self.on_tick, politica=POLITICA_ULTIMO)
         self._monitor_thread = threading.Thread(target=self._monitor_assets, daemon=True)
         self._monitor_thread.start()
 
     def stop_monitoring(self):
         """Stop monitoring asset status"""
         self._monitoring = False
+        if self._tick_subscription:
+            barramento.cancelar(self._tick_subscription)
+            self._tick_subscription = None
         if self._monitor_thread:
             self._monitor_thread.join()
 
     def _monitor_assets(self):
         """Monitor assets status in background"""
         while self._monitoring:
-            for asset in list(self._assets_status.keys()):
+            if not supervisor_conexao.aguardar_conexao(timeout=1):
+                continue  # Terminal offline: keep the last status until the supervisor reconnects
+            for asset in self._assets_to_refresh():
                 self.update_asset_status(asset)
             time.sleep(1)  # Update every second
 
+    def _assets_to_refresh(self):
+        """Stalest assets due for a refresh, capped to what the UI budget of the gate allows per second"""
+        por_rodada = max(1, int(controlador_mt5.limites[PRIORIDADE_UI]) // 2)  # Room for the other UI clients
+        agora = time.time()
+        with self._lock:
+            ativos = list(self._ids)
+            linhas = np.fromiter(self._ids.values(), dtype=np.intp, count=len(ativos))
+            ultima = self._status['last_update'][linhas]
+            ultima_completa = self._status['last_full'][linhas]
+            ultimo_tick = self._status['last_tick'][linhas]
+        # The tick collector runs every second: a wider margin keeps jitter from polling tick-fed assets
+        vencidos = np.flatnonzero(((agora - ultima >= self.refresh_interval) & (agora - ultimo_tick >= self.tick_margin))
+                                  | (agora - ultima_completa >= self.full_refresh_interval))
+        vencidos = vencidos[np.argsort(ultima[vencidos], kind='stable')][:por_rodada]
+        return [ativos[i] for i in vencidos]
+
+    def on_tick(self, evento):
+        """Tick event (event bus): quote and spread updated in place, no terminal call"""
+        with self._lock:
+            linha = self._ids.get(evento.ativo)
+            if linha is None:
+                return
+            registro = self._status[linha]  # Structured scalar: a view of the row
+            if registro['status'] not in (STATUS_ATIVO, STATUS_RESTRITO) or not registro['point']:
+                return  # Point and trade mode still come from the next terminal refresh
+            spread = (evento.ask - evento.bid) / registro['point']
+            registro['last_update'] = registro['last_tick'] = time.time()
+            registro['spread'] = spread
+            registro['bid'] = evento.bid
+            registro['ask'] = evento.ask
+            self._spreads[evento.ativo].atualizar(spread)
+
+    def _marcar_erro(self, linha, mensagem=None):
+        agora = time.time()
+        self._status[linha] = (STATUS_ERRO, False, agora, agora, 0.0, self._status['point'][linha],
+                               np.nan, np.nan, np.nan)
+        if mensagem is None:
+            self._erros.pop(linha, None)
+        else:
+            self._erros[linha] = mensagem
+
     def update_asset_status(self, asset):
-        """Update status for a specific asset"""
+        """Update status for a specific asset (its row is overwritten in place)"""
         with self._lock:
-            try:
-                tick = mt5.symbol_info_tick(asset)
-                info = mt5.symbol_info(asset)
-                
-                if tick is None or info is None:
-                    self._assets_status[asset] = {
-                        'status': 'error',
-                        'message': 'Unable to get market data',
-                        'last_update': datetime.now(),
-                        'spread': None,
-                        'bid': None,
-                        'ask': None,
-                        'trading_allowed': False
-                    }
-                    return
-
-                spread = (tick.ask - tick.bid) / info.point
-                self._assets_status[asset] = {
-                    'status': 'active' if info.trade_mode == mt5.SYMBOL_TRADE_MODE_FULL else 'restricted',
-                    'message': 'Trading available' if info.trade_mode == mt5.SYMBOL_TRADE_MODE_FULL else 'Trading restricted',
-                    'last_update': datetime.now(),
-                    'spread': spread,
-                    'bid': tick.bid,
-                    'ask': tick.ask,
-                    'trading_allowed': info.trade_mode == mt5.SYMBOL_TRADE_MODE_FULL
-                }
-            except Exception as e:
-                self._assets_status[asset] = {
-                    'status': 'error',
-                    'message': str(e),
-                    'last_update': datetime.now(),
-                    'spread': None,
-                    'bid': None,
-                    'ask': None,
-                    'trading_allowed': False
-                }
+            linha = self._ids.get(asset)
+            if linha is None:
+                return
+            registro = self._status[linha]
+            completo = (registro['status'] not in (STATUS_ATIVO, STATUS_RESTRITO)
+                        or time.time() - registro['last_full'] >= self.full_refresh_interval)
+
+        # Terminal calls outside the lock: readers and tick events are not blocked while the gate waits
+        try:
+            tick = mt5_ui.symbol_info_tick(asset)
+            info = mt5_ui.symbol_info(asset) if completo else None
+            erro = None
+        except ChamadaDescartada:
+            # Terminal congested: keep the previous status until the next refresh
+            return
+        except Exception as e:
+            tick = info = None
+            erro = str(e)
+
+        with self._lock:
+            if self._ids.get(asset) != linha:
+                return  # Removed (or its row reused) while the terminal was answering
+            registro = self._status[linha]
+            if not completo and registro['status'] == STATUS_INICIALIZANDO:
+                return  # Removed and re-added meanwhile: the row needs a full refresh, not this quote
+            if tick is None or (completo and info is None):
+                self._marcar_erro(linha, erro)
+                return
+
+            agora = time.time()
+            if completo:
+                permitido = info.trade_mode == mt5.SYMBOL_TRADE_MODE_FULL
+                registro['status'] = STATUS_ATIVO if permitido else STATUS_RESTRITO
+                registro['trading_allowed'] = permitido
+                registro['point'] = info.point
+                registro['last_full'] = agora
+            spread = (tick.ask - tick.bid) / registro['point'] if registro['point'] else np.nan
+            if not np.isnan(spread):
+                self._spreads[asset].atualizar(spread)
+            registro['last_update'] = agora
+            registro['spread'] = spread
+            registro['bid'] = tick.bid
+            registro['ask'] = tick.ask
+            if self._erros:
+                self._erros.pop(linha, None)
 
     def get_asset_status(self, asset):
-        """Get current status for an asset"""
+        """Get current status for an asset (read-only mapping for unmonitored assets)"""
         with self._lock:
-            return self._assets_status.get(asset, {
-                'status': 'unknown',
-                'message': 'Asset not monitored',
-                'last_update': None,
-                'spread': None,
-                'bid': None,
-                'ask': None,
-                'trading_allowed': False
-            })
+            linha = self._ids.get(asset)
+            if linha is None:
+                return _STATUS_DESCONHECIDO
+            registro = self._status[linha]
+            codigo = int(registro['status'])
+            com_cotacao = not np.isnan(registro['bid'])
+            return {
+                'status': STATUS_NOMES[codigo],
+                'message': self._erros.get(linha, STATUS_MENSAGENS[codigo]),
+                'last_update': datetime.fromtimestamp(registro['last_update']),
+                'spread': float(registro['spread']) if com_cotacao else None,
+                'bid': float(registro['bid']) if com_cotacao else None,
+                'ask': float(registro['ask']) if com_cotacao else None,
+                'trading_allowed': bool(registro['trading_allowed'])
+            }
+
+    def snapshot(self):
+        """All monitored assets as one SNAPSHOT_DTYPE array, for the dashboard and screener"""
+        with self._lock:
+            linhas = np.fromiter(self._ids.values(), dtype=np.intp, count=len(self._ids))
+            registros = np.empty(len(linhas), dtype=SNAPSHOT_DTYPE)
+            registros['ativo'] = list(self._ids)
+            for campo in STATUS_DTYPE.names:
+                registros[campo] = self._status[campo][linhas]
+            return registros
+
+    def get_spread_stats(self, asset):
+        """Streaming spread statistics for an asset (None if not monitored yet); O(1)"""
+        return self._spreads.get(asset)
 
     def add_asset(self, asset):
         """Add asset to monitoring"""
         with self._lock:
-            if asset not in self._assets_status:
-                self._assets_status[asset] = {
-                    'status': 'initializing',
-                    'message': 'Initializing monitoring',
-                    'last_update': datetime.now(),
-                    'spread': None,
-                    'bid': None,
-                    'ask': None,
-                    'trading_allowed': False
-                }
-                self.update_asset_status(asset)
+            if asset not in self._ids:
+                if self._livres:
+                    linha = self._livres.pop()
+                else:
+                    linha = len(self._ids)
+                    if linha == len(self._status):
+                        self._status = np.concatenate((self._status, np.zeros(len(self._status), dtype=STATUS_DTYPE)))
+                self._ids[asset] = linha
+                self._status[linha] = (STATUS_INICIALIZANDO, False, time.time(), 0.0, 0.0, 0.0,
+                                       np.nan, np.nan, np.nan)
+                self._spreads[asset] = EstatisticasSpread()
+            else:
+                return
+        if not self._monitoring:
+            self.update_asset_status(asset)  # Otherwise the monitor picks it up within the UI budget
 
     def remove_asset(self, asset):
         """Remove asset from monitoring"""
         with self._lock:
-            if asset in self._assets_status:
-                del self._assets_status[asset]
+            linha = self._ids.pop(asset, None)
+            if linha is not None:
+                self._status[linha] = np.zeros((), dtype=STATUS_DTYPE)
+                self._erros.pop(linha, None)
+                self._livres.append(linha)
+            self._spreads.pop(asset, None)
 
 # Utility functions
 def salvar_login(server, login, password):
@@ -126,6 +262,7 @@ def carregar_login():
 def conectar_mt5(server, login, password):
     if not mt5.initialize(server=server, login=int(login), password=password):
         return False
+    supervisor_conexao.definir_credenciais(server, login, password)
     return True
 
 def verificar_conta_real():
@@ -135,7 +272,7 @@ def verificar_conta_real():
     return info.trade_mode == 0  # 0 = Conta Real
 
 def obter_saldo():
-    conta = mt5.account_info()
+    conta = mt5_ui.account_info()
     if conta:
         return conta.balance
     return 0.0
@@ -0,0 +1,218 @@
+"""Otimização walk-forward da EstrategiaTrading, com as janelas distribuídas entre processos.
+
+O histórico é dividido em janelas móveis de treino/teste; em cada janela a grade de parâmetros
+é otimizada no treino e o melhor conjunto é avaliado no teste seguinte. As barras ficam em
+memória compartilhada (somente leitura) para todos os processos.
+
+Exemplos:
+    python walk_forward.py --simulado --barras 300000 --saida wf.json
+    python walk_forward.py --ativo EURUSD --timeframe M5 --barras 200000 --treino 20000 --teste 5000
+    python walk_forward.py --arquivo eurusd_m5.npy --grade grade.json --objetivo sharpe
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Grade padrão (atributos da EstrategiaTrading); pode ser substituída por um JSON com --grade
+GRADE_PADRAO = {
+    'bb_desvio': [1.5, 1.8, 2.2],
+    'volume_threshold': [1.0, 1.2, 1.5],
+    'min_rr_ratio': [1.0, 1.2, 1.6, 2.0],
+}
+
+# Barras anteriores a cada janela usadas só para aquecer os indicadores
+AQUECIMENTO = 200
+MIN_OPERACOES = 5  # Conjuntos com menos operações no treino não são escolhidos
+
+_barras = None  # Array compartilhado (somente leitura) no processo de trabalho
+_memoria = None
+
+
+def _anexar(nome, tamanho, descricao_dtype, simulado=False):
+    """Inicializador dos processos: mapeia as barras da memória compartilhada sem copiar.
+
+    Com `simulado`, instala o terminal simulado antes de qualquer import do backtest: sob spawn (padrão
+    no Windows) o processo de trabalho não herda o fake_mt5 instalado no processo principal.
+    """
+    global _barras, _memoria
+    if simulado and 'MetaTrader5' not in sys.modules:  # Com fork, já veio do processo principal
+        import fake_mt5
+        fake_mt5.instalar()
+    _memoria = shared_memory.SharedMemory(name=nome)
+    _barras = np.ndarray((tamanho,), dtype=np.dtype([tuple(campo) for campo in descricao_dtype]),
+                         buffer=_memoria.buf)
+    _barras.flags.writeable = False
+
+
+def combinacoes(grade):
+    nomes = list(grade)
+    return [dict(zip(nomes, valores)) for valores in itertools.product(*(grade[n] for n in nomes))]
+
+
+def dividir_janelas(n, treino, teste, aquecimento=AQUECIMENTO):
+    """Janelas (início do treino, fim do treino, fim do teste) deslizando de `teste` em `teste` barras"""
+    janelas = []
+    inicio = aquecimento
+    while inicio + treino + teste <= n:
+        janelas.append((inicio, inicio + treino, inicio + treino + teste))
+        inicio += teste
+    return janelas
+
+
+def _pontuacao(resumo, objetivo):
+    if resumo['operacoes'] < MIN_OPERACOES:
+        return -np.inf
+    return resumo[objetivo]
+
+
+def otimizar_janela(tarefa):
+    """Otimiza a grade no treino da janela e avalia o melhor conjunto no teste seguinte"""
+    from backtest import executar_backtest
+
+    indice, inicio, fim_treino, fim_teste, grade, objetivo, point, timeframe = tarefa
+    treino = _barras[inicio - AQUECIMENTO:fim_treino]
+    melhor, melhor_resumo, melhor_pontuacao = None, None, -np.inf
+    for parametros in combinacoes(grade):
+        _, resumo = executar_backtest(treino, parametros, point, AQUECIMENTO, timeframe)
+        pontuacao = _pontuacao(resumo, objetivo)
+        if melhor is None or pontuacao > melhor_pontuacao:
+            melhor, melhor_resumo, melhor_pontuacao = parametros, resumo, pontuacao
+
+    # Teste: aquece com as barras do fim do treino e só opera a partir do início do teste
+    teste = _barras[fim_treino - AQUECIMENTO:fim_teste]
+    (entradas, saidas, direcoes, resultados), resumo_teste = executar_backtest(
+        teste, melhor, point, AQUECIMENTO, timeframe)
+    return {
+        'janela': indice,
+        'treino': [int(_barras['time'][inicio]), int(_barras['time'][fim_treino - 1])],
+        'teste': [int(_barras['time'][fim_treino]), int(_barras['time'][fim_teste - 1])],
+        'parametros': melhor,
+        'treino_metricas': melhor_resumo,
+        'teste_metricas': resumo_teste,
+        'saidas': teste['time'][saidas].astype(np.int64).tolist(),
+        'direcoes': direcoes.tolist(),
+        'resultados': resultados.tolist(),
+    }
+
+
+def walk_forward(barras, treino, teste, grade=None, objetivo='lucro', point=0.00001, timeframe='M5',
+                 workers=None, simulado=False):
+    """Executa todas as janelas em paralelo e agrega a curva de equity fora da amostra"""
+    from backtest import metricas
+
+    grade = grade or GRADE_PADRAO
+    barras = np.ascontiguousarray(barras)
+    janelas = dividir_janelas(len(barras), treino, teste)
+    if not janelas:
+        raise ValueError(f"Histórico insuficiente: {len(barras)} barras para treino={treino} e teste={teste}")
+    tarefas = [(i, a, b, c, grade, objetivo, point, timeframe) for i, (a, b, c) in enumerate(janelas)]
+    workers = min(workers or os.cpu_count() or 1, len(tarefas))
+
+    memoria = shared_memory.SharedMemory(create=True, size=barras.nbytes)
+    try:
+        compartilhadas = np.ndarray(barras.shape, dtype=barras.dtype, buffer=memoria.buf)
+        compartilhadas[:] = barras
+        argumentos = (memoria.name, len(barras), barras.dtype.descr, simulado)
+        if workers == 1:
+            _anexar(*argumentos[:3])  # Mesmo processo: o terminal (real ou simulado) já está carregado
+            resultados = [otimizar_janela(t) for t in tarefas]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_anexar, initargs=argumentos) as executor:
+                resultados = list(executor.map(otimizar_janela, tarefas))
+        del compartilhadas
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+    resultados.sort(key=lambda r: r['janela'])
+    oos = np.array([x for r in resultados for x in r['resultados']], dtype=np.float64)
+    tempos = [t for r in resultados for t in r['saidas']]
+    equity = np.cumsum(oos)
+    return {
+        'janelas': resultados,
+        'oos': {
+            'metricas': metricas(oos),
+            'curva': [[t, float(e)] for t, e in zip(tempos, equity)],
+        },
+    }
+
+
+def carregar_barras(args):
+    """Barras de um .npy, do terminal simulado ou do MT5 (com o login salvo)"""
+    if args.arquivo:
+        return np.load(args.arquivo), args.point or 0.00001
+
+    if args.simulado:
+        import fake_mt5
+        fake_mt5.instalar()
+    from mt5_gate import cliente_mt5, PRIORIDADE_DADOS
+    from multi_timeframe import TIMEFRAMES_MT5
+    mt5 = cliente_mt5(PRIORIDADE_DADOS)
+
+    if not args.simulado:
+        from utils import carregar_login, conectar_mt5
+        dados = carregar_login()
+        if not dados or not conectar_mt5(dados['server'], dados['login'], dados['password']):
+            raise SystemExit("❌ Não foi possível conectar ao MetaTrader 5 (faça login no app e salve os dados)")
+
+    barras = mt5.copy_rates_from_pos(args.ativo, TIMEFRAMES_MT5[args.timeframe], 0, args.barras)
+    if barras is None or len(barras) == 0:
+        raise SystemExit(f"❌ Sem histórico de {args.ativo} {args.timeframe}: {mt5.last_error()}")
+    info = mt5.symbol_info(args.ativo)
+    return barras, args.point or (info.point if info else 0.00001)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward da EstrategiaTrading em vários processos")
+    parser.add_argument('--ativo', default='EURUSD')
+    parser.add_argument('--timeframe', default='M5')
+    parser.add_argument('--barras', type=int, default=300000, help="Barras de histórico a baixar")
+    parser.add_argument('--arquivo', help="Array .npy de barras (layout de copy_rates) em vez do terminal")
+    parser.add_argument('--simulado', action='store_true', help="Usa o terminal simulado (fake_mt5)")
+    parser.add_argument('--point', type=float, help="Tamanho do ponto (padrão: symbol_info do ativo)")
+    parser.add_argument('--treino', type=int, default=20000, help="Barras por janela de treino")
+    parser.add_argument('--teste', type=int, default=5000, help="Barras por janela de teste")
+    parser.add_argument('--grade', help="JSON {parametro: [valores]} com a grade de otimização")
+    parser.add_argument('--objetivo', default='lucro', choices=['lucro', 'profit_factor', 'sharpe'])
+    parser.add_argument('--workers', type=int, help="Processos (padrão: número de núcleos)")
+    parser.add_argument('--saida', default='walk_forward.json')
+    args = parser.parse_args()
+
+    barras, point = carregar_barras(args)
+    grade = None
+    if args.grade:
+        with open(args.grade) as f:
+            grade = json.load(f)
+
+    inicio = time.perf_counter()
+    resultado = walk_forward(barras, args.treino, args.teste, grade, args.objetivo, point, args.timeframe,
+                             args.workers, args.simulado)
+    duracao = time.perf_counter() - inicio
+
+    for janela in resultado['janelas']:
+        m = janela['teste_metricas']
+        print(f"Janela {janela['janela']:3d}  {janela['parametros']}  "
+              f"teste: {m['operacoes']:4d} operações, lucro {m['lucro']:+.5f}")
+    m = resultado['oos']['metricas']
+    print(f"📊 Fora da amostra: {m['operacoes']} operações, lucro {m['lucro']:+.5f}, "
+          f"profit factor {m['profit_factor']:.2f}, max drawdown {m['max_drawdown']:.5f}")
+    print(f"⏱️ {len(resultado['janelas'])} janelas em {duracao:.1f}s")
+
+    resultado['meta'] = {'ativo': args.ativo, 'timeframe': args.timeframe, 'barras': len(barras),
+                         'treino': args.treino, 'teste': args.teste, 'objetivo': args.objetivo,
+                         'grade': grade or GRADE_PADRAO, 'duracao_s': duracao}
+    with open(args.saida, 'w') as f:
+        json.dump(resultado, f, indent=2)
+    print(f"💾 Resultados salvos em {args.saida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())